@@ -1,47 +1,19 @@
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report
-import joblib
+"""Train the logistic-regression head on cached mpnet embeddings.
 
-# Dataset laden
-data = pd.read_csv("dummy_opdrachten_dataset.csv")  # Kolommen: "omschrijving", "onderwerp"
-X = data["omschrijving"].astype(str)
-y = data["onderwerp"]
+Thin wrapper around ``log_reg_library.training``; extra command line arguments
+are passed through (for example ``--dataset`` or ``--cache-dir``).
+"""
 
-# Label encoder voor de onderwerpen
-label_encoder = LabelEncoder()
-y_encoded = label_encoder.fit_transform(y)
+import sys
+from pathlib import Path
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
-)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-print("Genereren van embeddings met paraphrase-multilingual-mpnet-base-v2...")
-embed_model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
+from log_reg_library.training import main  # noqa: E402
 
-X_train_emb = embed_model.encode(X_train.tolist(), show_progress_bar=True, convert_to_numpy=True)
-X_test_emb = embed_model.encode(X_test.tolist(), show_progress_bar=True, convert_to_numpy=True)
-
-# Logistic Regression classifier
-print("Model trainen (Logistic Regression)...")
-clf = LogisticRegression(
-    max_iter=2000,
-    solver='lbfgs',
-    multi_class='multinomial',
-    n_jobs=-1
-)
-clf.fit(X_train_emb, y_train)
-
-# Evaluatie
-y_pred = clf.predict(X_test_emb)
-print("\n=== Evaluatie ===")
-print(classification_report(y_test, y_pred, target_names=label_encoder.classes_))
-
-# Opslaan van model en encoder
-joblib.dump(clf, "nlp_model_logreg_embeddings.pkl")
-joblib.dump(label_encoder, "label_encoder_log_reg.pkl")
-print("\nModel en encoder opgeslagen voor later gebruik")
\ No newline at end of file
+if __name__ == "__main__":
+    main([
+        "--families", "logreg",
+        "--embedding-model", "paraphrase-multilingual-mpnet-base-v2",
+        *sys.argv[1:],
+    ])
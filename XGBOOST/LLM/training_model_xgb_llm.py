@@ -1,50 +1,19 @@
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-from xgboost import XGBClassifier
-from sklearn.metrics import classification_report
-import joblib
+"""Train the XGBoost head on cached all-MiniLM-L6-v2 embeddings.
 
-# Dataset laden 
-data = pd.read_csv("dummy_opdrachten_dataset.csv")  # Kolommen: "omschrijving", "onderwerp"
-X = data["omschrijving"].astype(str)
-y = data["onderwerp"]
+Thin wrapper around ``log_reg_library.training``; extra command line arguments
+are passed through (for example ``--dataset`` or ``--cache-dir``).
+"""
 
-# Label encoder voor de minoren 
-label_encoder = LabelEncoder()
-y_encoded = label_encoder.fit_transform(y)
+import sys
+from pathlib import Path
 
-# Train-test split 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
-)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-# Embeddings genereren 
-embed_model = SentenceTransformer('all-MiniLM-L6-v2')
+from log_reg_library.training import main  # noqa: E402
 
-X_train_emb = embed_model.encode(X_train.tolist(), show_progress_bar=True)
-X_test_emb = embed_model.encode(X_test.tolist(), show_progress_bar=True)
-
-# XGBoost classifier trainen 
-xgb_model = XGBClassifier(
-    objective="multi:softprob",
-    eval_metric="mlogloss",
-    n_estimators=300,
-    learning_rate=0.1,
-    max_depth=6,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    random_state=42
-)
-xgb_model.fit(X_train_emb, y_train)
-
-# Evaluatie
-y_pred = xgb_model.predict(X_test_emb)
-print("=== Evaluatie ===")
-print(classification_report(y_test, y_pred, target_names=label_encoder.classes_))
-
-# Opslaan van model en encoder 
-joblib.dump(xgb_model, "nlp_model_xgb_embeddings.pkl")
-joblib.dump(label_encoder, "label_encoder_xgb_llm.pkl")
-print("Model en encoder opgeslagen voor later gebruik")
\ No newline at end of file
+if __name__ == "__main__":
+    main([
+        "--families", "xgboost",
+        "--embedding-model", "all-MiniLM-L6-v2",
+        *sys.argv[1:],
+    ])
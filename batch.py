@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import argparse
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from main import load_pipeline_classifier, prepare_mentor_engine
+from matching import read_table, write_table
+from matching.cache import DEFAULT_CACHE_DIR
+from matching.engine import ImprovementCallback
+from matching.mentor_pool import load_mentor_pool
+from matching.strategy import DEFAULT_MEMORY_LIMIT_MB, estimate_size, plan_strategy, solve_with_plan
+
+MANIFEST_COLUMNS = (
+    "students_input_path",
+    "mentors_type1_path",
+    "mentors_type2_path",
+    "n_type1",
+    "n_type2",
+    "export_path",
+)
+
+
+def read_manifest(path: str) -> list[dict]:
+    """Read a CSV/Parquet/Arrow or JSON-lines manifest with one matching job per row."""
+
+    if Path(path).suffix.lower() in (".json", ".jsonl"):
+        manifest = pd.read_json(path, lines=Path(path).suffix.lower() == ".jsonl")
+    else:
+        manifest = read_table(path)
+
+    missing = {"students_input_path", "mentors_type1_path", "export_path"} - set(manifest.columns)
+    if missing:
+        raise ValueError(f"Manifest is missing required columns: {', '.join(sorted(missing))}")
+
+    jobs = []
+    for idx, row in manifest.iterrows():
+        job = {column: row.get(column) for column in MANIFEST_COLUMNS}
+        job["name"] = row.get("name") if isinstance(row.get("name"), str) else f"job{idx}"
+        job["mentors_type2_path"] = job["mentors_type2_path"] if isinstance(job["mentors_type2_path"], str) else None
+        job["n_type1"] = int(job["n_type1"]) if pd.notna(job["n_type1"]) else 4
+        job["n_type2"] = int(job["n_type2"]) if pd.notna(job["n_type2"]) else None
+        job["timeout_seconds"] = row.get("timeout_seconds")
+        jobs.append(job)
+    return jobs
+
+
+def classify_all(classifier, jobs: list[dict], *, show_progress: bool = True) -> dict[str, pd.DataFrame]:
+    """Classify every distinct student file of the manifest in one embedding pass."""
+
+    paths = list(dict.fromkeys(job["students_input_path"] for job in jobs))
+    frames = [read_table(path) for path in paths]
+    combined = pd.concat(frames, keys=range(len(frames)), names=["_source", None])
+
+    classified = classifier.annotate_dataframe(
+        combined,
+        description_column="omschrijving",
+        fill_column="Onderwerp",
+        show_progress=show_progress,
+        copy=False,
+        categorical=True,
+    )
+    return {path: classified.xs(position, level="_source") for position, path in enumerate(paths)}
+
+
+class JobDeadline:
+    """Cancel signal for the solver: set once the job's budget has run out or ``cancel_event`` is set."""
+
+    def __init__(self, deadline: float, cancel_event=None) -> None:
+        self.deadline = deadline
+        self.cancel_event = cancel_event
+
+    def is_set(self) -> bool:
+        return time.perf_counter() >= self.deadline or (
+            self.cancel_event is not None and self.cancel_event.is_set()
+        )
+
+
+def _summary_row(job: dict, students: int) -> dict:
+    return {
+        "name": job["name"],
+        "students": students,
+        "matched": 0,
+        "status": "ok",
+        "strategy": "",
+        "estimated_memory_mb": 0.0,
+        "prepare_seconds": 0.0,
+        "solve_seconds": 0.0,
+        "export_path": job["export_path"],
+        "error": "",
+        "worker_pid": os.getpid(),
+    }
+
+
+def solve_job(
+    job: dict,
+    students_df: pd.DataFrame,
+    timeout_seconds: float,
+    memory_limit_mb: float | None = DEFAULT_MEMORY_LIMIT_MB,
+    *,
+    strategy: str = "auto",
+    on_improvement: ImprovementCallback | None = None,
+    cancel_event=None,
+    checkpoint_path: str | None = None,
+    cache_dir: str | None = None,
+) -> dict:
+    """Run one matching in a worker process and return its summary row.
+
+    ``timeout_seconds`` is the job's budget from the moment the worker
+    starts it: the solver is stopped when it runs out, however long the
+    mentor caches, facts and grounding took. Grounding and the export
+    themselves cannot be interrupted, so a job can still overrun by the
+    time those take past the deadline. The solve strategy is chosen from
+    the estimated instance size, so a job whose ground program would exceed ``memory_limit_mb`` falls back to the
+    greedy assignment instead of taking the node down.
+
+    ``on_improvement``, ``cancel_event`` (anything with ``is_set()``, such as
+    a ``multiprocessing.Manager().Event()``) and ``checkpoint_path`` are
+    passed to the solver. A cancelled job exports its best matching so far
+    and gets status ``cancelled``. With ``cache_dir`` the compiled mentor
+    pool is shared between jobs with the same mentor files.
+    """
+
+    started = time.perf_counter()
+    deadline = JobDeadline(started + timeout_seconds, cancel_event)
+    summary = _summary_row(job, len(students_df))
+    try:
+        engine = prepare_mentor_engine(
+            mentors_type1_path=job["mentors_type1_path"],
+            mentors_type2_path=job["mentors_type2_path"],
+            n_type1=job["n_type1"],
+            n_type2=job["n_type2"],
+            cache_dir=cache_dir,
+            verbose=False,
+        )
+        engine.set_students(students_df)
+        engine.load_students()
+        summary["prepare_seconds"] = time.perf_counter() - started
+
+        plan = plan_strategy(estimate_size(engine), strategy, memory_limit_mb=memory_limit_mb, workers=1)
+        summary["strategy"] = plan.strategy
+        summary["estimated_memory_mb"] = round(plan.estimate.memory_mb, 1)
+
+        remaining = max(1, int(timeout_seconds - (time.perf_counter() - started)))
+        solve_started = time.perf_counter()
+        matches = solve_with_plan(
+            engine,
+            plan,
+            remaining,
+            on_improvement=on_improvement,
+            cancel_event=deadline,
+            checkpoint_path=checkpoint_path,
+        )
+        summary["solve_seconds"] = time.perf_counter() - solve_started
+
+        Path(job["export_path"]).parent.mkdir(parents=True, exist_ok=True)
+        engine.export_matches(matches, filename=job["export_path"])
+        summary["matched"] = len(matches)
+        if cancel_event is not None and cancel_event.is_set():
+            summary["status"] = "cancelled"
+        elif not matches:
+            summary["status"] = "no_matches"
+    except Exception as exc:  # noqa: BLE001
+        summary["status"] = "error"
+        summary["error"] = f"{exc}\n{traceback.format_exc()}"
+    summary["total_seconds"] = time.perf_counter() - started
+    return summary
+
+
+def run_batch(
+    jobs: list[dict],
+    *,
+    workers: int | None = None,
+    default_timeout: float = 120,
+    memory_limit_mb: float | None = DEFAULT_MEMORY_LIMIT_MB,
+    encode_workers: int = 1,
+    cache_dir: str | None = str(DEFAULT_CACHE_DIR),
+    show_progress: bool = True,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """Classify all jobs' students with one warm model, then solve in a process pool.
+
+    With ``cache_dir`` set, each distinct set of mentor files is compiled
+    into a mentor pool once, here, and the jobs load it from there.
+    """
+
+    started = time.perf_counter()
+    classifier = load_pipeline_classifier(encode_workers=encode_workers)
+    classified = classify_all(classifier, jobs, show_progress=show_progress)
+    classifier.close()
+    classify_seconds = time.perf_counter() - started
+    if verbose:
+        print(f"Classified {sum(len(df) for df in classified.values())} students in {classify_seconds:.1f}s")
+
+    if cache_dir:
+        for mentor_paths in dict.fromkeys((job["mentors_type1_path"], job["mentors_type2_path"]) for job in jobs):
+            load_mentor_pool(*mentor_paths, cache_dir=cache_dir)
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for job in jobs:
+            timeout = job["timeout_seconds"] if pd.notna(job["timeout_seconds"]) else default_timeout
+            future = pool.submit(
+                solve_job,
+                job,
+                classified[job["students_input_path"]],
+                float(timeout),
+                memory_limit_mb,
+                cache_dir=cache_dir,
+            )
+            futures[future] = job
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as exc:  # noqa: BLE001 - e.g. BrokenProcessPool after a worker was OOM-killed
+                job = futures[future]
+                summary = _summary_row(job, len(classified[job["students_input_path"]]))
+                summary.update(status="error", error=repr(exc), worker_pid=None, total_seconds=0.0)
+            rows.append(summary)
+            if verbose:
+                print(
+                    f"[{summary['status']}] {summary['name']}: {summary['matched']}/{summary['students']} "
+                    f"matched in {summary['total_seconds']:.1f}s"
+                )
+
+    summary_df = pd.DataFrame(rows)
+    summary_df["classify_seconds"] = classify_seconds
+    order = {job["name"]: position for position, job in enumerate(jobs)}
+    return summary_df.sort_values("name", key=lambda names: names.map(order)).reset_index(drop=True)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run many matching jobs with one shared classifier.")
+    parser.add_argument(
+        "--manifest",
+        required=True,
+        help=(
+            "CSV/Parquet/Arrow/JSON-lines manifest with columns students_input_path, mentors_type1_path, "
+            "export_path and optionally name, mentors_type2_path, n_type1, n_type2, timeout_seconds."
+        ),
+    )
+    parser.add_argument(
+        "--summary-path",
+        default="./DATASETS/batch_summary.csv",
+        help="Where to write the per-job summary (default: ./DATASETS/batch_summary.csv).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of solver processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--timeout-seconds",
+        type=int,
+        default=120,
+        help="Per-job budget when the manifest has no timeout_seconds (default: 120).",
+    )
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=float,
+        default=DEFAULT_MEMORY_LIMIT_MB,
+        help=(
+            "Per-job limit for the estimated ground program; larger jobs use the greedy assignment "
+            f"instead of grounding (0 disables the check, default: {DEFAULT_MEMORY_LIMIT_MB})."
+        ),
+    )
+    parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=1,
+        help="Processes that encode the student descriptions before solving (default: 1).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CACHE_DIR),
+        help=f"Directory for the compiled mentor pools (default: {DEFAULT_CACHE_DIR}).",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Parse the mentor files in every job.")
+    parser.add_argument("--no-progress", action="store_true", help="Disable progress display during classification.")
+    parser.add_argument("--quiet", action="store_true", help="Suppress per-job console output.")
+
+    args = parser.parse_args(argv)
+    if not Path(args.manifest).exists():
+        parser.error(f"Missing manifest file: {args.manifest}")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    jobs = read_manifest(args.manifest)
+
+    summary = run_batch(
+        jobs,
+        workers=args.workers,
+        default_timeout=args.timeout_seconds,
+        memory_limit_mb=args.memory_limit_mb,
+        encode_workers=args.encode_workers,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        show_progress=not args.no_progress,
+        verbose=not args.quiet,
+    )
+
+    Path(args.summary_path).parent.mkdir(parents=True, exist_ok=True)
+    write_table(summary, args.summary_path)
+    if not args.quiet:
+        print(f"Summary written to {args.summary_path}")
+
+
+if __name__ == "__main__":
+    main()
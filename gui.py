@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import queue
 import threading
 import traceback
 from pathlib import Path
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 
 from main import run_matching
 
+TABLE_FILETYPES = (
+    ("CSV files", "*.csv"),
+    ("Parquet files", "*.parquet"),
+    ("Arrow files", "*.arrow *.feather"),
+    ("All files", "*.*"),
+)
+
+EVENT_POLL_MS = 100
+
 
 class MatchingGUI(tk.Tk):
     """Simple desktop wrapper around the run_matching pipeline."""
@@ -15,7 +25,7 @@ class MatchingGUI(tk.Tk):
     def __init__(self) -> None:
         super().__init__()
         self.title("Peer2Pro Matching")
-        self.geometry("640x320")
+        self.geometry("640x380")
 
         self.students_var = tk.StringVar()
         self.mentors1_var = tk.StringVar()
@@ -23,6 +33,13 @@ class MatchingGUI(tk.Tk):
         self.export_var = tk.StringVar(value=str(Path("./DATASETS/matches.csv")))
         self.n_type1_var = tk.StringVar(value="4")
         self.n_type2_var = tk.StringVar(value="")
+        self.stage_var = tk.StringVar(value="Idle")
+        self.best_var = tk.StringVar(value="")
+
+        # The worker thread never touches Tk; it posts (kind, payload) tuples
+        # here and _poll_events applies them on the Tk main loop.
+        self._events: queue.Queue = queue.Queue()
+        self._cancel_event: threading.Event | None = None
 
         self._build_layout()
 
@@ -78,14 +95,35 @@ class MatchingGUI(tk.Tk):
         )
         current_row += 1
 
+        button_frame = tk.Frame(self)
         self.run_button = tk.Button(
-            self,
+            button_frame,
             text="Run Matching",
             bg="#4caf50",
             fg="white",
             command=self._start_run,
         )
-        self.run_button.grid(row=current_row, column=0, columnspan=2, sticky="we", padx=6, pady=10)
+        self.run_button.pack(side="left", fill="x", expand=True)
+        self.cancel_button = tk.Button(
+            button_frame,
+            text="Cancel",
+            state="disabled",
+            command=self._cancel_run,
+        )
+        self.cancel_button.pack(side="right", padx=(6, 0))
+        button_frame.grid(row=current_row, column=0, columnspan=2, sticky="we", padx=6, pady=10)
+        current_row += 1
+
+        self.progress = ttk.Progressbar(self, mode="indeterminate")
+        self.progress.grid(row=current_row, column=0, columnspan=2, sticky="we", padx=6)
+        current_row += 1
+
+        tk.Label(self, textvariable=self.stage_var, anchor="w").grid(
+            row=current_row, column=0, sticky="we", padx=6, pady=(4, 0)
+        )
+        tk.Label(self, textvariable=self.best_var, anchor="w").grid(
+            row=current_row, column=1, sticky="we", padx=6, pady=(4, 0)
+        )
         current_row += 1
 
         self.log_box = tk.Text(self, height=6, state="disabled")
@@ -106,14 +144,14 @@ class MatchingGUI(tk.Tk):
         return row + 1
 
     def _set_open_path(self, variable: tk.StringVar) -> None:
-        path = filedialog.askopenfilename(filetypes=(("CSV files", "*.csv"), ("All files", "*.*")))
+        path = filedialog.askopenfilename(filetypes=TABLE_FILETYPES)
         if path:
             variable.set(path)
 
     def _set_save_path(self, variable: tk.StringVar) -> None:
         path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=(("CSV files", "*.csv"), ("All files", "*.*")),
+            filetypes=TABLE_FILETYPES,
         )
         if path:
             variable.set(path)
@@ -158,30 +196,89 @@ class MatchingGUI(tk.Tk):
             export_path=self.export_var.get(),
         )
 
+        self._cancel_event = threading.Event()
+        run_args.update(
+            on_stage=lambda message: self._events.put(("stage", message)),
+            on_improvement=lambda matched, cost: self._events.put(("improvement", (matched, cost))),
+            cancel_event=self._cancel_event,
+        )
+
         self.run_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.best_var.set("")
+        self.progress.start(10)
         self._append_log("Starting matching...")
 
         thread = threading.Thread(target=self._run_matching_thread, args=(run_args,), daemon=True)
         thread.start()
+        self.after(EVENT_POLL_MS, self._poll_events)
+
+    def _cancel_run(self) -> None:
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self.cancel_button.config(state="disabled")
+            self._append_log("Cancelling - exporting the best matching found so far, if any...")
 
     def _run_matching_thread(self, run_args: dict) -> None:
         try:
             result = run_matching(**run_args)
-            self._append_log("Matching completed.")
-            if result is None:
-                self._append_log("No matches returned.")
-            else:
-                self._append_log(f"Matches exported to: {run_args['export_path']}")
-            messagebox.showinfo("Done", "Matching finished successfully.")
+            self._events.put(("done", (result, run_args["export_path"])))
         except SystemExit as exc:
-            self._append_log(f"SystemExit: {exc}")
-            messagebox.showerror("Error", str(exc))
+            self._events.put(("error", (f"SystemExit: {exc}", str(exc))))
         except Exception as exc:  # noqa: BLE001
             tb = traceback.format_exc()
-            self._append_log("Error during matching:\n" + tb)
-            messagebox.showerror("Error", f"An error occurred:\n{exc}")
-        finally:
-            self.run_button.config(state="normal")
+            self._events.put(("error", ("Error during matching:\n" + tb, f"An error occurred:\n{exc}")))
+
+    def _poll_events(self) -> None:
+        finished = False
+        while True:
+            try:
+                kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "stage":
+                self.stage_var.set(payload)
+                self._append_log(payload + "...")
+            elif kind == "improvement":
+                matched, cost = payload
+                self.best_var.set(f"Best so far: {matched} students matched (cost {list(cost)})")
+            elif kind == "done":
+                result, export_path = payload
+                cancelled = self._cancel_event is not None and self._cancel_event.is_set()
+                self._append_log("Matching cancelled." if cancelled else "Matching completed.")
+                if result is None:
+                    self._append_log("No matches returned; nothing was exported.")
+                else:
+                    self._append_log(f"Matches exported to: {export_path}")
+                self._finish_run()
+                if cancelled and result is None:
+                    messagebox.showinfo(
+                        "Cancelled", "Matching cancelled before a matching was found; nothing was exported."
+                    )
+                elif cancelled:
+                    messagebox.showinfo(
+                        "Cancelled", f"Matching cancelled; the best matching so far was exported to {export_path}."
+                    )
+                else:
+                    messagebox.showinfo("Done", "Matching finished successfully.")
+                finished = True
+            elif kind == "error":
+                log_message, dialog_message = payload
+                self._append_log(log_message)
+                self._finish_run()
+                messagebox.showerror("Error", dialog_message)
+                finished = True
+
+        if not finished:
+            self.after(EVENT_POLL_MS, self._poll_events)
+
+    def _finish_run(self) -> None:
+        self.progress.stop()
+        self.stage_var.set("Idle")
+        self.run_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        self._cancel_event = None
 
 
 def main() -> None:
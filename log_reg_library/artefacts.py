@@ -0,0 +1,301 @@
+"""Pickle-free artefact format and NumPy inference for the classifier heads.
+
+Logistic-regression heads are stored as ``.npz`` files holding the
+coefficients, intercepts, class values and label names. The TF-IDF fast path
+of :mod:`log_reg_library.tiered` is an ``.npz`` file too, with the vocabulary
+and IDF weights next to its logistic-regression coefficients. XGBoost heads are
+stored in XGBoost's native ``.json``/``.ubj`` format with the label names
+kept as a booster attribute. Loading either format does not import
+scikit-learn, unpickles nothing, and gives every worker process a fast cold
+start. The heads expose ``predict``/``predict_proba`` and come with a
+:class:`LabelDecoder`, so they drop into :class:`LogRegEmbeddingClassifier`
+in place of the sklearn estimator and label encoder.
+
+Convert existing pickles with ``python -m log_reg_library.artefacts --help``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+NPZ_SUFFIXES = (".npz",)
+XGBOOST_SUFFIXES = (".json", ".ubj")
+LABELS_ATTRIBUTE = "peer2pro_labels"
+
+
+def _probabilities(scores: np.ndarray) -> np.ndarray:
+	"""Softmax (or the binary sigmoid) of logistic-regression decision scores."""
+
+	if scores.shape[1] == 1:
+		positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+		return np.column_stack([1.0 - positive, positive])
+	scores = scores - scores.max(axis=1, keepdims=True)
+	np.exp(scores, out=scores)
+	scores /= scores.sum(axis=1, keepdims=True)
+	return scores
+
+
+def _best_class(scores: np.ndarray) -> np.ndarray:
+	"""Column of the winning class; the softmax does not change the argmax."""
+
+	if scores.shape[1] == 1:
+		return (scores[:, 0] > 0).astype(np.intp)
+	return scores.argmax(axis=1)
+
+
+@dataclass
+class LabelDecoder:
+	"""Minimal stand-in for sklearn's ``LabelEncoder`` at inference time."""
+
+	classes_: np.ndarray
+
+	def inverse_transform(self, indices) -> np.ndarray:
+		return self.classes_[np.asarray(indices, dtype=np.intp)]
+
+	def transform(self, labels) -> np.ndarray:
+		lookup = {label: index for index, label in enumerate(self.classes_.tolist())}
+		return np.asarray([lookup[label] for label in labels], dtype=np.intp)
+
+
+@dataclass
+class NumpyLogRegHead:
+	"""Logistic-regression inference with plain NumPy."""
+
+	coef: np.ndarray
+	intercept: np.ndarray
+	classes_: np.ndarray
+
+	def decision_function(self, X: np.ndarray) -> np.ndarray:
+		return np.asarray(X, dtype=self.coef.dtype) @ self.coef.T + self.intercept
+
+	def predict_proba(self, X: np.ndarray) -> np.ndarray:
+		return _probabilities(self.decision_function(X))
+
+	def predict(self, X: np.ndarray) -> np.ndarray:
+		return self.classes_[_best_class(self.decision_function(X))]
+
+
+@dataclass
+class NumpyTfidfHead:
+	"""TF-IDF features plus logistic regression on raw descriptions, without scikit-learn.
+
+	Reproduces ``TfidfVectorizer`` with word n-grams, lowercasing, l2 norm and
+	optional sublinear tf; :func:`export_tfidf` rejects other settings.
+	"""
+
+	vocabulary: Dict[str, int]
+	idf: np.ndarray
+	head: NumpyLogRegHead
+	ngram_range: tuple[int, int] = (1, 1)
+	sublinear_tf: bool = False
+	token_pattern: str = r"(?u)\b\w\w+\b"
+	_pattern: re.Pattern = field(init=False, repr=False)
+
+	def __post_init__(self) -> None:
+		self._pattern = re.compile(self.token_pattern)
+
+	@property
+	def classes_(self) -> np.ndarray:
+		return self.head.classes_
+
+	def _terms(self, text: str) -> List[str]:
+		tokens = self._pattern.findall(text.lower())
+		low, high = self.ngram_range
+		return [
+			" ".join(tokens[start : start + n])
+			for n in range(low, high + 1)
+			for start in range(len(tokens) - n + 1)
+		]
+
+	def decision_function(self, descriptions: Sequence[str]) -> np.ndarray:
+		scores = np.tile(self.head.intercept.astype(np.float64), (len(descriptions), 1))
+		coef = self.head.coef
+		for row, text in enumerate(descriptions):
+			counts = Counter(self.vocabulary[term] for term in self._terms(text) if term in self.vocabulary)
+			if not counts:
+				continue
+			columns = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+			tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+			if self.sublinear_tf:
+				tf = 1.0 + np.log(tf)
+			weights = tf * self.idf[columns]
+			weights /= np.linalg.norm(weights)
+			scores[row] += coef[:, columns] @ weights
+		return scores
+
+	def predict_proba(self, descriptions: Sequence[str]) -> np.ndarray:
+		return _probabilities(self.decision_function(list(descriptions)))
+
+	def predict(self, descriptions: Sequence[str]) -> np.ndarray:
+		return self.classes_[_best_class(self.decision_function(list(descriptions)))]
+
+
+@dataclass
+class XGBoostHead:
+	"""Inference on a native XGBoost ``Booster`` without the sklearn wrapper."""
+
+	booster: object
+	classes_: np.ndarray
+
+	def predict_proba(self, X: np.ndarray) -> np.ndarray:
+		probas = np.asarray(self.booster.inplace_predict(np.asarray(X, dtype=np.float32)))
+		if probas.ndim == 1:
+			return np.column_stack([1.0 - probas, probas])
+		return probas
+
+	def predict(self, X: np.ndarray) -> np.ndarray:
+		return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def export_logreg(model, label_encoder, path: Path | str) -> Path:
+	"""Write a fitted sklearn ``LogisticRegression`` and its label encoder to ``.npz``."""
+
+	path = Path(path)
+	path.parent.mkdir(parents=True, exist_ok=True)
+	np.savez(
+		path,
+		coef=np.asarray(model.coef_, dtype=np.float32),
+		intercept=np.asarray(model.intercept_, dtype=np.float32),
+		classes=np.asarray(model.classes_),
+		labels=np.asarray(label_encoder.classes_, dtype=str),
+	)
+	return path
+
+
+def export_tfidf(pipeline, path: Path | str) -> Path:
+	"""Write a fitted ``TfidfVectorizer`` + ``LogisticRegression`` pipeline to ``.npz``."""
+
+	vectorizer, model = pipeline.steps[0][1], pipeline.steps[-1][1]
+	params = vectorizer.get_params()
+	unsupported = {
+		"analyzer": "word",
+		"binary": False,
+		"lowercase": True,
+		"norm": "l2",
+		"preprocessor": None,
+		"stop_words": None,
+		"strip_accents": None,
+		"tokenizer": None,
+		"use_idf": True,
+	}
+	changed = sorted(key for key, value in unsupported.items() if params[key] != value)
+	if changed:
+		raise ValueError(f"TF-IDF-instellingen niet ondersteund in het .npz-formaat: {', '.join(changed)}.")
+
+	terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+	path = Path(path)
+	path.parent.mkdir(parents=True, exist_ok=True)
+	np.savez(
+		path,
+		coef=np.asarray(model.coef_, dtype=np.float64),
+		intercept=np.asarray(model.intercept_, dtype=np.float64),
+		classes=np.asarray(model.classes_, dtype=str),
+		labels=np.asarray(model.classes_, dtype=str),
+		vocabulary=np.asarray(terms, dtype=str),
+		idf=np.asarray(vectorizer.idf_, dtype=np.float64),
+		ngram_range=np.asarray(params["ngram_range"], dtype=np.int64),
+		sublinear_tf=np.asarray(params["sublinear_tf"]),
+		token_pattern=np.asarray(params["token_pattern"]),
+	)
+	return path
+
+
+def export_xgboost(model, label_encoder, path: Path | str) -> Path:
+	"""Write a fitted ``XGBClassifier`` in native format with its label names embedded."""
+
+	path = Path(path)
+	path.parent.mkdir(parents=True, exist_ok=True)
+	booster = model.get_booster()
+	booster.set_attr(**{LABELS_ATTRIBUTE: json.dumps([str(label) for label in label_encoder.classes_])})
+	booster.save_model(str(path))
+	return path
+
+
+def is_native_artefact(path: Path | str) -> bool:
+	return Path(path).suffix.lower() in NPZ_SUFFIXES + XGBOOST_SUFFIXES
+
+
+def load_head(path: Path | str) -> tuple[object, LabelDecoder]:
+	"""Load a head exported by :func:`export_logreg`, :func:`export_tfidf` or :func:`export_xgboost`."""
+
+	path = Path(path)
+	suffix = path.suffix.lower()
+	if suffix in NPZ_SUFFIXES:
+		with np.load(path, allow_pickle=False) as archive:
+			head = NumpyLogRegHead(
+				coef=archive["coef"],
+				intercept=archive["intercept"],
+				classes_=archive["classes"],
+			)
+			labels = archive["labels"]
+			if "vocabulary" in archive:
+				head = NumpyTfidfHead(
+					vocabulary={str(term): index for index, term in enumerate(archive["vocabulary"])},
+					idf=archive["idf"],
+					head=head,
+					ngram_range=tuple(int(n) for n in archive["ngram_range"]),
+					sublinear_tf=bool(archive["sublinear_tf"]),
+					token_pattern=str(archive["token_pattern"]),
+				)
+		return head, LabelDecoder(labels)
+
+	if suffix in XGBOOST_SUFFIXES:
+		import xgboost
+
+		booster = xgboost.Booster()
+		booster.load_model(str(path))
+		raw_labels = booster.attr(LABELS_ATTRIBUTE)
+		if raw_labels is None:
+			raise ValueError(f"{path} bevat geen labelnamen; exporteer het model opnieuw.")
+		labels = np.asarray(json.loads(raw_labels))
+		return XGBoostHead(booster=booster, classes_=np.arange(len(labels))), LabelDecoder(labels)
+
+	raise ValueError(f"Onbekend artefactformaat: {path.suffix}")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Convert joblib classifier pickles to the native format.")
+	parser.add_argument(
+		"--family", choices=["logreg", "tfidf", "xgboost"], required=True, help="Type of the pickled head."
+	)
+	parser.add_argument("--model", required=True, help="Path to the joblib model pickle.")
+	parser.add_argument(
+		"--label-encoder", help="Path to the joblib label-encoder pickle (not used for the tfidf pipeline)."
+	)
+	parser.add_argument(
+		"--output", required=True, help="Destination (.npz for logreg and tfidf, .json/.ubj for xgboost)."
+	)
+	args = parser.parse_args(argv)
+	if args.family != "tfidf" and not args.label_encoder:
+		parser.error(f"--label-encoder is required for --family {args.family}")
+	return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+	args = parse_args(argv)
+
+	import joblib
+
+	model = joblib.load(args.model)
+	if args.family == "tfidf":
+		print(f"Geëxporteerd naar {export_tfidf(model, args.output)}")
+		return
+
+	label_encoder = joblib.load(args.label_encoder)
+	if args.family == "logreg":
+		path = export_logreg(model, label_encoder, args.output)
+	else:
+		path = export_xgboost(model, label_encoder, args.output)
+	print(f"Geëxporteerd naar {path}")
+
+
+if __name__ == "__main__":
+	main()
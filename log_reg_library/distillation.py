@@ -0,0 +1,342 @@
+"""Distil the mpnet sentence encoder into a small multilingual student.
+
+The student (``paraphrase-multilingual-MiniLM-L12-v2`` by default, about 118M
+parameters against 278M) is trained to reproduce the teacher's sentence
+embeddings on our description corpora with a mean-squared-error loss. A
+dense projection maps the student's 384 dimensions onto the teacher's 768,
+so the student is a drop-in encoder. A logistic-regression head is then
+refitted on the student embeddings and exported as ``.npz``; both load with
+:func:`load_classifier` (``embedding_model_name`` is the student directory).
+
+The teacher embeddings come from the :class:`EmbeddingStore` cache, so
+repeated distillation runs only pay for the student.
+
+Run ``python -m log_reg_library.distillation --help`` for the command line.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .artefacts import export_logreg
+from .io import content_key, file_digest, read_table
+from .log_reg_library import DEFAULT_EMBED_MODEL, LogRegEmbeddingClassifier, load_classifier
+from .tiered import DEFAULT_TEST_SET
+from .training import DEFAULT_DATASET, EmbeddingStore, fit_logreg, prepare_training_data
+
+DEFAULT_STUDENT_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+DEFAULT_STUDENT_DIR = "nlp_model_distilled_minilm"
+DEFAULT_STUDENT_HEAD = "nlp_model_logreg_distilled.npz"
+DEFAULT_TEACHER_HEAD = "nlp_model_logreg_embeddings.npz"
+# Unlabelled descriptions are fine for distillation; the test set is never used.
+DEFAULT_CORPORA = (
+	"dummy_opdrachten_dataset.csv",
+	"dummy_opdrachten_dataset3.csv",
+	"DATASETS/dummy_opdrachten_dataset2.csv",
+	"DATASETS/dummy_opdrachten_dataset4.csv",
+	"DATASETS/studenten_met_omschrijving.csv",
+)
+
+
+@dataclass
+class DistillationResult:
+	"""Where the student and its head were written, and how well the head fits."""
+
+	student_dir: Path
+	head_path: Path
+	fingerprint: str
+	head_accuracy: float
+	train_seconds: float
+
+
+def student_fingerprint(student_dir: Path | str) -> str:
+	"""Content key of a saved student, used as its embedding-cache model name."""
+
+	files = sorted(path for path in Path(student_dir).rglob("*") if path.is_file())
+	return content_key(
+		"student", *((path.relative_to(student_dir).as_posix(), file_digest(path)) for path in files)
+	)[:16]
+
+
+def teacher_targets(
+	corpora: Sequence[Path | str],
+	*,
+	teacher_model_name: str = DEFAULT_EMBED_MODEL,
+	store: Optional[EmbeddingStore] = None,
+	text_column: str = "omschrijving",
+	show_progress: bool = True,
+) -> tuple[List[str], np.ndarray]:
+	"""Descriptions of all *corpora* with their (cached) teacher embeddings, without duplicates."""
+
+	store = store or EmbeddingStore()
+	texts: List[str] = []
+	targets: List[np.ndarray] = []
+	seen = set()
+	for corpus in corpora:
+		corpus_texts = read_table(corpus)[text_column].astype(str).tolist()
+		embeddings = store.load_or_compute(
+			corpus, teacher_model_name, text_column=text_column, show_progress=show_progress
+		)
+		for text, embedding in zip(corpus_texts, embeddings):
+			if text not in seen:
+				seen.add(text)
+				texts.append(text)
+				targets.append(np.asarray(embedding, dtype=np.float32))
+	return texts, np.stack(targets)
+
+
+def distill_student(
+	texts: Sequence[str],
+	targets: np.ndarray,
+	*,
+	student_model_name: str = DEFAULT_STUDENT_MODEL,
+	output_dir: Path | str = DEFAULT_STUDENT_DIR,
+	epochs: int = 10,
+	batch_size: int = 32,
+	learning_rate: float = 1e-4,
+	show_progress: bool = True,
+):
+	"""Train the student to reproduce *targets* for *texts* and save it to *output_dir*."""
+
+	# Imported lazily: sentence-transformers pulls in torch and sklearn.
+	from sentence_transformers import InputExample, SentenceTransformer, losses, models
+	from torch import nn
+	from torch.utils.data import DataLoader
+
+	student = SentenceTransformer(student_model_name)
+	student_dim = student.get_sentence_embedding_dimension()
+	teacher_dim = targets.shape[1]
+	if student_dim != teacher_dim:
+		projection = models.Dense(
+			in_features=student_dim, out_features=teacher_dim, activation_function=nn.Identity()
+		)
+		student = SentenceTransformer(modules=[*student, projection])
+
+	examples = [InputExample(texts=[text], label=target) for text, target in zip(texts, targets)]
+	loader = DataLoader(examples, shuffle=True, batch_size=batch_size)
+	student.fit(
+		train_objectives=[(loader, losses.MSELoss(model=student))],
+		epochs=epochs,
+		warmup_steps=max(1, len(loader) * epochs // 10),
+		optimizer_params={"lr": learning_rate},
+		show_progress_bar=show_progress,
+	)
+	Path(output_dir).mkdir(parents=True, exist_ok=True)
+	student.save(str(output_dir))
+	return student
+
+
+def distill(
+	corpora: Sequence[Path | str] = DEFAULT_CORPORA,
+	*,
+	dataset_path: Path | str = DEFAULT_DATASET,
+	teacher_model_name: str = DEFAULT_EMBED_MODEL,
+	student_model_name: str = DEFAULT_STUDENT_MODEL,
+	student_dir: Path | str = DEFAULT_STUDENT_DIR,
+	head_path: Path | str = DEFAULT_STUDENT_HEAD,
+	store: Optional[EmbeddingStore] = None,
+	epochs: int = 10,
+	batch_size: int = 32,
+	learning_rate: float = 1e-4,
+	show_progress: bool = True,
+) -> DistillationResult:
+	"""Distil the student on *corpora*, then fit and export its logistic-regression head.
+
+	The head is fitted on the training split of *dataset_path* (the same
+	stratified split as :mod:`log_reg_library.training`) and its accuracy is
+	measured on the held-out split.
+	"""
+
+	store = store or EmbeddingStore()
+	started = time.perf_counter()
+	texts, targets = teacher_targets(
+		corpora, teacher_model_name=teacher_model_name, store=store, show_progress=show_progress
+	)
+	student = distill_student(
+		texts,
+		targets,
+		student_model_name=student_model_name,
+		output_dir=student_dir,
+		epochs=epochs,
+		batch_size=batch_size,
+		learning_rate=learning_rate,
+		show_progress=show_progress,
+	)
+	train_seconds = time.perf_counter() - started
+
+	fingerprint = student_fingerprint(student_dir)
+	data = prepare_training_data(
+		dataset_path,
+		f"distilled-{fingerprint}",
+		store=store,
+		embed_model=student,
+		show_progress=show_progress,
+	)
+	head = fit_logreg(data.X_train, data.y_train)
+	accuracy = float((head.predict(data.X_test) == data.y_test).mean())
+	export_logreg(head, data.label_encoder, head_path)
+	return DistillationResult(
+		student_dir=Path(student_dir),
+		head_path=Path(head_path),
+		fingerprint=fingerprint,
+		head_accuracy=accuracy,
+		train_seconds=train_seconds,
+	)
+
+
+def _parameter_count(classifier: LogRegEmbeddingClassifier) -> int:
+	return sum(parameter.numel() for parameter in classifier.embed_model.parameters())
+
+
+def measure_classifier(
+	classifier: LogRegEmbeddingClassifier,
+	test_set: Path | str = DEFAULT_TEST_SET,
+	*,
+	description_column: str = "omschrijving",
+	label_column: str = "onderwerp",
+	throughput_samples: int = 256,
+	batch_size: int = 32,
+) -> Dict[str, float]:
+	"""Accuracy on *test_set* and single-thread throughput of encoder plus head.
+
+	Throughput is measured with ``torch.set_num_threads(1)`` so it reads as
+	descriptions per second per CPU core; the previous thread count is
+	restored afterwards.
+	"""
+
+	import torch
+
+	df = read_table(test_set)
+	descriptions = df[description_column].astype(str).tolist()
+	labels, _ = classifier.predict_descriptions(descriptions)
+	# The test CSV spells the minors in lower case.
+	truth = df[label_column].astype(str).str.casefold().to_numpy()
+	correct = np.char.lower(np.asarray(labels, dtype=str)) == truth
+
+	repeats = -(-throughput_samples // max(1, len(descriptions)))
+	workload = (descriptions * repeats)[:throughput_samples]
+	threads = torch.get_num_threads()
+	torch.set_num_threads(1)
+	try:
+		classifier.predict_descriptions(workload[:batch_size])  # warm-up
+		start = time.perf_counter()
+		for offset in range(0, len(workload), batch_size):
+			classifier.predict_descriptions(workload[offset : offset + batch_size])
+		seconds = time.perf_counter() - start
+	finally:
+		torch.set_num_threads(threads)
+
+	return {
+		"parameters": float(_parameter_count(classifier)),
+		"accuracy": float(correct.mean()) if len(df) else 0.0,
+		"per_core_per_second": len(workload) / seconds if seconds else float("inf"),
+	}
+
+
+def compare_report(
+	test_set: Path | str = DEFAULT_TEST_SET,
+	*,
+	teacher_head: Path | str = DEFAULT_TEACHER_HEAD,
+	teacher_model_name: str = DEFAULT_EMBED_MODEL,
+	student_head: Path | str = DEFAULT_STUDENT_HEAD,
+	student_dir: Path | str = DEFAULT_STUDENT_DIR,
+	throughput_samples: int = 256,
+) -> pd.DataFrame:
+	"""Teacher against student: parameters, test accuracy and throughput per core."""
+
+	rows = []
+	for name, head, encoder in (
+		("teacher", teacher_head, teacher_model_name),
+		("student", student_head, str(student_dir)),
+	):
+		classifier = load_classifier(model_path=head, embedding_model_name=encoder)
+		rows.append({"model": name, **measure_classifier(classifier, test_set, throughput_samples=throughput_samples)})
+
+	report = pd.DataFrame(rows)
+	report["parameters"] = report["parameters"].astype(int)
+	report["speedup"] = report["per_core_per_second"] / report.loc[0, "per_core_per_second"]
+	return report
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Distil the embedding model into a small student and compare them.")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+
+	train = subparsers.add_parser("distill", help="Train the student encoder and its logistic-regression head.")
+	train.add_argument(
+		"--corpora",
+		nargs="+",
+		default=list(DEFAULT_CORPORA),
+		help="Tables with an 'omschrijving' column to distil on (default: the dummy datasets and studenten).",
+	)
+	train.add_argument(
+		"--dataset", default=DEFAULT_DATASET, help=f"Labelled table for the head (default: {DEFAULT_DATASET})."
+	)
+	train.add_argument(
+		"--student-model",
+		default=DEFAULT_STUDENT_MODEL,
+		help=f"SentenceTransformer to start the student from (default: {DEFAULT_STUDENT_MODEL}).",
+	)
+	train.add_argument(
+		"--student-dir", default=DEFAULT_STUDENT_DIR, help=f"Output directory (default: {DEFAULT_STUDENT_DIR})."
+	)
+	train.add_argument(
+		"--head", default=DEFAULT_STUDENT_HEAD, help=f"Output .npz head (default: {DEFAULT_STUDENT_HEAD})."
+	)
+	train.add_argument("--epochs", type=int, default=10, help="Distillation epochs (default: 10).")
+	train.add_argument("--batch-size", type=int, default=32, help="Batch size (default: 32).")
+	train.add_argument("--learning-rate", type=float, default=1e-4, help="Learning rate (default: 1e-4).")
+
+	report = subparsers.add_parser("report", help="Compare teacher and student on the test set.")
+	report.add_argument("--test-set", default=DEFAULT_TEST_SET, help=f"Labelled table (default: {DEFAULT_TEST_SET}).")
+	report.add_argument("--teacher-head", default=DEFAULT_TEACHER_HEAD, help="Teacher .npz head.")
+	report.add_argument("--student-dir", default=DEFAULT_STUDENT_DIR, help="Distilled student directory.")
+	report.add_argument("--student-head", default=DEFAULT_STUDENT_HEAD, help="Student .npz head.")
+	report.add_argument(
+		"--throughput-samples",
+		type=int,
+		default=256,
+		help="Descriptions classified for the throughput measurement (default: 256).",
+	)
+	return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+	args = parse_args(argv)
+
+	if args.command == "distill":
+		result = distill(
+			args.corpora,
+			dataset_path=args.dataset,
+			student_model_name=args.student_model,
+			student_dir=args.student_dir,
+			head_path=args.head,
+			epochs=args.epochs,
+			batch_size=args.batch_size,
+			learning_rate=args.learning_rate,
+		)
+		print(
+			f"Student opgeslagen in {result.student_dir} ({result.train_seconds:.0f}s), "
+			f"head in {result.head_path}; accuracy op de testsplit {result.head_accuracy:.3f}"
+		)
+		return
+
+	report = compare_report(
+		args.test_set,
+		teacher_head=args.teacher_head,
+		student_head=args.student_head,
+		student_dir=args.student_dir,
+		throughput_samples=args.throughput_samples,
+	)
+	print(report.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+
+
+if __name__ == "__main__":
+	main()
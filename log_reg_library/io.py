@@ -0,0 +1,26 @@
+"""Table I/O and content hashing for the classifier library.
+
+Re-exported from :mod:`peer2pro_io`, which :mod:`matching` uses as well, so
+cache keys and table output are identical in both packages and the
+classifier can be used and trained without the solver package.
+"""
+
+from peer2pro_io import (
+	ARROW_SUFFIXES,
+	PARQUET_SUFFIXES,
+	content_key,
+	file_digest,
+	read_table,
+	table_format,
+	write_table,
+)
+
+__all__ = [
+	"ARROW_SUFFIXES",
+	"PARQUET_SUFFIXES",
+	"content_key",
+	"file_digest",
+	"read_table",
+	"table_format",
+	"write_table",
+]
@@ -6,67 +6,124 @@ prediction workflow can be imported from other modules or notebooks.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence
 
 import joblib
 import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
+
+from .artefacts import is_native_artefact, load_head
+from .io import read_table, table_format, write_table
+
+if TYPE_CHECKING:
+	from sentence_transformers import SentenceTransformer
+
+	from .parallel import ParallelEncoder
 
 DEFAULT_EMBED_MODEL = "paraphrase-multilingual-mpnet-base-v2"
 
 
 @dataclass
 class LogRegEmbeddingClassifier:
-	"""Wraps the trained logistic-regression pipeline and label encoder."""
+	"""Wraps the trained logistic-regression pipeline and label encoder.
+
+	With ``encode_workers`` above 1, large batches are encoded in that many
+	forked processes with ``threads_per_worker`` torch threads each (see
+	:mod:`log_reg_library.parallel`).
+	"""
 
 	model: object
 	label_encoder: object
-	embed_model: SentenceTransformer
+	embed_model: "SentenceTransformer"
+	encode_workers: int = 1
+	threads_per_worker: Optional[int] = None
+	_parallel: Optional["ParallelEncoder"] = field(default=None, init=False, repr=False)
 
 	@classmethod
 	def from_files(
 		cls,
 		model_path: Path | str,
-		label_encoder_path: Path | str,
+		label_encoder_path: Optional[Path | str] = None,
 		embedding_model_name: str = DEFAULT_EMBED_MODEL,
 		*,
-		embed_model: Optional[SentenceTransformer] = None,
+		embed_model: Optional["SentenceTransformer"] = None,
+		encode_workers: int = 1,
+		threads_per_worker: Optional[int] = None,
 	) -> "LogRegEmbeddingClassifier":
-		"""Construct an instance by loading artefacts from disk."""
-
-		model = joblib.load(Path(model_path))
-		label_encoder = joblib.load(Path(label_encoder_path))
-		embedder = embed_model or SentenceTransformer(embedding_model_name)
-		return cls(model=model, label_encoder=label_encoder, embed_model=embedder)
+		"""Construct an instance by loading artefacts from disk.
+
+		Native ``.npz``/``.json``/``.ubj`` heads (see :mod:`log_reg_library.artefacts`)
+		carry their own label names; ``label_encoder_path`` is only needed for
+		joblib pickles.
+		"""
+
+		model, label_encoder = load_model_and_labels(model_path, label_encoder_path)
+		if embed_model is None:
+			# Imported lazily: sentence-transformers pulls in torch and sklearn.
+			from sentence_transformers import SentenceTransformer
+
+			embed_model = SentenceTransformer(embedding_model_name)
+		return cls(
+			model=model,
+			label_encoder=label_encoder,
+			embed_model=embed_model,
+			encode_workers=encode_workers,
+			threads_per_worker=threads_per_worker,
+		)
 
 	def encode(self, descriptions: Sequence[str], *, show_progress: bool = False) -> np.ndarray:
 		"""Generate sentence embeddings for the provided descriptions."""
 
 		if not descriptions:
 			return np.empty((0, self.embed_model.get_sentence_embedding_dimension()))
+		if self.encode_workers > 1:
+			if self._parallel is None:
+				from .parallel import ParallelEncoder
+
+				self._parallel = ParallelEncoder(
+					self.embed_model, self.encode_workers, threads_per_worker=self.threads_per_worker
+				)
+			return self._parallel.encode(descriptions, show_progress=show_progress)
 		return self.embed_model.encode(
 			list(descriptions), show_progress_bar=show_progress, convert_to_numpy=True
 		)
 
-	def predict_descriptions(
+	def close(self) -> None:
+		"""Stop the encoding worker processes, if any were started."""
+
+		if self._parallel is not None:
+			self._parallel.close()
+			self._parallel = None
+
+	def predict_codes(
 		self,
 		descriptions: Sequence[str],
 		*,
 		show_progress: bool = False,
-	) -> tuple[List[str], np.ndarray]:
-		"""Predict labels and return per-sample probability distributions."""
+	) -> tuple[np.ndarray, np.ndarray]:
+		"""Predict label-encoder indices and return per-sample probability distributions."""
 
 		embeddings = self.encode(descriptions, show_progress=show_progress)
 		if embeddings.size == 0:
-			return [], np.empty((0, 0))
-
-		pred_indices = self.model.predict(embeddings)
-		predicted_labels = self.label_encoder.inverse_transform(pred_indices)
+			return np.empty(0, dtype=np.intp), np.empty((0, 0))
 		probabilities = self.model.predict_proba(embeddings)
-		return list(predicted_labels), probabilities
+		codes = np.asarray(self.model.classes_, dtype=np.intp)[probabilities.argmax(axis=1)]
+		return codes, probabilities
+
+	def predict_descriptions(
+		self,
+		descriptions: Sequence[str],
+		*,
+		show_progress: bool = False,
+	) -> tuple[List[str], np.ndarray]:
+		"""Predict labels and return per-sample probability distributions."""
+
+		pred_indices, probabilities = self.predict_codes(descriptions, show_progress=show_progress)
+		if pred_indices.size == 0:
+			return [], probabilities
+		return list(self.label_encoder.inverse_transform(pred_indices)), probabilities
 
 	def predict_single(self, description: str) -> tuple[str, float]:
 		"""Predict a label for one description and return (label, confidence)."""
@@ -86,30 +143,55 @@ class LogRegEmbeddingClassifier:
 		confidence_column: str = "zekerheid_%",
 		fill_column: Optional[str] = None,
 		show_progress: bool = False,
+		copy: bool = True,
+		categorical: bool = False,
 	) -> pd.DataFrame:
-		"""Return a copy of *df* with predictions and confidence columns added."""
+		"""Return a copy of *df* with predictions and confidence columns added.
+
+		With ``copy=False`` the columns are added to a shallow copy that shares
+		the data of *df* instead of duplicating it. ``categorical`` stores the
+		predictions as a categorical column built directly from the label codes,
+		without materializing one string per row.
+		"""
 
 		if description_column not in df.columns:
 			raise ValueError(f"CSV mist verplichte kolom '{description_column}'.")
 
 		descriptions = df[description_column].astype(str).tolist()
-		labels, probas = self.predict_descriptions(descriptions, show_progress=show_progress)
+		codes, probas = self.predict_codes(descriptions, show_progress=show_progress)
 		scores = probas.max(axis=1) if probas.size else np.array([])
 
-		enriched = df.copy()
-		enriched[prediction_column] = labels
+		enriched = df.copy(deep=copy)
+		if categorical:
+			enriched[prediction_column] = pd.Categorical.from_codes(
+				codes, categories=list(self.label_encoder.classes_)
+			)
+		else:
+			enriched[prediction_column] = self.label_encoder.inverse_transform(codes) if codes.size else []
 		enriched[confidence_column] = np.round(scores * 100, 2)
 		if fill_column:
 			enriched[fill_column] = enriched[prediction_column]
 		return enriched
 
 
+def load_model_and_labels(model_path: Path | str, label_encoder_path: Optional[Path | str] = None) -> tuple:
+	"""Load a classifier head and its label encoder without the sentence encoder."""
+
+	if is_native_artefact(model_path):
+		return load_head(model_path)
+	if label_encoder_path is None:
+		raise ValueError("Een label encoder is verplicht bij een joblib-model.")
+	return joblib.load(Path(model_path)), joblib.load(Path(label_encoder_path))
+
+
 def load_classifier(
 	model_path: Path | str,
-	label_encoder_path: Path | str,
+	label_encoder_path: Optional[Path | str] = None,
 	embedding_model_name: str = DEFAULT_EMBED_MODEL,
 	*,
-	embed_model: Optional[SentenceTransformer] = None,
+	embed_model: Optional["SentenceTransformer"] = None,
+	encode_workers: int = 1,
+	threads_per_worker: Optional[int] = None,
 ) -> LogRegEmbeddingClassifier:
 	"""Helper that mirrors the original script's artefact loading logic."""
 
@@ -118,6 +200,8 @@ def load_classifier(
 		label_encoder_path=label_encoder_path,
 		embedding_model_name=embedding_model_name,
 		embed_model=embed_model,
+		encode_workers=encode_workers,
+		threads_per_worker=threads_per_worker,
 	)
 
 
@@ -129,16 +213,31 @@ def predict_to_csv(
 	description_column: str = "omschrijving",
 	show_progress: bool = True,
 ) -> pd.DataFrame:
-	"""Load a CSV, annotate it with predictions, and persist the result."""
+	"""Load a table, annotate it with predictions, and persist the result.
+
+	Input and output may be CSV, Parquet or Arrow; the format follows the file
+	suffix. Columnar output stores the predicted label as a categorical column
+	plus a stable integer ``voorspeld_onderwerp_id`` (the label-encoder index).
+	"""
 
-	df = pd.read_csv(csv_path)
+	df = read_table(csv_path)
 	enriched = classifier.annotate_dataframe(
 		df,
 		description_column=description_column,
 		show_progress=show_progress,
+		copy=False,
 	)
 	Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-	enriched.to_csv(output_path, index=False)
+	if table_format(output_path) == "csv":
+		enriched.to_csv(output_path, index=False)
+		return enriched
+
+	labels = enriched["voorspeld_onderwerp"]
+	columnar = enriched.assign(
+		voorspeld_onderwerp=pd.Categorical(labels, categories=list(classifier.label_encoder.classes_)),
+		voorspeld_onderwerp_id=np.asarray(classifier.label_encoder.transform(labels), dtype=np.int32),
+	)
+	write_table(columnar, output_path)
 	return enriched
 
 
@@ -146,5 +245,6 @@ __all__ = [
 	"DEFAULT_EMBED_MODEL",
 	"LogRegEmbeddingClassifier",
 	"load_classifier",
+	"load_model_and_labels",
 	"predict_to_csv",
 ]
@@ -0,0 +1,476 @@
+"""Cross-validated hyperparameter search over cached embeddings.
+
+Each classifier family is searched on the cached embedding matrix of the
+model its production artefacts embed with (``FAMILY_EMBED_MODELS`` in
+:mod:`log_reg_library.training`). Folds run in parallel joblib workers, which
+receive the memory-mapped matrix by reference instead of a copy. Every
+candidate is reported with its accuracy, its end-to-end latency (encoder plus
+the native head production loads) and the size of its native artefact. The
+selected model is the most accurate one within a latency budget, and the
+Pareto front of accuracy and latency is marked for other budgets.
+
+Run ``python -m log_reg_library.model_selection --help`` for the command line.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+
+from .artefacts import load_head
+from .io import read_table, write_table
+from .training import (
+	DEFAULT_ARTEFACTS,
+	DEFAULT_CACHE_DIR,
+	DEFAULT_DATASET,
+	FAMILY_EMBED_MODELS,
+	MODEL_FAMILIES,
+	NATIVE_ARTEFACTS,
+	EmbeddingStore,
+	TrainedModel,
+	TrainingData,
+	check_artefact_model,
+	prepare_training_data,
+	save_model,
+	save_native,
+)
+
+PARAM_GRIDS: Dict[str, Dict[str, List[object]]] = {
+	"logreg": {
+		"C": [0.1, 1.0, 10.0],
+		"max_iter": [500, 2000],
+	},
+	"xgboost": {
+		"n_estimators": [100, 300],
+		"max_depth": [3, 6],
+		"learning_rate": [0.1, 0.3],
+	},
+}
+# Encoder plus head per description, batched; the sentence encoder dominates.
+DEFAULT_MAX_LATENCY_US = 20_000.0
+
+
+@dataclass(frozen=True)
+class Candidate:
+	family: str
+	params: tuple[tuple[str, object], ...]
+
+	@property
+	def kwargs(self) -> Dict[str, object]:
+		return dict(self.params)
+
+	def label(self) -> str:
+		settings = ", ".join(f"{key}={value}" for key, value in self.params)
+		return f"{self.family}({settings})"
+
+
+@dataclass
+class CandidateResult:
+	family: str
+	params: str
+	cv_accuracy: float
+	cv_std: float
+	test_accuracy: float
+	encoder_us_per_sample: float
+	head_us_per_sample: float
+	latency_us_per_sample: float
+	single_latency_ms: float
+	artefact_bytes: int
+	fit_seconds: float
+
+
+def expand_grid(grids: Mapping[str, Mapping[str, Sequence[object]]], families: Sequence[str]) -> List[Candidate]:
+	"""Return one candidate per parameter combination of each requested family."""
+
+	candidates: List[Candidate] = []
+	for family in families:
+		grid = grids.get(family, {})
+		keys = sorted(grid)
+		for values in itertools.product(*(grid[key] for key in keys)):
+			candidates.append(Candidate(family, tuple(zip(keys, values))))
+	return candidates
+
+
+def _worker_params(family: str, params: Mapping[str, object]) -> Dict[str, object]:
+	# Parallelism comes from joblib; keep each fit single-threaded.
+	if family == "xgboost":
+		return {"n_jobs": 1, **params}
+	return dict(params)
+
+
+def _fit_and_score(
+	X: np.ndarray,
+	y: np.ndarray,
+	train_index: np.ndarray,
+	valid_index: np.ndarray,
+	candidate: Candidate,
+) -> float:
+	estimator = MODEL_FAMILIES[candidate.family](
+		X[train_index], y[train_index], **_worker_params(candidate.family, candidate.kwargs)
+	)
+	return float(accuracy_score(y[valid_index], estimator.predict(X[valid_index])))
+
+
+def _fit_full(X: np.ndarray, y: np.ndarray, candidate: Candidate):
+	start = time.perf_counter()
+	estimator = MODEL_FAMILIES[candidate.family](
+		X, y, **_worker_params(candidate.family, candidate.kwargs)
+	)
+	return estimator, time.perf_counter() - start
+
+
+def cross_validate(
+	data: TrainingData,
+	candidates: Sequence[Candidate],
+	*,
+	folds: int = 5,
+	sample_fraction: float = 1.0,
+	n_jobs: int = -1,
+	random_state: int = 42,
+) -> Dict[Candidate, np.ndarray]:
+	"""Score every candidate on stratified folds of (a subsample of) the training split."""
+
+	rows = data.train_index
+	if sample_fraction < 1.0:
+		rng = np.random.default_rng(random_state)
+		size = max(folds * len(data.label_encoder.classes_), int(len(rows) * sample_fraction))
+		rows = np.sort(rng.choice(rows, size=min(size, len(rows)), replace=False))
+
+	y = data.labels
+	splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=random_state)
+	splits = [(rows[train], rows[valid]) for train, valid in splitter.split(rows, y[rows])]
+
+	jobs = [(candidate, split) for candidate in candidates for split in splits]
+	scores = Parallel(n_jobs=n_jobs)(
+		delayed(_fit_and_score)(data.embeddings, y, train, valid, candidate)
+		for candidate, (train, valid) in jobs
+	)
+
+	per_candidate: Dict[Candidate, List[float]] = {candidate: [] for candidate in candidates}
+	for (candidate, _), score in zip(jobs, scores):
+		per_candidate[candidate].append(score)
+	return {candidate: np.asarray(values) for candidate, values in per_candidate.items()}
+
+
+def successive_halving(
+	data: TrainingData,
+	candidates: Sequence[Candidate],
+	*,
+	folds: int = 5,
+	eta: int = 3,
+	min_fraction: float = 0.2,
+	n_jobs: int = -1,
+	random_state: int = 42,
+	verbose: bool = True,
+) -> Dict[Candidate, np.ndarray]:
+	"""Keep the best ``1/eta`` candidates per round while growing the sample size."""
+
+	survivors = list(candidates)
+	rounds = max(1, math.ceil(math.log(max(len(survivors), 1), eta)))
+	scores: Dict[Candidate, np.ndarray] = {}
+	for round_index in range(rounds + 1):
+		fraction = min(1.0, min_fraction * eta**round_index)
+		if round_index == rounds:
+			fraction = 1.0
+		scores = cross_validate(
+			data,
+			survivors,
+			folds=folds,
+			sample_fraction=fraction,
+			n_jobs=n_jobs,
+			random_state=random_state,
+		)
+		if verbose:
+			print(f"Ronde {round_index + 1}: {len(survivors)} kandidaten op {fraction:.0%} van de data")
+		if fraction >= 1.0 or len(survivors) <= 1:
+			break
+		keep = max(1, math.ceil(len(survivors) / eta))
+		survivors = sorted(survivors, key=lambda cand: scores[cand].mean(), reverse=True)[:keep]
+	return scores
+
+
+def measure_latency(predict_proba: Callable[[object], np.ndarray], inputs, *, repeats: int = 5) -> tuple[float, float]:
+	"""Return (µs per sample for a batched call, ms for a single-sample call) of *predict_proba*."""
+
+	predict_proba(inputs[:1])  # warm-up
+
+	batch_times = []
+	for _ in range(repeats):
+		start = time.perf_counter()
+		predict_proba(inputs)
+		batch_times.append(time.perf_counter() - start)
+
+	single_times = []
+	for position in range(min(len(inputs), 50)):
+		start = time.perf_counter()
+		predict_proba(inputs[position : position + 1])
+		single_times.append(time.perf_counter() - start)
+
+	return (
+		float(np.median(batch_times) / len(inputs) * 1e6),
+		float(np.median(single_times) * 1e3),
+	)
+
+
+def load_encoder(model_name: str) -> Callable[[Sequence[str]], np.ndarray]:
+	"""Return the ``encode`` function of a SentenceTransformer, as the classifiers call it."""
+
+	from sentence_transformers import SentenceTransformer
+
+	model = SentenceTransformer(model_name)
+	return lambda texts: model.encode(list(texts), show_progress_bar=False, convert_to_numpy=True)
+
+
+def pareto_front(table: pd.DataFrame) -> pd.Series:
+	"""True for rows that no other row beats on both accuracy and latency."""
+
+	accuracy = table["cv_accuracy"].to_numpy()
+	latency = table["latency_us_per_sample"].to_numpy()
+	dominated = [
+		bool(np.any((accuracy >= acc) & (latency <= lat) & ((accuracy > acc) | (latency < lat))))
+		for acc, lat in zip(accuracy, latency)
+	]
+	return ~pd.Series(dominated, index=table.index)
+
+
+def select_models(
+	data: Mapping[str, TrainingData],
+	candidates: Sequence[Candidate],
+	*,
+	texts: Sequence[str],
+	encoders: Mapping[str, Callable[[Sequence[str]], np.ndarray]],
+	search: str = "grid",
+	folds: int = 5,
+	n_jobs: int = -1,
+	max_latency_us: Optional[float] = DEFAULT_MAX_LATENCY_US,
+	timing_samples: int = 200,
+	verbose: bool = True,
+) -> tuple[pd.DataFrame, Optional[TrainedModel]]:
+	"""Search *candidates* and return the result table plus the selected model.
+
+	``data`` holds each family's training data, embedded with the model its
+	production artefacts use (see ``FAMILY_EMBED_MODELS``), and ``encoders``
+	the matching encode functions. The splits must agree, which they do for
+	data prepared from the same table.
+
+	Finalists are refitted on the full training split in parallel and
+	exported to the native format production loads. Latency is then measured
+	sequentially on up to ``timing_samples`` raw test descriptions: the
+	family's encoder plus the :func:`~log_reg_library.artefacts.load_head`
+	head, per sample. The selected model is the most accurate finalist (by
+	cross-validated accuracy) within ``max_latency_us`` microseconds per
+	sample, batched; ``None`` disables the budget. The ``pareto`` column marks
+	the accuracy/latency trade-offs worth considering for another budget.
+	"""
+
+	if search not in ("grid", "halving"):
+		raise ValueError(f"Onbekende zoekmethode '{search}'. Kies 'grid' of 'halving'.")
+	splits = {(tuple(family_data.train_index), tuple(family_data.test_index)) for family_data in data.values()}
+	if len(splits) > 1:
+		raise ValueError("De families hebben verschillende train/test-splitsingen; gebruik dezelfde dataset.")
+
+	scores: Dict[Candidate, np.ndarray] = {}
+	for family in dict.fromkeys(candidate.family for candidate in candidates):
+		family_candidates = [candidate for candidate in candidates if candidate.family == family]
+		if search == "halving":
+			scores.update(
+				successive_halving(data[family], family_candidates, folds=folds, n_jobs=n_jobs, verbose=verbose)
+			)
+		else:
+			scores.update(cross_validate(data[family], family_candidates, folds=folds, n_jobs=n_jobs))
+
+	finalists = list(scores)
+	fitted = Parallel(n_jobs=n_jobs)(
+		delayed(_fit_full)(data[candidate.family].X_train, data[candidate.family].y_train, candidate)
+		for candidate in finalists
+	)
+
+	timing_texts = list(texts)[:timing_samples]
+	encoder_latency = {
+		family: measure_latency(encoders[family], timing_texts, repeats=1)
+		for family in dict.fromkeys(candidate.family for candidate in finalists)
+	}
+
+	results: List[CandidateResult] = []
+	estimators = {}
+	with tempfile.TemporaryDirectory() as export_dir:
+		for number, (candidate, (estimator, fit_seconds)) in enumerate(zip(finalists, fitted)):
+			family_data = data[candidate.family]
+			trained = TrainedModel(candidate.family, estimator, candidate.kwargs, 0.0, "", fit_seconds)
+			path = save_native(
+				trained,
+				family_data.label_encoder,
+				Path(export_dir) / f"{number}{Path(NATIVE_ARTEFACTS[candidate.family]).suffix}",
+			)
+			head, _ = load_head(path)
+			X_test = np.ascontiguousarray(family_data.X_test, dtype=np.float32)
+			head_us, head_single_ms = measure_latency(head.predict_proba, X_test[:timing_samples])
+			encoder_us, encoder_single_ms = encoder_latency[candidate.family]
+			results.append(
+				CandidateResult(
+					family=candidate.family,
+					params=candidate.label(),
+					cv_accuracy=float(scores[candidate].mean()),
+					cv_std=float(scores[candidate].std()),
+					test_accuracy=float(accuracy_score(family_data.y_test, head.predict(X_test))),
+					encoder_us_per_sample=encoder_us,
+					head_us_per_sample=head_us,
+					latency_us_per_sample=encoder_us + head_us,
+					single_latency_ms=encoder_single_ms + head_single_ms,
+					artefact_bytes=path.stat().st_size,
+					fit_seconds=fit_seconds,
+				)
+			)
+			estimators[candidate.label()] = (candidate, estimator, fit_seconds)
+
+	table = pd.DataFrame([asdict(result) for result in results])
+	table["within_budget"] = (
+		True if max_latency_us is None else table["latency_us_per_sample"] <= max_latency_us
+	)
+	table["pareto"] = pareto_front(table)
+	table = table.sort_values(
+		["within_budget", "cv_accuracy", "latency_us_per_sample"], ascending=[False, False, True]
+	).reset_index(drop=True)
+
+	eligible = table[table["within_budget"]]
+	if eligible.empty:
+		return table, None
+
+	best = eligible.iloc[0]
+	candidate, estimator, fit_seconds = estimators[best["params"]]
+	selected = TrainedModel(
+		family=candidate.family,
+		estimator=estimator,
+		params=candidate.kwargs,
+		accuracy=float(best["test_accuracy"]),
+		report="",
+		fit_seconds=fit_seconds,
+		metadata={
+			"cv_accuracy": float(best["cv_accuracy"]),
+			"latency_us_per_sample": float(best["latency_us_per_sample"]),
+		},
+	)
+	return table, selected
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Cross-validated model selection on cached embeddings.")
+	parser.add_argument("--dataset", default=DEFAULT_DATASET, help=f"Training table (default: {DEFAULT_DATASET}).")
+	parser.add_argument(
+		"--embedding-model",
+		help=(
+			"SentenceTransformer used for the embeddings of every family (default: per family, "
+			+ ", ".join(f"{family}: {model}" for family, model in FAMILY_EMBED_MODELS.items())
+			+ ")."
+		),
+	)
+	parser.add_argument(
+		"--families",
+		nargs="+",
+		choices=sorted(MODEL_FAMILIES),
+		default=["logreg", "xgboost"],
+		help="Classifier families to search (default: logreg xgboost).",
+	)
+	parser.add_argument(
+		"--search",
+		choices=["grid", "halving"],
+		default="grid",
+		help="Full grid search or successive halving (default: grid).",
+	)
+	parser.add_argument("--folds", type=int, default=5, help="Number of CV folds (default: 5).")
+	parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel joblib workers (default: all cores).")
+	parser.add_argument(
+		"--max-latency-us",
+		type=float,
+		default=DEFAULT_MAX_LATENCY_US,
+		help=(
+			"Select the most accurate model whose encoder plus head stays under this many µs per "
+			f"description, batched; 0 disables the budget (default: {DEFAULT_MAX_LATENCY_US:.0f})."
+		),
+	)
+	parser.add_argument(
+		"--timing-samples",
+		type=int,
+		default=200,
+		help="Test descriptions used to measure latency (default: 200).",
+	)
+	parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Embedding cache directory.")
+	parser.add_argument("--report-path", help="Optional CSV/Parquet path for the result table.")
+	parser.add_argument(
+		"--save-best",
+		action="store_true",
+		help="Write the selected model over the default artefact of its family.",
+	)
+	return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+	args = parse_args(argv)
+
+	store = EmbeddingStore(Path(args.cache_dir))
+	family_models = {family: args.embedding_model or FAMILY_EMBED_MODELS[family] for family in args.families}
+	data = {}
+	encoders = {}
+	for model_name in dict.fromkeys(family_models.values()):
+		family_data = prepare_training_data(args.dataset, model_name, store=store)
+		encoder = load_encoder(model_name)
+		for family, family_model in family_models.items():
+			if family_model == model_name:
+				data[family], encoders[family] = family_data, encoder
+
+	texts = read_table(args.dataset)["omschrijving"].astype(str).to_numpy()
+	first = data[args.families[0]]
+	candidates = expand_grid(PARAM_GRIDS, args.families)
+	table, selected = select_models(
+		data,
+		candidates,
+		texts=texts[first.test_index].tolist(),
+		encoders=encoders,
+		search=args.search,
+		folds=args.folds,
+		n_jobs=args.n_jobs,
+		max_latency_us=args.max_latency_us or None,
+		timing_samples=args.timing_samples,
+	)
+
+	with pd.option_context("display.max_columns", None, "display.width", 200):
+		print(table)
+
+	if args.report_path:
+		write_table(table, args.report_path)
+
+	if selected is None:
+		print("Geen model voldoet aan de latency-eis.")
+		return
+
+	print(
+		f"\nGeselecteerd: {selected.family} {selected.params} (test accuracy {selected.accuracy:.3f}, "
+		f"{selected.metadata['latency_us_per_sample']:.0f} µs per omschrijving)"
+	)
+	if args.save_best:
+		try:
+			check_artefact_model(selected.family, family_models[selected.family])
+		except ValueError as exc:
+			print(f"Niet opgeslagen: {exc}")
+			return
+		model_name, encoder_name = DEFAULT_ARTEFACTS[selected.family]
+		label_encoder = data[selected.family].label_encoder
+		save_model(selected, label_encoder, model_path=model_name, label_encoder_path=encoder_name)
+		native_path = save_native(selected, label_encoder, NATIVE_ARTEFACTS[selected.family])
+		print(f"Opgeslagen als {model_name}, {encoder_name} en {native_path}")
+
+
+if __name__ == "__main__":
+	main()
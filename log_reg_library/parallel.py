@@ -0,0 +1,213 @@
+"""Multi-process sentence encoding with a fixed torch thread count per worker.
+
+One ``SentenceTransformer.encode`` call stops scaling after a few cores, and
+several processes that each use torch's default thread count oversubscribe
+the machine. :class:`ParallelEncoder` shards a batch of descriptions over
+worker processes that each run ``torch.set_num_threads(threads_per_worker)``.
+
+The workers are forked from the process that already holds the model, so
+they share its weights copy-on-write instead of loading one copy each. Fork
+is not available on Windows; there :class:`ParallelEncoder` encodes in the
+calling process.
+
+Run ``python -m log_reg_library.parallel --help`` to measure how throughput
+scales with the number of workers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import time
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .io import read_table
+
+if TYPE_CHECKING:
+	from sentence_transformers import SentenceTransformer
+
+# Batches smaller than this are encoded in the calling process.
+PARALLEL_MIN_BATCH = 256
+DEFAULT_SHARD_SIZE = 64
+
+# Model inherited by forked workers; set right before the pool is created.
+_SHARED_MODEL: Optional["SentenceTransformer"] = None
+
+
+def fork_available() -> bool:
+	return "fork" in multiprocessing.get_all_start_methods()
+
+
+def default_threads_per_worker(workers: int) -> int:
+	return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _init_worker(threads: int) -> None:
+	import torch
+
+	torch.set_num_threads(threads)
+
+
+def _encode_shard(texts: List[str]) -> np.ndarray:
+	return _SHARED_MODEL.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+
+
+class ParallelEncoder:
+	"""Encode large batches in forked worker processes that share the model's weights.
+
+	The pool is created on the first large batch and reused until
+	:meth:`close`; later changes to the model are not seen by the workers.
+	Forking copies only the calling thread, so encode the first large batch
+	while no other threads of the process hold locks (for example before
+	starting a thread pool, or after it has shut down).
+	"""
+
+	def __init__(
+		self,
+		embed_model: "SentenceTransformer",
+		workers: int,
+		*,
+		threads_per_worker: Optional[int] = None,
+		shard_size: int = DEFAULT_SHARD_SIZE,
+		min_batch: int = PARALLEL_MIN_BATCH,
+	) -> None:
+		self.embed_model = embed_model
+		self.workers = max(1, workers)
+		self.threads_per_worker = threads_per_worker or default_threads_per_worker(self.workers)
+		self.shard_size = shard_size
+		self.min_batch = min_batch
+		self._pool = None
+
+	@property
+	def parallel(self) -> bool:
+		return self.workers > 1 and fork_available()
+
+	def _ensure_pool(self):
+		global _SHARED_MODEL
+		if self._pool is None:
+			# Forked children must not start tokenizer threads of their own.
+			os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+			_SHARED_MODEL = self.embed_model
+			self._pool = multiprocessing.get_context("fork").Pool(
+				self.workers, initializer=_init_worker, initargs=(self.threads_per_worker,)
+			)
+		return self._pool
+
+	def encode(self, descriptions: Sequence[str], *, show_progress: bool = False) -> np.ndarray:
+		descriptions = list(descriptions)
+		if not self.parallel or len(descriptions) < self.min_batch:
+			return self.embed_model.encode(descriptions, show_progress_bar=show_progress, convert_to_numpy=True)
+
+		shards = [descriptions[i : i + self.shard_size] for i in range(0, len(descriptions), self.shard_size)]
+		embeddings = self._ensure_pool().imap(_encode_shard, shards, chunksize=1)
+		if show_progress:
+			# tqdm is installed with sentence-transformers, which provides the model.
+			from tqdm.auto import tqdm
+
+			embeddings = tqdm(embeddings, total=len(shards), desc="Batches")
+		return np.concatenate(list(embeddings))
+
+	def close(self) -> None:
+		if self._pool is not None:
+			self._pool.close()
+			self._pool.join()
+			self._pool = None
+
+	def __enter__(self) -> "ParallelEncoder":
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
+
+
+def scaling_report(
+	embed_model: "SentenceTransformer",
+	descriptions: Sequence[str],
+	worker_counts: Sequence[int] = (2, 4),
+	*,
+	threads_per_worker: Optional[int] = None,
+) -> pd.DataFrame:
+	"""Throughput of :class:`ParallelEncoder` for each worker count above 1.
+
+	The first row is plain ``encode`` in this process with torch's default
+	thread count, the reference for ``speedup``.
+	"""
+
+	if not fork_available():
+		raise RuntimeError("Meerdere encodeerprocessen vereisen 'fork'; dit platform ondersteunt dat niet.")
+
+	descriptions = list(descriptions)
+	embed_model.encode(descriptions[:DEFAULT_SHARD_SIZE], show_progress_bar=False)  # warm-up
+
+	start = time.perf_counter()
+	embed_model.encode(descriptions, show_progress_bar=False, convert_to_numpy=True)
+	rows = [{"workers": 1, "threads_per_worker": None, "seconds": time.perf_counter() - start}]
+
+	for workers in sorted({count for count in worker_counts if count > 1}):
+		with ParallelEncoder(embed_model, workers, threads_per_worker=threads_per_worker, min_batch=0) as encoder:
+			encoder.encode(descriptions[: workers * DEFAULT_SHARD_SIZE])  # fork and warm up the pool
+			start = time.perf_counter()
+			encoder.encode(descriptions)
+			rows.append(
+				{
+					"workers": workers,
+					"threads_per_worker": encoder.threads_per_worker,
+					"seconds": time.perf_counter() - start,
+				}
+			)
+
+	report = pd.DataFrame(rows)
+	report["per_second"] = len(descriptions) / report["seconds"]
+	report["speedup"] = report["per_second"] / report.loc[0, "per_second"]
+	return report
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+	from .log_reg_library import DEFAULT_EMBED_MODEL
+
+	parser = argparse.ArgumentParser(description="Measure multi-process encoding throughput per worker count.")
+	parser.add_argument(
+		"--dataset",
+		default="dummy_opdrachten_dataset.csv",
+		help="Table with an 'omschrijving' column (default: dummy_opdrachten_dataset.csv).",
+	)
+	parser.add_argument("--samples", type=int, default=2048, help="Descriptions to encode per run (default: 2048).")
+	parser.add_argument(
+		"--workers", type=int, nargs="+", default=[2, 4], help="Worker counts to compare (default: 2 4)."
+	)
+	parser.add_argument(
+		"--threads-per-worker",
+		type=int,
+		help="torch threads per worker (default: CPU cores divided by the number of workers).",
+	)
+	parser.add_argument(
+		"--embedding-model",
+		default=DEFAULT_EMBED_MODEL,
+		help=f"SentenceTransformer name or directory (default: {DEFAULT_EMBED_MODEL}).",
+	)
+	return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+	args = parse_args(argv)
+
+	from sentence_transformers import SentenceTransformer
+
+	texts = read_table(args.dataset)["omschrijving"].astype(str).tolist()
+	descriptions = (texts * (-(-args.samples // len(texts))))[: args.samples]
+	report = scaling_report(
+		SentenceTransformer(args.embedding_model),
+		descriptions,
+		args.workers,
+		threads_per_worker=args.threads_per_worker,
+	)
+	print(f"{len(descriptions)} omschrijvingen, {os.cpu_count()} cores")
+	print(report.to_string(index=False, float_format=lambda value: f"{value:.2f}"))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,282 @@
+"""Two-tier classifier: sparse TF-IDF fast path with embedding fallback.
+
+Every description is first scored by a TF-IDF + logistic-regression model,
+which runs in microseconds per sample. It is stored as ``.npz`` and scored
+with NumPy (see :class:`~log_reg_library.artefacts.NumpyTfidfHead`), so the
+fast path needs neither scikit-learn nor unpickling. Only descriptions whose top
+probability stays below ``threshold`` are escalated to the transformer-based
+:class:`LogRegEmbeddingClassifier`, and the transformer itself is only loaded
+the first time an escalation happens.
+
+Run ``python -m log_reg_library.tiered --help`` to train the fast path or to
+evaluate the tiered classifier on a labelled CSV.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .artefacts import export_tfidf, is_native_artefact, load_head
+from .io import read_table
+from .log_reg_library import DEFAULT_EMBED_MODEL, LogRegEmbeddingClassifier, load_classifier, load_model_and_labels
+
+DEFAULT_FAST_MODEL = "nlp_model_tfidf_logreg.npz"
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_TEST_SET = "DATASETS/onderwerpen_omschrijvingen_test.csv"
+
+
+@dataclass
+class TieredPrediction:
+	"""Labels, class probabilities and which rows went to the fallback."""
+
+	labels: List[str]
+	probabilities: np.ndarray
+	escalated: np.ndarray
+
+	@property
+	def escalated_fraction(self) -> float:
+		return float(self.escalated.mean()) if self.escalated.size else 0.0
+
+
+@dataclass
+class TieredClassifier:
+	"""Confidence-gated combination of a TF-IDF model and the embedding model."""
+
+	fast_model: object
+	fallback_loader: Callable[[], LogRegEmbeddingClassifier]
+	threshold: float = DEFAULT_THRESHOLD
+	_fallback: Optional[LogRegEmbeddingClassifier] = field(default=None, init=False, repr=False)
+
+	@property
+	def classes_(self) -> np.ndarray:
+		return np.asarray(self.fast_model.classes_)
+
+	@property
+	def fallback(self) -> LogRegEmbeddingClassifier:
+		if self._fallback is None:
+			self._fallback = self.fallback_loader()
+		return self._fallback
+
+	def close(self) -> None:
+		"""Stop the fallback's encoding worker processes, if any were started."""
+
+		if self._fallback is not None:
+			self._fallback.close()
+
+	def predict_with_routing(
+		self,
+		descriptions: Sequence[str],
+		*,
+		show_progress: bool = False,
+	) -> TieredPrediction:
+		"""Classify *descriptions* and report which ones were escalated."""
+
+		descriptions = list(descriptions)
+		if not descriptions:
+			return TieredPrediction([], np.empty((0, len(self.classes_))), np.zeros(0, dtype=bool))
+
+		probabilities = np.asarray(self.fast_model.predict_proba(descriptions), dtype=float)
+		escalated = probabilities.max(axis=1) < self.threshold
+
+		if escalated.any():
+			hard = [descriptions[i] for i in np.flatnonzero(escalated)]
+			_, fallback_probas = self.fallback.predict_descriptions(hard, show_progress=show_progress)
+			fallback_classes = list(self.fallback.label_encoder.classes_)
+			columns = [fallback_classes.index(label) for label in self.classes_]
+			probabilities[escalated] = fallback_probas[:, columns]
+
+		labels = self.classes_[probabilities.argmax(axis=1)].tolist()
+		return TieredPrediction(labels, probabilities, escalated)
+
+	def predict_descriptions(
+		self,
+		descriptions: Sequence[str],
+		*,
+		show_progress: bool = False,
+	) -> tuple[List[str], np.ndarray]:
+		"""Same contract as :meth:`LogRegEmbeddingClassifier.predict_descriptions`."""
+
+		prediction = self.predict_with_routing(descriptions, show_progress=show_progress)
+		return prediction.labels, prediction.probabilities
+
+	def annotate_dataframe(
+		self,
+		df: pd.DataFrame,
+		*,
+		description_column: str = "omschrijving",
+		prediction_column: str = "voorspeld_onderwerp",
+		confidence_column: str = "zekerheid_%",
+		fill_column: Optional[str] = None,
+		show_progress: bool = False,
+		copy: bool = True,
+		categorical: bool = False,
+	) -> pd.DataFrame:
+		"""Same contract as :meth:`LogRegEmbeddingClassifier.annotate_dataframe`."""
+
+		if description_column not in df.columns:
+			raise ValueError(f"CSV mist verplichte kolom '{description_column}'.")
+
+		labels, probas = self.predict_descriptions(
+			df[description_column].astype(str).tolist(), show_progress=show_progress
+		)
+		scores = probas.max(axis=1) if probas.size else np.array([])
+
+		enriched = df.copy(deep=copy)
+		enriched[prediction_column] = pd.Categorical(labels, categories=list(self.classes_)) if categorical else labels
+		enriched[confidence_column] = np.round(scores * 100, 2)
+		if fill_column:
+			enriched[fill_column] = enriched[prediction_column]
+		return enriched
+
+	def evaluate(
+		self,
+		csv_path: Path | str = DEFAULT_TEST_SET,
+		*,
+		description_column: str = "omschrijving",
+		label_column: str = "onderwerp",
+	) -> Dict[str, float]:
+		"""Return escalation fraction, accuracy and timing on a labelled table."""
+
+		df = read_table(csv_path)
+		start = time.perf_counter()
+		prediction = self.predict_with_routing(df[description_column].astype(str).tolist())
+		seconds = time.perf_counter() - start
+
+		# The test CSV spells the minors in lower case.
+		truth = df[label_column].astype(str).str.casefold().to_numpy()
+		correct = np.char.lower(np.asarray(prediction.labels, dtype=str)) == truth
+		kept = ~prediction.escalated
+		return {
+			"samples": float(len(df)),
+			"escalated_fraction": prediction.escalated_fraction,
+			"accuracy": float(correct.mean()) if len(df) else 0.0,
+			"fast_path_accuracy": float(correct[kept].mean()) if kept.any() else float("nan"),
+			"fallback_accuracy": float(correct[~kept].mean()) if (~kept).any() else float("nan"),
+			"seconds": seconds,
+		}
+
+
+def train_fast_path(
+	dataset_path: Path | str,
+	*,
+	description_column: str = "omschrijving",
+	label_column: str = "onderwerp",
+	max_features: int = 20000,
+	C: float = 10.0,
+):
+	"""Fit the sparse TF-IDF + logistic-regression pipeline on label strings."""
+
+	from sklearn.feature_extraction.text import TfidfVectorizer
+	from sklearn.linear_model import LogisticRegression
+	from sklearn.pipeline import Pipeline
+
+	data = read_table(dataset_path)
+	pipeline = Pipeline([
+		("tfidf", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, max_features=max_features)),
+		("classifier", LogisticRegression(C=C, max_iter=2000)),
+	])
+	pipeline.fit(data[description_column].astype(str), data[label_column].astype(str))
+	return pipeline
+
+
+def load_tiered_classifier(
+	fast_model_path: Path | str = DEFAULT_FAST_MODEL,
+	model_path: Path | str = "nlp_model_logreg_embeddings.npz",
+	label_encoder_path: Optional[Path | str] = None,
+	embedding_model_name: str = DEFAULT_EMBED_MODEL,
+	*,
+	threshold: float = DEFAULT_THRESHOLD,
+) -> TieredClassifier:
+	"""Load the fast path now and defer the embedding classifier until needed.
+
+	``fast_model_path`` is an ``.npz`` export or, for older models, a pickled
+	sklearn pipeline. Both models must predict the same labels; only the
+	fallback's head is read for that check, not its sentence encoder.
+	"""
+
+	if is_native_artefact(fast_model_path):
+		fast_model, _ = load_head(fast_model_path)
+	else:
+		fast_model = joblib.load(Path(fast_model_path))
+
+	_, fallback_labels = load_model_and_labels(model_path, label_encoder_path)
+	fast_classes = {str(label) for label in fast_model.classes_}
+	fallback_classes = {str(label) for label in fallback_labels.classes_}
+	if fast_classes != fallback_classes:
+		raise ValueError(
+			f"Het TF-IDF-model ({fast_model_path}) en het embeddingmodel ({model_path}) voorspellen andere "
+			f"labels; alleen in TF-IDF: {sorted(fast_classes - fallback_classes)}, "
+			f"alleen in embedding: {sorted(fallback_classes - fast_classes)}. Train het TF-IDF-model opnieuw."
+		)
+	return TieredClassifier(
+		fast_model=fast_model,
+		fallback_loader=lambda: load_classifier(
+			model_path=model_path,
+			label_encoder_path=label_encoder_path,
+			embedding_model_name=embedding_model_name,
+		),
+		threshold=threshold,
+	)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Train or evaluate the tiered TF-IDF/embedding classifier.")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+
+	train = subparsers.add_parser("train", help="Fit the TF-IDF fast path.")
+	train.add_argument("--dataset", default="dummy_opdrachten_dataset.csv", help="Training table.")
+	train.add_argument(
+		"--output",
+		default=DEFAULT_FAST_MODEL,
+		help=f"Output .npz, or .pkl for a joblib pickle (default: {DEFAULT_FAST_MODEL}).",
+	)
+
+	evaluate = subparsers.add_parser("evaluate", help="Report escalation rate and accuracy.")
+	evaluate.add_argument("--test-set", default=DEFAULT_TEST_SET, help=f"Labelled table (default: {DEFAULT_TEST_SET}).")
+	evaluate.add_argument(
+		"--fast-model", default=DEFAULT_FAST_MODEL, help=f"TF-IDF model, .npz or pickle (default: {DEFAULT_FAST_MODEL})."
+	)
+	evaluate.add_argument(
+		"--thresholds",
+		type=float,
+		nargs="+",
+		default=[DEFAULT_THRESHOLD],
+		help=f"Confidence thresholds to compare (default: {DEFAULT_THRESHOLD}).",
+	)
+	return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+	args = parse_args(argv)
+
+	if args.command == "train":
+		pipeline = train_fast_path(args.dataset)
+		if is_native_artefact(args.output):
+			export_tfidf(pipeline, args.output)
+		else:
+			joblib.dump(pipeline, args.output)
+		print(f"TF-IDF model opgeslagen als {args.output}")
+		return
+
+	classifier = load_tiered_classifier(args.fast_model)
+	for threshold in args.thresholds:
+		classifier.threshold = threshold
+		report = classifier.evaluate(args.test_set)
+		print(
+			f"drempel {threshold:.2f}: {report['escalated_fraction']:.1%} geëscaleerd, "
+			f"accuracy {report['accuracy']:.3f} "
+			f"(snel pad {report['fast_path_accuracy']:.3f}, fallback {report['fallback_accuracy']:.3f}), "
+			f"{report['seconds'] * 1000:.1f} ms"
+		)
+
+
+if __name__ == "__main__":
+	main()
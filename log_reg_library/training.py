@@ -0,0 +1,382 @@
+"""Reusable training pipeline on top of a cached embedding matrix.
+
+The sentence embeddings of a training dataset are computed once and stored as
+a memory-mapped ``.npy`` file keyed by the dataset contents and the embedding
+model name. Refitting the logistic-regression or XGBoost head after a
+hyperparameter change therefore skips the transformer entirely.
+
+Run ``python -m log_reg_library.training --help`` for the command line.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Sequence
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from .artefacts import export_logreg, export_xgboost
+from .io import file_digest, read_table
+from .log_reg_library import DEFAULT_EMBED_MODEL
+
+if TYPE_CHECKING:
+	from sentence_transformers import SentenceTransformer
+
+DEFAULT_DATASET = "dummy_opdrachten_dataset.csv"
+DEFAULT_CACHE_DIR = Path(".peer2pro_cache") / "embeddings"
+
+LOGREG_DEFAULTS: Dict[str, object] = {"max_iter": 2000, "solver": "lbfgs"}
+XGBOOST_DEFAULTS: Dict[str, object] = {
+	"objective": "multi:softprob",
+	"eval_metric": "mlogloss",
+	"n_estimators": 300,
+	"learning_rate": 0.1,
+	"max_depth": 6,
+	"subsample": 0.8,
+	"colsample_bytree": 0.8,
+	"random_state": 42,
+}
+
+# Artefact names used by the original training scripts.
+DEFAULT_ARTEFACTS: Dict[str, tuple[str, str]] = {
+	"logreg": ("nlp_model_logreg_embeddings.pkl", "label_encoder_log_reg.pkl"),
+	"xgboost": ("nlp_model_xgb_embeddings.pkl", "label_encoder_xgb_llm.pkl"),
+}
+# Pickle-free equivalents, see log_reg_library.artefacts.
+NATIVE_ARTEFACTS: Dict[str, str] = {
+	"logreg": "nlp_model_logreg_embeddings.npz",
+	"xgboost": "nlp_model_xgb_embeddings.ubj",
+}
+# Embedding model the inference code of each family's artefacts uses; the
+# XGBoost scripts in XGBOOST/LLM embed with the 384-d MiniLM model.
+FAMILY_EMBED_MODELS: Dict[str, str] = {
+	"logreg": DEFAULT_EMBED_MODEL,
+	"xgboost": "all-MiniLM-L6-v2",
+}
+
+
+def check_artefact_model(family: str, model_name: str) -> None:
+	"""Refuse to overwrite a family's default artefacts with a head trained on other embeddings."""
+
+	expected = FAMILY_EMBED_MODELS[family]
+	if model_name != expected:
+		raise ValueError(
+			f"De {family}-artefacten worden gebruikt met embeddings van '{expected}', "
+			f"niet van '{model_name}'."
+		)
+
+
+@dataclass
+class EmbeddingStore:
+	"""On-disk cache of embedding matrices keyed by dataset hash and model name."""
+
+	cache_dir: Path = DEFAULT_CACHE_DIR
+
+	def path_for(self, dataset_path: Path | str, model_name: str, text_column: str = "omschrijving") -> Path:
+		"""Return the ``.npy`` location for *dataset_path* embedded with *model_name*."""
+
+		key = f"{file_digest(dataset_path)[:16]}_{text_column}"
+		safe_model = model_name.replace("/", "__").replace("\\", "__")
+		return Path(self.cache_dir) / f"{key}_{safe_model}.npy"
+
+	def load_or_compute(
+		self,
+		dataset_path: Path | str,
+		model_name: str = DEFAULT_EMBED_MODEL,
+		*,
+		text_column: str = "omschrijving",
+		embed_model: Optional["SentenceTransformer"] = None,
+		show_progress: bool = True,
+	) -> np.ndarray:
+		"""Return the (memory-mapped) embedding matrix, computing it on a cache miss."""
+
+		path = self.path_for(dataset_path, model_name, text_column)
+		if not path.exists():
+			texts = read_table(dataset_path)[text_column].astype(str).tolist()
+			if embed_model is None:
+				# Imported lazily: cached embeddings do not need torch.
+				from sentence_transformers import SentenceTransformer
+
+				embed_model = SentenceTransformer(model_name)
+			embeddings = embed_model.encode(texts, show_progress_bar=show_progress, convert_to_numpy=True)
+			path.parent.mkdir(parents=True, exist_ok=True)
+			tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+			np.save(tmp_path, np.ascontiguousarray(embeddings, dtype=np.float32))
+			os.replace(tmp_path, path)
+		return np.load(path, mmap_mode="r")
+
+
+@dataclass
+class TrainingData:
+	"""Embedding matrix, encoded labels and the fixed train/test split."""
+
+	embeddings: np.ndarray
+	labels: np.ndarray
+	label_encoder: LabelEncoder
+	train_index: np.ndarray
+	test_index: np.ndarray
+
+	@property
+	def X_train(self) -> np.ndarray:
+		return self.embeddings[self.train_index]
+
+	@property
+	def X_test(self) -> np.ndarray:
+		return self.embeddings[self.test_index]
+
+	@property
+	def y_train(self) -> np.ndarray:
+		return self.labels[self.train_index]
+
+	@property
+	def y_test(self) -> np.ndarray:
+		return self.labels[self.test_index]
+
+
+@dataclass
+class TrainedModel:
+	"""A fitted classifier head together with its evaluation results."""
+
+	family: str
+	estimator: object
+	params: Dict[str, object]
+	accuracy: float
+	report: str
+	fit_seconds: float
+	metadata: Dict[str, object] = field(default_factory=dict)
+
+
+def prepare_training_data(
+	dataset_path: Path | str = DEFAULT_DATASET,
+	model_name: str = DEFAULT_EMBED_MODEL,
+	*,
+	store: Optional[EmbeddingStore] = None,
+	text_column: str = "omschrijving",
+	label_column: str = "onderwerp",
+	test_size: float = 0.2,
+	random_state: int = 42,
+	embed_model: Optional["SentenceTransformer"] = None,
+	show_progress: bool = True,
+) -> TrainingData:
+	"""Load labels, fetch cached embeddings and apply the scripts' stratified split.
+
+	Pass ``embed_model`` to embed with an already loaded model; ``model_name``
+	is then only the cache key.
+	"""
+
+	store = store or EmbeddingStore()
+	labels_raw = read_table(dataset_path)[label_column]
+	label_encoder = LabelEncoder()
+	labels = label_encoder.fit_transform(labels_raw)
+	embeddings = store.load_or_compute(
+		dataset_path, model_name, text_column=text_column, embed_model=embed_model, show_progress=show_progress
+	)
+	train_index, test_index = train_test_split(
+		np.arange(len(labels)),
+		test_size=test_size,
+		random_state=random_state,
+		stratify=labels,
+	)
+	return TrainingData(
+		embeddings=embeddings,
+		labels=labels,
+		label_encoder=label_encoder,
+		train_index=np.sort(train_index),
+		test_index=np.sort(test_index),
+	)
+
+
+def fit_logreg(X: np.ndarray, y: np.ndarray, **params) -> LogisticRegression:
+	"""Fit the multinomial logistic-regression head."""
+
+	clf = LogisticRegression(**{**LOGREG_DEFAULTS, **params})
+	clf.fit(X, y)
+	return clf
+
+
+def fit_xgboost(X: np.ndarray, y: np.ndarray, **params):
+	"""Fit the XGBoost head."""
+
+	from xgboost import XGBClassifier
+
+	clf = XGBClassifier(**{**XGBOOST_DEFAULTS, **params})
+	clf.fit(X, y)
+	return clf
+
+
+MODEL_FAMILIES = {
+	"logreg": fit_logreg,
+	"xgboost": fit_xgboost,
+}
+
+
+def train_family(
+	data: TrainingData,
+	family: str,
+	params: Optional[Mapping[str, object]] = None,
+) -> TrainedModel:
+	"""Fit one classifier family on the training split and evaluate it."""
+
+	if family not in MODEL_FAMILIES:
+		raise ValueError(f"Onbekend modeltype '{family}'. Kies uit: {', '.join(MODEL_FAMILIES)}.")
+
+	params = dict(params or {})
+	start = time.perf_counter()
+	estimator = MODEL_FAMILIES[family](data.X_train, data.y_train, **params)
+	fit_seconds = time.perf_counter() - start
+
+	y_pred = estimator.predict(data.X_test)
+	report = classification_report(
+		data.y_test,
+		y_pred,
+		labels=np.arange(len(data.label_encoder.classes_)),
+		target_names=data.label_encoder.classes_,
+		zero_division=0,
+	)
+	return TrainedModel(
+		family=family,
+		estimator=estimator,
+		params=params,
+		accuracy=float(accuracy_score(data.y_test, y_pred)),
+		report=report,
+		fit_seconds=fit_seconds,
+	)
+
+
+def train_models(
+	data: TrainingData,
+	families: Sequence[str] = ("logreg", "xgboost"),
+	*,
+	params: Optional[Mapping[str, Mapping[str, object]]] = None,
+	n_jobs: int = 1,
+) -> Dict[str, TrainedModel]:
+	"""Fit several families from the same embedding matrix, optionally in parallel."""
+
+	params = params or {}
+	results = Parallel(n_jobs=n_jobs, prefer="threads")(
+		delayed(train_family)(data, family, params.get(family)) for family in families
+	)
+	return {trained.family: trained for trained in results}
+
+
+def save_model(
+	trained: TrainedModel,
+	label_encoder: LabelEncoder,
+	*,
+	model_path: Path | str,
+	label_encoder_path: Path | str,
+) -> None:
+	"""Persist a fitted head and its label encoder in the loader's joblib format."""
+
+	Path(model_path).parent.mkdir(parents=True, exist_ok=True)
+	joblib.dump(trained.estimator, model_path)
+	joblib.dump(label_encoder, label_encoder_path)
+
+
+def save_native(trained: TrainedModel, label_encoder: LabelEncoder, path: Path | str) -> Path:
+	"""Persist a fitted head in the pickle-free format of :mod:`log_reg_library.artefacts`."""
+
+	if trained.family == "xgboost":
+		return export_xgboost(trained.estimator, label_encoder, path)
+	return export_logreg(trained.estimator, label_encoder, path)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Train classifier heads on cached sentence embeddings.")
+	parser.add_argument(
+		"--dataset",
+		default=DEFAULT_DATASET,
+		help=f"Training table with 'omschrijving' and 'onderwerp' columns (default: {DEFAULT_DATASET}).",
+	)
+	parser.add_argument(
+		"--families",
+		nargs="+",
+		choices=sorted(MODEL_FAMILIES),
+		default=["logreg", "xgboost"],
+		help="Classifier families to fit (default: logreg xgboost).",
+	)
+	parser.add_argument(
+		"--embedding-model",
+		help=(
+			"SentenceTransformer used for the embeddings of every family (default: per family, "
+			+ ", ".join(f"{family}: {model}" for family, model in FAMILY_EMBED_MODELS.items())
+			+ ")."
+		),
+	)
+	parser.add_argument(
+		"--cache-dir",
+		default=str(DEFAULT_CACHE_DIR),
+		help=f"Directory for cached embedding matrices (default: {DEFAULT_CACHE_DIR}).",
+	)
+	parser.add_argument(
+		"--output-dir",
+		default=".",
+		help="Directory for the model pickles and their native .npz/.ubj exports (default: .).",
+	)
+	parser.add_argument(
+		"--n-jobs",
+		type=int,
+		default=1,
+		help="Number of classifier families to fit in parallel (default: 1).",
+	)
+	parser.add_argument(
+		"--no-save",
+		action="store_true",
+		help="Only evaluate; do not overwrite the stored artefacts.",
+	)
+	args = parser.parse_args(argv)
+	if args.embedding_model and not args.no_save:
+		for family in args.families:
+			try:
+				check_artefact_model(family, args.embedding_model)
+			except ValueError as exc:
+				parser.error(f"{exc} Gebruik --no-save om alleen te evalueren.")
+	return args
+
+
+def _save_defaults(result: TrainedModel, data: TrainingData, output_dir: Path) -> None:
+	"""Write *result* over the default pickle and native artefacts of its family."""
+
+	model_name, encoder_name = DEFAULT_ARTEFACTS[result.family]
+	save_model(
+		result,
+		data.label_encoder,
+		model_path=output_dir / model_name,
+		label_encoder_path=output_dir / encoder_name,
+	)
+	native_path = save_native(result, data.label_encoder, output_dir / NATIVE_ARTEFACTS[result.family])
+	print(f"Model en encoder opgeslagen: {output_dir / model_name}, {output_dir / encoder_name}, {native_path}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+	args = parse_args(argv)
+
+	# One embedding matrix per model; by default each family gets its own.
+	by_model: Dict[str, list[str]] = {}
+	for family in args.families:
+		by_model.setdefault(args.embedding_model or FAMILY_EMBED_MODELS[family], []).append(family)
+
+	store = EmbeddingStore(Path(args.cache_dir))
+	output_dir = Path(args.output_dir)
+	for embedding_model, families in by_model.items():
+		data = prepare_training_data(args.dataset, embedding_model, store=store)
+		trained = train_models(data, families, n_jobs=args.n_jobs)
+		for family, result in trained.items():
+			print(f"\n=== Evaluatie {family} op {embedding_model} (fit: {result.fit_seconds:.2f}s) ===")
+			print(result.report)
+			if not args.no_save:
+				_save_defaults(result, data, output_dir)
+
+
+if __name__ == "__main__":
+	main()
@@ -1,12 +1,174 @@
 from __future__ import annotations
 
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, Sequence
 
 import pandas as pd
 
 from log_reg_library import load_classifier
-from matching import MatchingEngine
+from log_reg_library.tiered import load_tiered_classifier
+from matching import MatchingEngine, read_table, write_table
+from matching.cache import DEFAULT_CACHE_DIR, ResultCache, content_key, file_digest
+from matching.checkpoint import save_checkpoint
+from matching.diagnostics import DiagnosticReport, diagnose
+from matching.engine import ENCODINGS, ImprovementCallback, export_matches
+from matching.mentor_pool import load_mentor_pool
+from matching.semantic import APPROXIMATE_MIN_MENTORS, DEFAULT_TOP_K, SemanticRetriever
+from matching.strategy import (
+    DEFAULT_LNS_WORKERS,
+    DEFAULT_MEMORY_LIMIT_MB,
+    STRATEGIES,
+    estimate_size,
+    plan_strategy,
+    solve_outcome_with_plan,
+)
+from matching.sweep import ParameterSweep
+
+EMBEDDING_MODEL_NAME = "paraphrase-multilingual-mpnet-base-v2"
+LOGREG_MODEL_PATH = "nlp_model_logreg_embeddings.npz"
+FAST_MODEL_PATH = "nlp_model_tfidf_logreg.npz"
+# Written by ``python -m log_reg_library.distillation distill``.
+DISTILLED_MODEL_DIR = "nlp_model_distilled_minilm"
+DISTILLED_HEAD_PATH = "nlp_model_logreg_distilled.npz"
+
+
+def load_pipeline_classifier(
+    classifier_mode: str = "embedding", fast_path_threshold: float = 0.6, encode_workers: int = 1
+):
+    if classifier_mode == "tiered":
+        return load_tiered_classifier(
+            fast_model_path=FAST_MODEL_PATH,
+            model_path=LOGREG_MODEL_PATH,
+            embedding_model_name=EMBEDDING_MODEL_NAME,
+            threshold=fast_path_threshold,
+        )
+    if classifier_mode == "distilled":
+        return load_classifier(
+            model_path=DISTILLED_HEAD_PATH,
+            embedding_model_name=DISTILLED_MODEL_DIR,
+            encode_workers=encode_workers,
+        )
+    return load_classifier(
+        model_path=LOGREG_MODEL_PATH,
+        embedding_model_name=EMBEDDING_MODEL_NAME,
+        encode_workers=encode_workers,
+    )
+
+
+def embedding_model_key(classifier_mode: str = "embedding") -> str:
+    """Name of the sentence encoder for cache keys; a re-distilled student always gets a new head."""
+
+    if classifier_mode == "distilled":
+        return f"{DISTILLED_MODEL_DIR}-{file_digest(DISTILLED_HEAD_PATH)[:16]}"
+    return EMBEDDING_MODEL_NAME
+
+
+def semantic_retriever(
+    classifier, top_k: int = DEFAULT_TOP_K, classifier_mode: str = "embedding", approximate: bool = False
+) -> SemanticRetriever:
+    """Build a retriever on the sentence-transformer of a loaded pipeline classifier."""
+
+    embedding_classifier = getattr(classifier, "fallback", classifier)
+    return SemanticRetriever(
+        embedding_classifier.encode,
+        model_name=embedding_model_key(classifier_mode),
+        top_k=top_k,
+        approximate=approximate,
+    )
+
+
+def classification_cache_key(
+    students_input_path: str, classifier_mode: str = "embedding", fast_path_threshold: float = 0.6
+) -> str:
+    if classifier_mode == "distilled":
+        model_parts = [embedding_model_key(classifier_mode)]
+    else:
+        model_parts = [EMBEDDING_MODEL_NAME, file_digest(LOGREG_MODEL_PATH)]
+    if classifier_mode == "tiered":
+        model_parts += [file_digest(FAST_MODEL_PATH), fast_path_threshold]
+    return content_key("classification", file_digest(students_input_path), classifier_mode, *model_parts)
+
+
+def cached_optimal_result(cache: ResultCache, key: str) -> dict | None:
+    """Return the cached ``{"outcome", "matches"}`` of a proven-optimal solve, or ``None``."""
+
+    entry = cache.get("results", key)
+    if not isinstance(entry, dict) or not getattr(entry.get("outcome"), "optimal", False):
+        return None
+    return entry
+
+
+def prepare_mentor_engine(
+    *,
+    mentors_type1_path: str,
+    mentors_type2_path: str | None = None,
+    n_type1: int = 4,
+    n_type2: int | None = None,
+    candidate_mode: str = "subject",
+    constraint_mode: str = "aggregate",
+    encoding: str = "baseline",
+    kernelize: bool = False,
+    cache_dir: str | None = None,
+    verbose: bool = True,
+) -> MatchingEngine:
+    """Read the mentor files and build the mentor caches and ASP facts.
+
+    With ``cache_dir`` set, the compiled mentor pool of
+    :mod:`matching.mentor_pool` is loaded from there, or compiled and stored
+    when these mentor files were not seen before.
+    """
+
+    engine_kwargs = {
+        "n_type1": n_type1,
+        "candidate_mode": candidate_mode,
+        "constraint_mode": constraint_mode,
+        "encoding": encoding,
+        "kernelize": kernelize,
+        "verbose": verbose,
+    }
+
+    if cache_dir:
+        engine_kwargs["mentor_pool"] = load_mentor_pool(mentors_type1_path, mentors_type2_path, cache_dir=cache_dir)
+    else:
+        engine_kwargs["mentors_type1_df"] = read_table(mentors_type1_path)
+        if mentors_type2_path:
+            engine_kwargs["mentors_type2_df"] = read_table(mentors_type2_path)
+
+    if n_type2 is not None:
+        engine_kwargs["n_type2"] = n_type2
+
+    engine = MatchingEngine(**engine_kwargs)
+    engine.load_mentors()
+    return engine
+
+
+def classify_students(classifier, students_df: pd.DataFrame, show_progress: bool = True) -> pd.DataFrame:
+    """Annotate the students with their predicted subject, as the engine expects it."""
+
+    return classifier.annotate_dataframe(
+        students_df,
+        description_column="omschrijving",
+        fill_column="Onderwerp",
+        show_progress=show_progress,
+        copy=False,
+        categorical=True,
+    )
+
+
+def report_diagnostics(report: DiagnosticReport, diagnostics_path: str | None = None) -> None:
+    """Print the reason counts and upper bounds, and export the per-student table."""
+
+    print("Feasibility per student:")
+    print(report.reason_counts().to_string())
+    print("Upper bound of matchable students per setting:")
+    print(report.bounds.to_string(index=False))
+    if diagnostics_path:
+        Path(diagnostics_path).parent.mkdir(parents=True, exist_ok=True)
+        write_table(report.students, diagnostics_path)
+        print(f"Diagnostics written to {diagnostics_path}")
 
 
 def run_matching(
@@ -20,43 +182,254 @@ def run_matching(
     timeout_seconds: int = 120,
     show_progress: bool = True,
     verbose: bool = True,
+    classifier_mode: str = "embedding",
+    fast_path_threshold: float = 0.6,
+    encode_workers: int = 1,
+    on_stage: Callable[[str], None] | None = None,
+    on_improvement: ImprovementCallback | None = None,
+    cancel_event: threading.Event | None = None,
+    cache_dir: str | None = str(DEFAULT_CACHE_DIR),
+    lns_workers: int = 0,
+    candidate_mode: str = "subject",
+    semantic_top_k: int = DEFAULT_TOP_K,
+    semantic_approximate: bool = False,
+    diagnostics_path: str | None = None,
+    diagnose_only: bool = False,
+    checkpoint_path: str | None = None,
+    resume: bool = False,
+    sweep_path: str | None = None,
+    sweep_type1_values: Sequence[int] = (2, 3, 4),
+    sweep_type2_values: Sequence[int] = (0, 1, 2),
+    sweep_capacity_scales: Sequence[float] = (1.0,),
+    constraint_mode: str = "aggregate",
+    encoding: str = "baseline",
+    kernelize: bool = False,
+    strategy: str = "exact",
+    memory_limit_mb: float | None = DEFAULT_MEMORY_LIMIT_MB,
 ) -> pd.DataFrame | None:
-    classifier = load_classifier(
-        model_path="nlp_model_logreg_embeddings.pkl",
-        label_encoder_path="label_encoder_log_reg.pkl",
-        embedding_model_name="paraphrase-multilingual-mpnet-base-v2",
-    )
+    """Classify the students, solve the matching and export the result.
 
-    students_df = pd.read_csv(students_input_path)
-    mentors_type1_df = pd.read_csv(mentors_type1_path)
-    mentors_type2_df = pd.read_csv(mentors_type2_path) if mentors_type2_path else None
+    Loading the classifier, reading the students and preparing the mentor side
+    of the ASP program run concurrently; only the student facts wait for the
+    predicted labels. ``on_stage`` receives a short description whenever a
+    pipeline stage starts and ``on_improvement`` is forwarded to the solver.
+    Setting ``cancel_event`` skips the remaining stages, or stops the solver
+    and exports the best matching found so far; ``None`` is returned when
+    nothing was solved.
 
-    classified_students = classifier.annotate_dataframe(
-        students_df,
-        description_column="omschrijving",
-        fill_column="Onderwerp",
-        show_progress=show_progress,
-    )
+    ``strategy`` picks the solver: ``exact`` (one clingo solve), ``lns``
+    (large neighborhood search that re-optimizes one subject, day or group of
+    mentors at a time in ``lns_workers`` processes, for the whole
+    ``timeout_seconds`` budget), ``greedy`` (no grounding at all), or
+    ``auto`` to choose from the estimated instance size; ``lns_workers``
+    above zero selects LNS unless ``greedy`` is requested. Solves whose ground program is
+    estimated to exceed ``memory_limit_mb`` are refused, or replaced by the
+    greedy path under ``auto``.
 
-    if verbose:
-        print(classified_students)
+    ``encode_workers`` above 1 encodes the student descriptions in that many
+    processes (see :mod:`log_reg_library.parallel`); it does not change the
+    predictions.
 
-    engine_kwargs = {
-        "students_df": classified_students,
-        "mentors_type1_df": mentors_type1_df,
-        "n_type1": n_type1,
-        "verbose": verbose,
-    }
+    ``candidate_mode="semantic"`` replaces the exact subject match by the
+    ``semantic_top_k`` mentors of each type whose subject profile is most
+    similar to the student's description; ``semantic_approximate`` retrieves
+    them from an approximate index when there are at least
+    :data:`matching.semantic.APPROXIMATE_MIN_MENTORS` mentors of a type.
+    ``constraint_mode="propagator"``
+    enforces capacities and mentor counts in a clingo propagator instead of
+    grounding ``#count`` aggregates, which shrinks the ground program.
+    ``encoding="compact"`` selects the tightened ASP encoding of
+    :data:`matching.engine.ENCODINGS`.
+    ``kernelize`` first fixes uncontended students, drops unreachable mentors
+    and merges interchangeable ones, and solves only the reduced instance.
 
-    if mentors_type2_df is not None:
-        engine_kwargs["mentors_type2_df"] = mentors_type2_df
+    With ``diagnostics_path`` set, a per-student feasibility report is
+    written before solving; ``diagnose_only`` stops after the report and
+    returns it instead of the matches.
 
-    if n_type2 is not None:
-        engine_kwargs["n_type2"] = n_type2
+    ``checkpoint_path`` receives every improving matching as it is found;
+    with ``resume`` a checkpoint of the same instance is the starting point,
+    so a long optimisation can be split over several shorter runs.
 
-    engine = MatchingEngine(**engine_kwargs)
+    With ``sweep_path`` set, every combination of the ``sweep_*`` values is
+    solved on one grounded program (each with ``timeout_seconds``) and the
+    comparison table is written there and returned instead of matches.
+
+    With ``cache_dir`` set, classifications and results the solver proved
+    optimal are stored under a hash of the input file contents, model
+    artefacts and solver settings; timed-out, cancelled, LNS and greedy
+    results are never cached. An identical rerun only re-exports the cached
+    matching (after writing the diagnostics and checkpoint when those are
+    requested), and a run with the same students but other mentor files
+    reuses the cached classification. Likewise, a new intake with known mentor files loads
+    the compiled mentor pool instead of parsing the mentors again.
+    """
+
+    def stage(message: str) -> bool:
+        if on_stage is not None:
+            on_stage(message)
+        return cancel_event is None or not cancel_event.is_set()
+
+    cache = ResultCache(cache_dir) if cache_dir else None
+    classification_key = result_key = cached_result = None
+    if cache is not None:
+        classification_key = classification_cache_key(students_input_path, classifier_mode, fast_path_threshold)
+        result_key = content_key(
+            "result",
+            classification_key,
+            file_digest(mentors_type1_path),
+            file_digest(mentors_type2_path) if mentors_type2_path else None,
+            n_type1,
+            n_type2,
+            timeout_seconds,
+            lns_workers,
+            candidate_mode,
+            semantic_top_k if candidate_mode == "semantic" else None,
+            semantic_approximate if candidate_mode == "semantic" else None,
+            constraint_mode,
+            encoding,
+            kernelize,
+            strategy,
+            memory_limit_mb,
+        )
+        if not (diagnose_only or resume or sweep_path):
+            cached_result = cached_optimal_result(cache, result_key)
+        if cached_result is not None and not (diagnostics_path or checkpoint_path):
+            stage("Reusing cached matching")
+            df_matches = export_matches(cached_result["matches"], export_path, verbose=verbose)
+            if df_matches is not None and verbose:
+                print(df_matches.head())
+            return df_matches
+
+    cached_students = cache.get("classifications", classification_key) if cache is not None else None
 
-    matches = engine.solve_matches(timeout_seconds=timeout_seconds)
+    if not stage("Loading classifier and preparing mentors"):
+        return None
+
+    needs_classifier = cached_students is None or candidate_mode == "semantic"
+    # Encoding in several processes forks this one; only do that once the
+    # helper threads below have finished, so no lock is copied mid-use.
+    classify_in_pool = encode_workers <= 1
+    classifier = students_df = classified_students = None
+    try:
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            if needs_classifier:
+                classifier_future = pool.submit(
+                    load_pipeline_classifier, classifier_mode, fast_path_threshold, encode_workers
+                )
+            if cached_students is None:
+                students_future = pool.submit(read_table, students_input_path)
+            engine_future = pool.submit(
+                prepare_mentor_engine,
+                mentors_type1_path=mentors_type1_path,
+                mentors_type2_path=mentors_type2_path,
+                n_type1=n_type1,
+                n_type2=n_type2,
+                candidate_mode=candidate_mode,
+                constraint_mode=constraint_mode,
+                encoding=encoding,
+                kernelize=kernelize,
+                cache_dir=cache_dir,
+                verbose=verbose,
+            )
+
+            if needs_classifier:
+                classifier = classifier_future.result()
+            if cached_students is not None:
+                stage("Reusing cached classification")
+                classified_students = cached_students
+            else:
+                students_df = students_future.result()
+                if classify_in_pool:
+                    if not stage(f"Classifying {len(students_df)} student descriptions"):
+                        return None
+                    classified_students = classify_students(classifier, students_df, show_progress)
+            engine = engine_future.result()
+
+        if classified_students is None:
+            if not stage(f"Classifying {len(students_df)} student descriptions"):
+                return None
+            classified_students = classify_students(classifier, students_df, show_progress)
+        if cache is not None and cached_students is None:
+            cache.put("classifications", classification_key, classified_students)
+
+        if verbose:
+            print(classified_students)
+
+        engine.set_students(classified_students)
+        if candidate_mode == "semantic":
+            engine.set_retriever(
+                semantic_retriever(classifier, semantic_top_k, classifier_mode, semantic_approximate)
+            )
+            # Retrieve the candidates while the encoder is still loaded.
+            engine.load_students()
+    finally:
+        if classifier is not None:
+            classifier.close()
+
+    if diagnostics_path or diagnose_only:
+        if not stage("Running feasibility diagnostics"):
+            return None
+        report = diagnose(engine)
+        report_diagnostics(report, diagnostics_path)
+        if diagnose_only:
+            return report.students
+
+    if sweep_path:
+        if not stage("Sweeping parameter settings"):
+            return None
+        comparison = ParameterSweep(
+            engine,
+            n_type1_values=sweep_type1_values,
+            n_type2_values=sweep_type2_values if mentors_type2_path else (0,),
+            capacity_scenarios={f"capacity x{scale:g}": scale for scale in sweep_capacity_scales},
+            verbose=verbose,
+        ).run(timeout_seconds=timeout_seconds, cancel_event=cancel_event)
+        Path(sweep_path).parent.mkdir(parents=True, exist_ok=True)
+        write_table(comparison, sweep_path)
+        print(comparison.to_string(index=False))
+        return comparison
+
+    if cached_result is not None:
+        if not stage("Reusing cached matching"):
+            return None
+        outcome, matches = cached_result["outcome"], cached_result["matches"]
+        if checkpoint_path:
+            save_checkpoint(
+                checkpoint_path,
+                signature=engine.instance_signature(),
+                triples=outcome.triples,
+                cost=outcome.cost,
+                optimal=True,
+            )
+    else:
+        if not stage(f"Solving (timeout {timeout_seconds}s)"):
+            return None
+        plan = plan_strategy(
+            estimate_size(engine),
+            "lns" if lns_workers > 0 and strategy != "greedy" else strategy,
+            memory_limit_mb=memory_limit_mb,
+            workers=lns_workers or DEFAULT_LNS_WORKERS,
+        )
+        if verbose:
+            print(f"Instance size: {plan.estimate.summary()}")
+            print(f"Strategy: {plan.strategy} ({plan.reason})")
+
+        warm_start = engine.load_checkpoint(checkpoint_path) if resume and checkpoint_path else None
+        outcome = solve_outcome_with_plan(
+            engine,
+            plan,
+            timeout_seconds,
+            on_improvement=on_improvement,
+            cancel_event=cancel_event,
+            checkpoint_path=checkpoint_path,
+            warm_start=warm_start,
+        )
+        matches = engine.matches_from_triples(outcome.triples)
+        if cache is not None and outcome.optimal:
+            cache.put("results", result_key, {"outcome": outcome, "matches": matches})
+
+    stage("Exporting matches")
     df_matches = engine.export_matches(matches, filename=export_path)
 
     if df_matches is not None and verbose:
@@ -70,16 +443,16 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser.add_argument(
         "--students-input-path",
         required=True,
-        help="Path to the CSV file containing student descriptions.",
+        help="Path to the CSV, Parquet or Arrow file containing student descriptions.",
     )
     parser.add_argument(
         "--mentors-type1-path",
         required=True,
-        help="Path to the CSV file containing Type 1 mentor data.",
+        help="Path to the CSV, Parquet or Arrow file containing Type 1 mentor data.",
     )
     parser.add_argument(
         "--mentors-type2-path",
-        help="Optional path to the CSV file containing Type 2 mentor data.",
+        help="Optional path to the CSV, Parquet or Arrow file containing Type 2 mentor data.",
     )
     parser.add_argument(
         "--type1-n",
@@ -95,7 +468,10 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser.add_argument(
         "--export-path",
         default="./DATASETS/matches.csv",
-        help="Destination path for the exported matches CSV (default: ./DATASETS/matches.csv).",
+        help=(
+            "Destination path for the exported matches (default: ./DATASETS/matches.csv). "
+            "A .parquet or .arrow suffix writes list columns with integer IDs."
+        ),
     )
     parser.add_argument(
         "--timeout-seconds",
@@ -103,6 +479,168 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         default=120,
         help="Solver timeout in seconds (default: 120).",
     )
+    parser.add_argument(
+        "--classifier",
+        choices=["embedding", "tiered", "distilled"],
+        default="embedding",
+        help=(
+            "Description classifier: the transformer embedding model, a TF-IDF fast path "
+            "that only escalates low-confidence descriptions to it, or the distilled small "
+            "encoder from log_reg_library.distillation (default: embedding)."
+        ),
+    )
+    parser.add_argument(
+        "--fast-path-threshold",
+        type=float,
+        default=0.6,
+        help="Confidence below which the tiered classifier escalates to embeddings (default: 0.6).",
+    )
+    parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=1,
+        help=(
+            "Encode large description batches in this many processes that share the embedding "
+            "model; not available on Windows (default: 1)."
+        ),
+    )
+    parser.add_argument(
+        "--candidate-mode",
+        choices=["subject", "semantic"],
+        default="subject",
+        help=(
+            "How mentors become candidates: an exact match on the (predicted) subject, or the "
+            "mentors whose subjects are most similar to the student's description (default: subject)."
+        ),
+    )
+    parser.add_argument(
+        "--semantic-top-k",
+        type=int,
+        default=DEFAULT_TOP_K,
+        help=f"Mentors of each type retrieved per student in semantic mode (default: {DEFAULT_TOP_K}).",
+    )
+    parser.add_argument(
+        "--semantic-approximate",
+        action="store_true",
+        help=(
+            "Retrieve semantic candidates from an approximate (k-means) index for mentor types with "
+            f"at least {APPROXIMATE_MIN_MENTORS} mentors, trading a little recall for speed."
+        ),
+    )
+    parser.add_argument(
+        "--constraint-mode",
+        choices=["aggregate", "propagator"],
+        default="aggregate",
+        help=(
+            "Enforce mentor capacities and per-type counts with grounded #count aggregates, or with a "
+            "clingo propagator that keeps the ground program small for large pools (default: aggregate)."
+        ),
+    )
+    parser.add_argument(
+        "--encoding",
+        choices=ENCODINGS,
+        default="baseline",
+        help=(
+            "ASP encoding: the original one, or a compact one that only offers days with enough candidates, "
+            "has no separate selected/1 choice and skips capacity checks of uncontended mentors "
+            "(default: baseline)."
+        ),
+    )
+    parser.add_argument(
+        "--kernelize",
+        action="store_true",
+        help=(
+            "Reduce the instance before solving: match uncontended students directly, drop unreachable "
+            "mentors and merge interchangeable ones (subject candidates and aggregate mode only)."
+        ),
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=STRATEGIES,
+        default="exact",
+        help=(
+            "exact: one clingo solve; lns: large neighborhood search in worker processes; greedy: fast "
+            "assignment without grounding; auto: choose from the estimated instance size (default: exact)."
+        ),
+    )
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=float,
+        default=DEFAULT_MEMORY_LIMIT_MB,
+        help=(
+            "Refuse exact/LNS solves whose ground program is estimated to need more memory, or fall back "
+            f"to greedy with --strategy auto; 0 disables the check (default: {DEFAULT_MEMORY_LIMIT_MB})."
+        ),
+    )
+    parser.add_argument(
+        "--lns-workers",
+        type=int,
+        default=0,
+        help=(
+            "Use large neighborhood search with this many solver processes instead of one "
+            f"monolithic solve; useful for cohorts that do not reach the optimum (default: 0, off; "
+            f"{DEFAULT_LNS_WORKERS} when --strategy lns or auto picks LNS; ignored with --strategy greedy)."
+        ),
+    )
+    parser.add_argument(
+        "--checkpoint-path",
+        help="Write every improving matching to this JSON file while solving.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Start from the matching in --checkpoint-path, if it exists and was written for the same "
+            "students, mentors and settings; the solver only keeps strictly better results."
+        ),
+    )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help=(
+            "Compare matched counts for every combination of --sweep-type1-n, --sweep-type2-n and "
+            "--sweep-capacity-scales, grounding the program once; --timeout-seconds applies per setting."
+        ),
+    )
+    parser.add_argument("--sweep-type1-n", type=int, nargs="+", default=[2, 3, 4], help="Default: 2 3 4.")
+    parser.add_argument("--sweep-type2-n", type=int, nargs="+", default=[0, 1, 2], help="Default: 0 1 2.")
+    parser.add_argument(
+        "--sweep-capacity-scales",
+        type=float,
+        nargs="+",
+        default=[1.0],
+        help="Factors applied to every mentor's Max_Studenten, one scenario each (default: 1.0).",
+    )
+    parser.add_argument(
+        "--sweep-path",
+        default="./DATASETS/sweep.csv",
+        help="Where --sweep writes its comparison table (default: ./DATASETS/sweep.csv).",
+    )
+    parser.add_argument(
+        "--diagnose",
+        action="store_true",
+        help=(
+            "Only report per student why they can or cannot be matched, plus an upper bound of "
+            "matchable students for other --type1-n/--type2-n values; skips the solver."
+        ),
+    )
+    parser.add_argument(
+        "--diagnostics-path",
+        help=(
+            "Write the per-student feasibility report to this CSV/Parquet/Arrow file "
+            "(default with --diagnose: ./DATASETS/diagnostics.csv)."
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CACHE_DIR),
+        help=f"Directory of the local result cache (default: {DEFAULT_CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always classify and solve, ignoring and not updating the result cache.",
+    )
     parser.add_argument(
         "--no-progress",
         action="store_true",
@@ -119,6 +657,12 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     if args.mentors_type2_path is None and args.type2_n is not None:
         parser.error("--type2-n requires --mentors-type2-path")
 
+    if args.resume and args.checkpoint_path is None:
+        parser.error("--resume requires --checkpoint-path")
+
+    if args.sweep and (args.encoding != "baseline" or args.constraint_mode != "aggregate" or args.kernelize):
+        parser.error("--sweep only supports --encoding baseline and --constraint-mode aggregate without --kernelize")
+
     for label, path_value in (
         ("students", args.students_input_path),
         ("mentors type1", args.mentors_type1_path),
@@ -152,6 +696,27 @@ def main(argv: list[str] | None = None) -> None:
         timeout_seconds=args.timeout_seconds,
         show_progress=not args.no_progress,
         verbose=not args.quiet,
+        classifier_mode=args.classifier,
+        fast_path_threshold=args.fast_path_threshold,
+        encode_workers=args.encode_workers,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        lns_workers=args.lns_workers,
+        candidate_mode=args.candidate_mode,
+        semantic_top_k=args.semantic_top_k,
+        semantic_approximate=args.semantic_approximate,
+        diagnostics_path=args.diagnostics_path or ("./DATASETS/diagnostics.csv" if args.diagnose else None),
+        diagnose_only=args.diagnose,
+        checkpoint_path=args.checkpoint_path,
+        resume=args.resume,
+        sweep_path=args.sweep_path if args.sweep else None,
+        sweep_type1_values=args.sweep_type1_n,
+        sweep_type2_values=args.sweep_type2_n,
+        sweep_capacity_scales=args.sweep_capacity_scales,
+        constraint_mode=args.constraint_mode,
+        encoding=args.encoding,
+        kernelize=args.kernelize,
+        strategy=args.strategy,
+        memory_limit_mb=args.memory_limit_mb,
     )
 
 
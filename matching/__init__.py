@@ -1,3 +1,4 @@
 from .engine import MatchingEngine
+from .io import read_table, write_table
 
-__all__ = ["MatchingEngine"]
\ No newline at end of file
+__all__ = ["MatchingEngine", "read_table", "write_table"]
\ No newline at end of file
@@ -0,0 +1,356 @@
+"""Track how fast the solver converges, and flag regressions against a baseline.
+
+Per instance of a fixed suite (the sample files in ``DATASETS`` and larger
+generated instances), :func:`anytime_curve` records every improving model of
+:meth:`MatchingEngine.solve_triples` as ``(seconds, matched)``. The time
+counts from the start of the solve call, so grounding is included. From
+the curve, :func:`curve_metrics` derives:
+
+* ``time_to_first_model``;
+* ``time_to_1pct``: the time until the matching is within 1% of the best
+  matched count;
+* ``anytime_auc``: the area under the curve of ``matched / best`` over the
+  time budget, between 0 and 1. Higher is better. Time before the first
+  model counts as 0.
+
+:func:`compare` computes the metrics of a run and of a stored baseline
+against the same best matched count, and marks each metric that got worse by
+more than the tolerance. The metrics only follow the matched count, so in
+``semantic`` mode the similarity tie-breaker is not tracked.
+
+Save a baseline with ``python -m matching.anytime --save-baseline anytime.json``.
+Later runs with ``--baseline anytime.json`` on the same machine exit non-zero
+on a regression.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .benchmark import VARIANTS, _engine
+from .instances import Instance, generate_instance
+from .io import read_table, write_table
+
+# Bump when the layout of the results file changes.
+ANYTIME_FORMAT_VERSION = 1
+
+# Improving models as (seconds since the solve call started, matched students).
+Curve = List[Tuple[float, int]]
+
+TIME_METRICS = ("time_to_first_model", "time_to_1pct")
+# Time differences below this are noise, however large relative to a tiny baseline.
+MIN_SECONDS_SLACK = 0.05
+
+
+@dataclass(frozen=True)
+class SuiteInstance:
+    load: Callable[[Path], Instance]
+    # Default solve budget; grounding the generated instances alone takes a good part of it.
+    timeout_seconds: float
+
+
+def _files(students: str, mentors_type1: str, mentors_type2: Optional[str] = None) -> Callable[[Path], Instance]:
+    def load(data_dir: Path) -> Instance:
+        return Instance(
+            students=read_table(data_dir / students),
+            mentors_type1=read_table(data_dir / mentors_type1),
+            mentors_type2=read_table(data_dir / mentors_type2) if mentors_type2 else None,
+        )
+
+    return load
+
+
+def _generated(students: int) -> Callable[[Path], Instance]:
+    # Same mentor ratio as the defaults of ``python -m matching.benchmark``.
+    return lambda data_dir: generate_instance(students, students * 2 // 5, students // 5, seed=0)
+
+
+# Instance suite; the sample files are read from --data-dir. A generated
+# instance of 3000 students already needs about 3 GB to ground.
+SUITE: Dict[str, SuiteInstance] = {
+    "sample25": SuiteInstance(_files("studenten25.csv", "mentoren25.csv"), 10),
+    "sample": SuiteInstance(_files("studenten.csv", "mentoren.csv", "mentorenB.csv"), 30),
+    "generated-1000": SuiteInstance(_generated(1000), 60),
+    "generated-2000": SuiteInstance(_generated(2000), 90),
+}
+
+
+def anytime_curve(
+    instance: Instance,
+    variant: str = "aggregate",
+    *,
+    n_type1: int = 3,
+    n_type2: int = 1,
+    timeout_seconds: float = 30,
+    solver_options: Sequence[str] = (),
+) -> Dict[str, object]:
+    """Solve *instance* once and return its curve, final matched count and optimality."""
+
+    engine = _engine(
+        instance,
+        variant,
+        n_type1=n_type1,
+        n_type2=n_type2 if instance.mentors_type2 is not None else 0,
+        engine_options={"solver_options": list(solver_options)},
+    )
+    curve: Curve = []
+    started = time.perf_counter()
+    outcome = engine.solve_triples(
+        timeout_seconds,
+        on_improvement=lambda matched, cost: curve.append((round(time.perf_counter() - started, 4), matched)),
+    )
+    return {"curve": curve, "matched": outcome.matched, "optimal": outcome.optimal}
+
+
+def curve_metrics(curve: Curve, timeout_seconds: float, best: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """Metrics of one curve relative to *best* (default: the curve's own last value)."""
+
+    best = best if best is not None else (curve[-1][1] if curve else 0)
+    if not curve:
+        return {"time_to_first_model": None, "time_to_1pct": None, "anytime_auc": 0.0}
+
+    area = 0.0
+    for (seconds, matched), (next_seconds, _) in zip(curve, [*curve[1:], (timeout_seconds, 0)]):
+        start, end = min(seconds, timeout_seconds), min(next_seconds, timeout_seconds)
+        area += (matched / best if best else 1.0) * max(0.0, end - start)
+    return {
+        "time_to_first_model": curve[0][0],
+        "time_to_1pct": next((seconds for seconds, matched in curve if matched >= 0.99 * best), None),
+        "anytime_auc": round(area / timeout_seconds, 4),
+    }
+
+
+def _median(values: Sequence[Optional[float]]) -> Optional[float]:
+    # A metric some repeats never reached counts as not reached.
+    if not values or any(value is None for value in values):
+        return None
+    return round(statistics.median(values), 4)
+
+
+def run_suite(
+    names: Sequence[str] = tuple(SUITE),
+    *,
+    data_dir: Path | str = "DATASETS",
+    variant: str = "aggregate",
+    n_type1: int = 3,
+    n_type2: int = 1,
+    timeout_seconds: Optional[float] = None,
+    repeats: int = 1,
+    solver_options: Sequence[str] = (),
+    verbose: bool = True,
+) -> Dict[str, object]:
+    """Record *repeats* curves per suite instance, each solve in a fresh process.
+
+    ``timeout_seconds`` overrides the budget of every instance.
+    """
+
+    unknown = set(names) - set(SUITE)
+    if unknown:
+        raise ValueError(f"Unknown instance(s): {', '.join(sorted(unknown))}. Choose from {', '.join(SUITE)}.")
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown variant '{variant}'. Choose from {', '.join(VARIANTS)}.")
+
+    instances: Dict[str, object] = {}
+    for name in names:
+        instance = SUITE[name].load(Path(data_dir))
+        budget = timeout_seconds or SUITE[name].timeout_seconds
+        runs = []
+        for _ in range(repeats):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                runs.append(
+                    pool.submit(
+                        anytime_curve,
+                        instance,
+                        variant,
+                        n_type1=n_type1,
+                        n_type2=n_type2,
+                        timeout_seconds=budget,
+                        solver_options=solver_options,
+                    ).result()
+                )
+        instances[name] = {"students": len(instance.students), "timeout_seconds": budget, "runs": runs}
+        if verbose:
+            print(f"{name}: {', '.join(str(run['matched']) for run in runs)} matched")
+
+    return {
+        "version": ANYTIME_FORMAT_VERSION,
+        "settings": {
+            "variant": variant,
+            "n_type1": n_type1,
+            "n_type2": n_type2,
+            "solver_options": list(solver_options),
+        },
+        "instances": instances,
+    }
+
+
+def summarize(results: Mapping[str, object], best: Optional[Mapping[str, int]] = None) -> pd.DataFrame:
+    """One row per instance: medians of the metrics over the repeats."""
+
+    rows = []
+    for name, entry in results["instances"].items():
+        runs = entry["runs"]
+        reference = (best or {}).get(name, max(run["matched"] for run in runs))
+        metrics = [curve_metrics(run["curve"], entry["timeout_seconds"], reference) for run in runs]
+        rows.append(
+            {
+                "instance": name,
+                "students": entry["students"],
+                "best": reference,
+                "matched": min(run["matched"] for run in runs),
+                "optimal": all(run["optimal"] for run in runs),
+                **{key: _median([metric[key] for metric in metrics]) for key in metrics[0]},
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def compare(
+    results: Mapping[str, object],
+    baseline: Mapping[str, object],
+    *,
+    tolerance: float = 0.25,
+    auc_tolerance: float = 0.01,
+) -> pd.DataFrame:
+    """Metrics of *results* next to *baseline*, with a ``regression`` flag per metric.
+
+    Both runs are measured against the best matched count either of them
+    found on that instance. A time metric regresses when it grows by more
+    than *tolerance* (relative), ``anytime_auc`` when it drops by more than
+    *auc_tolerance* (absolute), and ``matched`` when it drops at all.
+
+    The variant and solver options may differ from the baseline's; that is how
+    a clingo configuration is compared with the current one. Instances solved
+    with another budget are skipped.
+    """
+
+    problem = {key: results["settings"][key] for key in ("n_type1", "n_type2")}
+    if problem != {key: baseline["settings"][key] for key in problem}:
+        raise ValueError(f"Baseline was recorded for another problem: {baseline['settings']} instead of {problem}.")
+
+    shared = [
+        name
+        for name, entry in results["instances"].items()
+        if entry["timeout_seconds"] == baseline["instances"].get(name, {}).get("timeout_seconds")
+    ]
+    best = {
+        name: max(run["matched"] for entry in (results, baseline) for run in entry["instances"][name]["runs"])
+        for name in shared
+    }
+    current = summarize({**results, "instances": {n: results["instances"][n] for n in shared}}, best)
+    previous = summarize({**baseline, "instances": {n: baseline["instances"][n] for n in shared}}, best)
+
+    rows = []
+    for (_, now), (_, before) in zip(current.iterrows(), previous.iterrows()):
+        for metric in ("matched", *TIME_METRICS, "anytime_auc"):
+            old, new = before[metric], now[metric]
+            if metric == "matched":
+                regression = new < old
+            elif metric == "anytime_auc":
+                regression = new < old - auc_tolerance
+            elif pd.isna(new) or pd.isna(old):
+                regression = pd.isna(new) and not pd.isna(old)
+            else:
+                regression = new > old * (1 + tolerance) + MIN_SECONDS_SLACK
+            rows.append(
+                {"instance": now["instance"], "metric": metric, "baseline": old, "current": new, "regression": regression}
+            )
+    return pd.DataFrame(rows, columns=["instance", "metric", "baseline", "current", "regression"])
+
+
+def save_results(results: Mapping[str, object], path: Path | str) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+def load_results(path: Path | str) -> Dict[str, object]:
+    results = json.loads(Path(path).read_text(encoding="utf-8"))
+    if results.get("version") != ANYTIME_FORMAT_VERSION:
+        raise ValueError(f"{path} was written by another version of matching.anytime.")
+    for entry in results["instances"].values():
+        for run in entry["runs"]:
+            run["curve"] = [tuple(point) for point in run["curve"]]
+    return results
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Record anytime curves of the solver and compare them to a baseline.")
+    parser.add_argument(
+        "--instances",
+        nargs="+",
+        choices=list(SUITE),
+        default=list(SUITE),
+        help=f"Suite instances to run (default: {' '.join(SUITE)}).",
+    )
+    parser.add_argument("--data-dir", default="DATASETS", help="Directory with the sample files (default: DATASETS).")
+    parser.add_argument(
+        "--variant", choices=list(VARIANTS), default="aggregate", help="Engine variant (default: aggregate)."
+    )
+    parser.add_argument("--type1-n", type=int, default=3, help="Type 1 mentors per student (default: 3).")
+    parser.add_argument("--type2-n", type=int, default=1, help="Type 2 mentors per student (default: 1).")
+    parser.add_argument(
+        "--timeout-seconds", type=float, help="Solve budget of every run (default: per instance, 10 to 90 seconds)."
+    )
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per instance; metrics are medians (default: 1).")
+    parser.add_argument(
+        "--solver-option",
+        dest="solver_options",
+        action="append",
+        default=[],
+        help="Extra clingo option, e.g. --solver-option=--configuration=trendy; may be repeated.",
+    )
+    parser.add_argument("--baseline", help="Results file to compare against; exits non-zero on a regression.")
+    parser.add_argument("--save-baseline", help="Write the results of this run to this file.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Allowed relative growth of the time metrics (default: 0.25)."
+    )
+    parser.add_argument(
+        "--auc-tolerance", type=float, default=0.01, help="Allowed absolute drop of anytime_auc (default: 0.01)."
+    )
+    parser.add_argument("--output", help="Optional CSV/Parquet/Arrow file for the metrics table.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    results = run_suite(
+        args.instances,
+        data_dir=args.data_dir,
+        variant=args.variant,
+        n_type1=args.type1_n,
+        n_type2=args.type2_n,
+        timeout_seconds=args.timeout_seconds,
+        repeats=args.repeats,
+        solver_options=args.solver_options,
+    )
+    if args.save_baseline:
+        save_results(results, args.save_baseline)
+
+    if not args.baseline:
+        table = summarize(results)
+        print(table.to_string(index=False))
+        if args.output:
+            write_table(table, args.output)
+        return
+
+    table = compare(results, load_results(args.baseline), tolerance=args.tolerance, auc_tolerance=args.auc_tolerance)
+    if table.empty:
+        raise SystemExit("No instance was run with the same budget as in the baseline.")
+    print(table.to_string(index=False))
+    if args.output:
+        write_table(table, args.output)
+    if table["regression"].any():
+        raise SystemExit("Regressions against the baseline; see the table above.")
+
+
+if __name__ == "__main__":
+    main()
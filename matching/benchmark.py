@@ -0,0 +1,336 @@
+"""Compare solver variants on generated or real instances.
+
+Every measurement runs in a fresh worker process, so the reported peak
+resident memory belongs to that variant alone. Per variant the table lists
+the ground program size (atoms, rules, solver variables and constraints),
+grounding time, peak memory, the time of the first and of the last improving
+model and, when the search space was exhausted in time, the time to the
+proven optimum. With several ``--students`` sizes every variant is measured
+on generated instances of each size.
+
+:func:`check_equivalence` solves small instances with every variant, checks
+each matching against the instance (capacities, mentor counts, candidates,
+one day per student) and compares the proven optima; run it after changing
+an encoding with ``python -m matching.benchmark --check-equivalence``.
+
+Run ``python -m matching.benchmark --help`` for the command line.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import pandas as pd
+from clingo import Control
+
+from .engine import MatchingEngine, MatchTriple
+from .instances import Instance, generate_instance
+from .io import read_table, write_table
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Engine keyword arguments per benchmark variant.
+VARIANTS: Dict[str, Dict[str, object]] = {
+    "aggregate": {"constraint_mode": "aggregate"},
+    "propagator": {"constraint_mode": "propagator"},
+    "kernel": {"kernelize": True},
+    "compact": {"encoding": "compact"},
+    "compact-propagator": {"encoding": "compact", "constraint_mode": "propagator"},
+}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _engine(
+    instance: Instance,
+    variant: str,
+    *,
+    n_type1: int,
+    n_type2: int,
+    engine_options: Optional[Mapping[str, object]] = None,
+) -> MatchingEngine:
+    engine = MatchingEngine(
+        students_df=instance.students,
+        mentors_type1_df=instance.mentors_type1,
+        mentors_type2_df=instance.mentors_type2,
+        n_type1=n_type1,
+        n_type2=n_type2,
+        verbose=False,
+        **{**VARIANTS[variant], **(engine_options or {})},
+    )
+    engine.load_data()
+    return engine
+
+
+def measure_variant(
+    instance: Instance,
+    variant: str,
+    *,
+    n_type1: int,
+    n_type2: int,
+    timeout_seconds: float,
+    engine_options: Optional[Mapping[str, object]] = None,
+) -> Dict[str, object]:
+    """Ground and solve *instance* with one variant in the current process."""
+
+    engine = _engine(instance, variant, n_type1=n_type1, n_type2=n_type2, engine_options=engine_options)
+
+    started = time.perf_counter()
+    kernel = engine.kernel() if engine.kernelize else None
+    ctl = Control(engine.solver_arguments())
+    for propagator in engine.propagators():
+        ctl.register_propagator(propagator)
+    ctl.add("base", [], kernel.program(engine._objective()) if kernel else engine._build_asp_program())
+    ctl.ground([("base", [])])
+    ground_seconds = time.perf_counter() - started
+
+    improvements = []
+    costs = []
+    fixed_students = kernel.fixed_students if kernel else 0
+    solve_started = time.perf_counter()
+
+    def on_model(model) -> None:
+        costs.append(tuple(model.cost))
+        improvements.append((time.perf_counter() - solve_started, (-model.cost[0] if model.cost else 0) + fixed_students))
+
+    with ctl.solve(on_model=on_model, async_=True) as handle:
+        handle.wait(timeout_seconds)
+        handle.cancel()
+        result = handle.get()
+    solve_seconds = time.perf_counter() - solve_started
+
+    lp = ctl.statistics["problem"]["lp"]
+    generator = ctl.statistics["problem"]["generator"]
+    optimal = bool(result.satisfiable and (result.exhausted or costs[-1:] == [()]))
+    return {
+        "variant": variant,
+        "students": len(instance.students),
+        "atoms": int(lp["atoms"]),
+        "rules": int(lp["rules"]),
+        "solver_vars": int(generator["vars"]),
+        "solver_constraints": int(generator["constraints"]),
+        "ground_seconds": round(ground_seconds, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "matched": improvements[-1][1] if improvements else 0,
+        "models": len(improvements),
+        "time_to_first_model": round(improvements[0][0], 3) if improvements else None,
+        "time_to_best": round(improvements[-1][0], 3) if improvements else None,
+        "time_to_optimum": round(solve_seconds, 3) if optimal else None,
+        "optimal": optimal,
+    }
+
+
+def run_benchmark(
+    instance: Instance,
+    variants: Sequence[str] = tuple(VARIANTS),
+    *,
+    n_type1: int = 3,
+    n_type2: int = 1,
+    timeout_seconds: float = 60,
+    engine_options: Optional[Mapping[str, object]] = None,
+) -> pd.DataFrame:
+    """Measure each variant in its own process and return one row per variant."""
+
+    unknown = set(variants) - set(VARIANTS)
+    if unknown:
+        raise ValueError(f"Unknown variant(s): {', '.join(sorted(unknown))}. Choose from {', '.join(VARIANTS)}.")
+
+    rows = []
+    for variant in variants:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            rows.append(
+                pool.submit(
+                    measure_variant,
+                    instance,
+                    variant,
+                    n_type1=n_type1,
+                    n_type2=n_type2 if instance.mentors_type2 is not None else 0,
+                    timeout_seconds=timeout_seconds,
+                    engine_options=engine_options,
+                ).result()
+            )
+    return pd.DataFrame(rows)
+
+
+def violations(engine: MatchingEngine, triples: Sequence[MatchTriple]) -> List[str]:
+    """Everything in *triples* that breaks the engine's matching rules; empty when valid."""
+
+    index = engine.candidate_index()
+    required = {"type1": engine.n_type1, "type2": engine.n_type2}
+    problems = []
+    if len(set(triples)) != len(triples):
+        problems.append("duplicate triples")
+    for mentor_id, count in Counter(mentor_id for _, mentor_id, _ in triples).items():
+        if count > engine._mentor_lookup[mentor_id]["max_students"]:
+            problems.append(f"{mentor_id} exceeds its capacity")
+
+    per_student: Dict[str, List[MatchTriple]] = {}
+    for triple in triples:
+        per_student.setdefault(triple[0], []).append(triple)
+    for student_id, student_triples in per_student.items():
+        days = {day for _, _, day in student_triples}
+        if len(days) != 1:
+            problems.append(f"{student_id} is matched on {len(days)} days")
+            continue
+        groups = index[student_id].get(days.pop(), {"type1": [], "type2": []})
+        for mentor_type, count in required.items():
+            chosen = [m for _, m, _ in student_triples if engine._mentor_lookup[m]["mentor_type"] == mentor_type]
+            if len(chosen) != count:
+                problems.append(f"{student_id} has {len(chosen)} {mentor_type} mentors instead of {count}")
+            if not set(chosen) <= set(groups[mentor_type]):
+                problems.append(f"{student_id} has a {mentor_type} mentor that is not a candidate")
+    return problems
+
+
+def check_equivalence(
+    instances: Sequence[Instance],
+    variants: Sequence[str] = tuple(VARIANTS),
+    *,
+    n_type1: int = 2,
+    n_type2: int = 1,
+    timeout_seconds: float = 30,
+) -> pd.DataFrame:
+    """Solve every instance with every variant and compare the results.
+
+    Returns one row per instance and variant. ``valid`` is False when the
+    matching breaks a rule (see :func:`violations`) and ``equivalent`` is
+    False when a proven optimum differs from the proven optimum of another
+    variant on the same instance.
+    """
+
+    rows = []
+    for number, instance in enumerate(instances):
+        instance_rows = []
+        for variant in variants:
+            engine = _engine(
+                instance,
+                variant,
+                n_type1=n_type1,
+                n_type2=n_type2 if instance.mentors_type2 is not None else 0,
+            )
+            outcome = engine.solve_triples(timeout_seconds)
+            problems = violations(engine, outcome.triples)
+            instance_rows.append(
+                {
+                    "instance": number,
+                    "variant": variant,
+                    "matched": outcome.matched,
+                    "optimal": outcome.optimal,
+                    "valid": not problems,
+                    "problems": "; ".join(problems[:3]),
+                }
+            )
+        optima = {row["matched"] for row in instance_rows if row["optimal"]}
+        for row in instance_rows:
+            row["equivalent"] = len(optima) <= 1 and (row["optimal"] or not optima or row["matched"] <= min(optima))
+        rows.extend(instance_rows)
+    return pd.DataFrame(rows)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ASP encodings and constraint modes of the matching engine.")
+    parser.add_argument("--students-input-path", help="Classified students table; generated when omitted.")
+    parser.add_argument("--mentors-type1-path", help="Type 1 mentor table (with --students-input-path).")
+    parser.add_argument("--mentors-type2-path", help="Optional Type 2 mentor table.")
+    parser.add_argument(
+        "--students",
+        type=int,
+        nargs="+",
+        default=[500],
+        help="Generated students; several sizes measure each one, with mentors scaled along (default: 500).",
+    )
+    parser.add_argument(
+        "--mentors-type1", type=int, default=200, help="Generated Type 1 mentors per 500 students (default: 200)."
+    )
+    parser.add_argument(
+        "--mentors-type2", type=int, default=100, help="Generated Type 2 mentors per 500 students (default: 100)."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the instance generator (default: 0).")
+    parser.add_argument("--type1-n", type=int, default=3, help="Type 1 mentors per student (default: 3).")
+    parser.add_argument("--type2-n", type=int, default=1, help="Type 2 mentors per student (default: 1).")
+    parser.add_argument(
+        "--variants",
+        nargs="+",
+        choices=list(VARIANTS),
+        default=list(VARIANTS),
+        help=f"Variants to compare (default: {' '.join(VARIANTS)}).",
+    )
+    parser.add_argument("--timeout-seconds", type=float, default=60, help="Solve budget per variant (default: 60).")
+    parser.add_argument("--output", help="Optional CSV/Parquet/Arrow file for the result table.")
+    parser.add_argument(
+        "--check-equivalence",
+        action="store_true",
+        help="Instead of measuring, check that all variants find valid matchings with equal optima on small instances.",
+    )
+
+    args = parser.parse_args(argv)
+    if args.students_input_path and not args.mentors_type1_path:
+        parser.error("--students-input-path requires --mentors-type1-path")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+
+    if args.check_equivalence:
+        instances = [
+            generate_instance(students, students // 3, students // 6, n_subjects=4, seed=args.seed + seed)
+            for seed in range(4)
+            for students in (15, 20)
+        ]
+        table = check_equivalence(instances, args.variants, timeout_seconds=args.timeout_seconds)
+        print(table.to_string(index=False))
+        if not (table["valid"].all() and table["equivalent"].all()):
+            raise SystemExit("Variants disagree; see the table above.")
+        return
+
+    if args.students_input_path:
+        instances = [
+            Instance(
+                students=read_table(args.students_input_path),
+                mentors_type1=read_table(args.mentors_type1_path),
+                mentors_type2=read_table(args.mentors_type2_path) if args.mentors_type2_path else None,
+            )
+        ]
+    else:
+        instances = [
+            generate_instance(
+                students,
+                max(1, args.mentors_type1 * students // 500),
+                args.mentors_type2 * students // 500,
+                seed=args.seed,
+            )
+            for students in args.students
+        ]
+
+    table = pd.concat(
+        [
+            run_benchmark(
+                instance,
+                args.variants,
+                n_type1=args.type1_n,
+                n_type2=args.type2_n,
+                timeout_seconds=args.timeout_seconds,
+            )
+            for instance in instances
+        ],
+        ignore_index=True,
+    )
+    print(table.to_string(index=False))
+    if args.output:
+        write_table(table, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from peer2pro_io import CACHE_VERSION, content_key, file_digest
+
+DEFAULT_CACHE_DIR = Path(".peer2pro_cache") / "results"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+__all__ = ["CACHE_VERSION", "DEFAULT_CACHE_DIR", "ResultCache", "content_key", "file_digest"]
+
+
+class ResultCache:
+    """Local content-addressed store for classifications and matching results.
+
+    Entries live in ``<cache_dir>/<namespace>/<key>.pkl``. Reads refresh an
+    entry's modification time; writes evict entries older than
+    ``max_age_seconds`` and then the least recently used ones until the store
+    fits in ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | str = DEFAULT_CACHE_DIR,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.cache_dir / namespace / f"{key}.pkl"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        path = self._path(namespace, key)
+        try:
+            with path.open("rb") as handle:
+                value = pickle.load(handle)
+        except FileNotFoundError:
+            return None
+        except Exception:  # noqa: BLE001 - truncated or stale pickles (renamed classes, old modules) are misses
+            return None
+
+        if time.time() - path.stat().st_mtime > self.max_age_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)
+        return value
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as handle:
+            pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> None:
+        if not self.cache_dir.exists():
+            return
+
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*/*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        for path in self.cache_dir.glob("*/*.pkl"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,98 @@
+"""JSON checkpoints of the best matching found so far.
+
+A checkpoint holds the ``match/3`` triples and cost of the last improving
+model together with a signature of the ground instance (the full ASP program
+and solver options), so a later run only resumes from a checkpoint written
+for exactly the same students, mentors and settings.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .cache import content_key
+
+CHECKPOINT_VERSION = 1
+
+MatchTriple = Tuple[str, str, str]
+
+
+@dataclass
+class Checkpoint:
+    signature: str
+    triples: List[MatchTriple]
+    cost: Tuple[int, ...]
+    optimal: bool = False
+    updated_at: float = 0.0
+
+    @property
+    def matched(self) -> int:
+        return len({student_id for student_id, _, _ in self.triples})
+
+
+def instance_signature(program: str, solver_arguments: Sequence[str] = ()) -> str:
+    """Hash of everything that determines which matchings are feasible and how they score."""
+
+    return content_key("instance", program, tuple(solver_arguments))
+
+
+def save_checkpoint(
+    path: Path | str,
+    *,
+    signature: str,
+    triples: Sequence[MatchTriple],
+    cost: Sequence[int],
+    optimal: bool = False,
+) -> None:
+    """Atomically replace the checkpoint at *path*."""
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "version": CHECKPOINT_VERSION,
+        "signature": signature,
+        "cost": list(cost),
+        "optimal": optimal,
+        "updated_at": time.time(),
+        "matches": [list(triple) for triple in triples],
+    }
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        json.dump(payload, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: Path | str, signature: Optional[str] = None) -> Optional[Checkpoint]:
+    """Read a checkpoint, or return ``None`` when *path* does not exist.
+
+    Raises ``ValueError`` when *signature* is given and the checkpoint was
+    written for another instance.
+    """
+
+    path = Path(path)
+    if not path.exists():
+        return None
+    with path.open(encoding="utf-8") as handle:
+        payload = json.load(handle)
+
+    if payload.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version in {path}: {payload.get('version')}")
+    if signature is not None and payload["signature"] != signature:
+        raise ValueError(
+            f"Checkpoint {path} was written for a different instance "
+            "(students, mentors, n_type1/n_type2 or candidate mode changed)."
+        )
+    return Checkpoint(
+        signature=payload["signature"],
+        triples=[tuple(triple) for triple in payload["matches"]],
+        cost=tuple(payload["cost"]),
+        optimal=bool(payload["optimal"]),
+        updated_at=float(payload["updated_at"]),
+    )
@@ -0,0 +1,206 @@
+"""Pre-solve feasibility diagnostics on the engine's candidate index.
+
+Everything here is computed from :meth:`MatchingEngine.candidate_index` and
+the mentor caches, without grounding or solving, so it explains unmatched
+students and bounds the result of other ``n_type1``/``n_type2`` settings in
+milliseconds.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .engine import MatchingEngine
+
+# Reasons in the order they are checked; the first that applies is reported.
+REASONS = (
+    "no_subject_mentors",
+    "education_blocked",
+    "no_shared_day",
+    "too_few_type1",
+    "too_few_type2",
+    "feasible",
+)
+
+
+@dataclass
+class DiagnosticReport:
+    students: pd.DataFrame
+    mentors: pd.DataFrame
+    bounds: pd.DataFrame
+
+    def reason_counts(self) -> pd.Series:
+        counts = self.students["reason"].value_counts()
+        return counts.reindex([reason for reason in REASONS if reason in counts.index])
+
+
+def _feasible_days(days: Dict[str, Dict[str, List[str]]], n_type1: int, n_type2: int) -> List[str]:
+    return [
+        day
+        for day, groups in days.items()
+        if len(groups["type1"]) >= n_type1 and len(groups["type2"]) >= n_type2
+    ]
+
+
+def _student_reason(
+    engine: MatchingEngine,
+    student: Dict,
+    days: Dict[str, Dict[str, List[str]]],
+    by_subject: Dict[str, List[Dict]],
+) -> str:
+    if engine.candidate_mode == "semantic":
+        retrieved = [engine._mentor_lookup[m] for m, _ in engine._semantic_candidates.get(student["id"], [])]
+    else:
+        retrieved = by_subject.get(student["subject_atom"], [])
+    if not retrieved:
+        return "no_subject_mentors"
+    if all(mentor["education_level"] <= student["education_level"] for mentor in retrieved):
+        return "education_blocked"
+    if not any(groups["type1"] or groups["type2"] for groups in days.values()):
+        return "no_shared_day"
+    if not any(len(groups["type1"]) >= engine.n_type1 for groups in days.values()):
+        return "too_few_type1"
+    if not _feasible_days(days, engine.n_type1, engine.n_type2):
+        return "too_few_type2"
+    return "feasible"
+
+
+def mentor_demand(engine: MatchingEngine) -> Dict[str, int]:
+    """Number of students that have each mentor as a candidate on some day."""
+
+    demand = {mentor["id"]: 0 for mentor in engine._mentors_cache}
+    for days in engine.candidate_index().values():
+        for mentor_id in {m for groups in days.values() for ids in groups.values() for m in ids}:
+            demand[mentor_id] += 1
+    return demand
+
+
+def upper_bound(engine: MatchingEngine, n_type1: int, n_type2: int) -> Dict[str, int]:
+    """Bound the number of matchable students for one parameter setting.
+
+    Students and mentors are split into connected components of the
+    candidate graph. Within a component no more students can be matched than
+    are individually feasible, nor than the component's type-1 and type-2
+    capacity divided by the mentors each student needs.
+    """
+
+    index = engine.candidate_index()
+    parent: Dict[str, str] = {}
+
+    def find(node: str) -> str:
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    feasible = []
+    for student_id, days in index.items():
+        if not _feasible_days(days, n_type1, n_type2):
+            continue
+        feasible.append(student_id)
+        for day in _feasible_days(days, n_type1, n_type2):
+            for mentor_id in days[day]["type1"] + days[day]["type2"]:
+                parent[find(mentor_id)] = find(student_id)
+
+    components: Dict[str, Dict[str, int]] = {}
+    for student_id in feasible:
+        components.setdefault(find(student_id), {"students": 0, "type1": 0, "type2": 0})["students"] += 1
+    for mentor in engine._mentors_cache:
+        if mentor["id"] in parent:
+            components[find(mentor["id"])][mentor["mentor_type"]] += mentor["max_students"]
+
+    capacity_bound = bound = 0
+    for component in components.values():
+        limits = [component["type1"] // n_type1 if n_type1 else component["students"]]
+        limits.append(component["type2"] // n_type2 if n_type2 else component["students"])
+        capacity_bound += min(limits)
+        bound += min([component["students"], *limits])
+
+    return {
+        "n_type1": n_type1,
+        "n_type2": n_type2,
+        "individually_feasible": len(feasible),
+        "capacity_bound": capacity_bound,
+        "upper_bound": bound,
+    }
+
+
+def bound_table(
+    engine: MatchingEngine,
+    n_type1_values: Optional[Iterable[int]] = None,
+    n_type2_values: Optional[Iterable[int]] = None,
+) -> pd.DataFrame:
+    """:func:`upper_bound` for every combination of the given settings."""
+
+    has_type2 = any(mentor["mentor_type"] == "type2" for mentor in engine._mentors_cache)
+    n_type1_values = n_type1_values or range(1, max(4, engine.n_type1) + 1)
+    n_type2_values = n_type2_values or (range(0, max(2, engine.n_type2) + 1) if has_type2 else [0])
+    return pd.DataFrame(
+        [upper_bound(engine, n_type1, n_type2) for n_type1 in n_type1_values for n_type2 in n_type2_values]
+    )
+
+
+def diagnose(
+    engine: MatchingEngine,
+    n_type1_values: Optional[Iterable[int]] = None,
+    n_type2_values: Optional[Iterable[int]] = None,
+) -> DiagnosticReport:
+    """Explain per student why they can or cannot be matched with the engine's settings.
+
+    ``contention`` is the mean demand/capacity ratio of a student's candidate
+    mentors; values well above 1 mean they compete with many other students
+    for the same mentors.
+    """
+
+    index = engine.candidate_index()
+    demand = mentor_demand(engine)
+    pressure = {
+        mentor["id"]: demand[mentor["id"]] / mentor["max_students"] if mentor["max_students"] else float("inf")
+        for mentor in engine._mentors_cache
+    }
+
+    student_rows = []
+    for student in engine._students_cache:
+        days = index[student["id"]]
+        mentor_ids = {m for groups in days.values() for ids in groups.values() for m in ids}
+        pressures = [pressure[m] for m in mentor_ids]
+        student_rows.append(
+            {
+                "student_id": student["id"],
+                "voornaam": student["data"]["voornaam"],
+                "achternaam": student["data"]["achternaam"],
+                "onderwerp": student["data"]["onderwerp"],
+                "reason": _student_reason(engine, student, days, engine._mentors_by_subject),
+                "feasible_days": len(_feasible_days(days, engine.n_type1, engine.n_type2)),
+                "max_type1": max((len(groups["type1"]) for groups in days.values()), default=0),
+                "max_type2": max((len(groups["type2"]) for groups in days.values()), default=0),
+                "candidates_per_day": ", ".join(
+                    f"{day}:{len(groups['type1'])}/{len(groups['type2'])}" for day, groups in days.items()
+                ),
+                "contention": sum(pressures) / len(pressures) if pressures else 0.0,
+                "max_contention": max(pressures, default=0.0),
+            }
+        )
+
+    mentor_rows = [
+        {
+            "mentor_id": mentor["id"],
+            "voornaam": mentor["data"]["voornaam"],
+            "achternaam": mentor["data"]["achternaam"],
+            "type": mentor["data"]["type"],
+            "max_students": mentor["max_students"],
+            "demand": demand[mentor["id"]],
+            "pressure": pressure[mentor["id"]],
+        }
+        for mentor in engine._mentors_cache
+    ]
+
+    return DiagnosticReport(
+        students=pd.DataFrame(student_rows),
+        mentors=pd.DataFrame(mentor_rows).sort_values("pressure", ascending=False, ignore_index=True),
+        bounds=bound_table(engine, n_type1_values, n_type2_values),
+    )
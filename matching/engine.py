@@ -1,39 +1,122 @@
 from __future__ import annotations
 
 import ast
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import pandas as pd
 from clingo import Control
 
+from .checkpoint import instance_signature, load_checkpoint, save_checkpoint
+from .io import table_format, write_table
+from .kernel import Kernel, kernelize
+from .propagator import CountPropagator, build_propagator
+from .semantic import SCORE_SCALE, SemanticRetriever
+
+if TYPE_CHECKING:
+    from .mentor_pool import MentorPool
+
 StudentMatch = Tuple[Dict[str, str], List[Dict[str, str]], List[Dict[str, str]], str]
+# Compact form of a match/3 atom: (student_id, mentor_id, day).
+MatchTriple = Tuple[str, str, str]
+# Called with (matched student count, model cost) for every improving model.
+ImprovementCallback = Callable[[int, Tuple[int, ...]], None]
+
+CANCEL_POLL_SECONDS = 0.1
+
+CANDIDATE_MODES = ("subject", "semantic")
+# "aggregate" grounds #count constraints; "propagator" enforces them in matching.propagator.
+CONSTRAINT_MODES = ("aggregate", "propagator")
+# "baseline" is the original encoding; "compact" restricts match_day/2 to days
+# with enough candidates, drops the selected/1 choice and only grounds
+# capacity constraints for mentors with more reachable students than room.
+ENCODINGS = ("baseline", "compact")
+
+DEFAULT_EDUCATION_MAPPING = {
+    "Associate": 1,
+    "Bachelor": 2,
+    "Master": 3,
+    "PhD": 4,
+}
+
+MATCH_LIST_TYPES = {
+    "type1_mentor_ids": "int64",
+    "type1_mentors": "string",
+    "type2_mentor_ids": "int64",
+    "type2_mentors": "string",
+}
+
+
+@dataclass
+class SolveOutcome:
+    triples: List[MatchTriple]
+    cost: Optional[Tuple[int, ...]]
+    optimal: bool = False
+    interrupted: bool = False
+    unsatisfiable: bool = False
+
+    @property
+    def matched(self) -> int:
+        return len({student_id for student_id, _, _ in self.triples})
 
 
 class MatchingEngine:
     def __init__(
         self,
         *,
-        students_df: pd.DataFrame,
-        mentors_type1_df: pd.DataFrame,
+        students_df: Optional[pd.DataFrame] = None,
+        mentors_type1_df: Optional[pd.DataFrame] = None,
         mentors_type2_df: Optional[pd.DataFrame] = None,
+        mentor_pool: Optional["MentorPool"] = None,
         n_type1: int = 3,
         n_type2: int = 2,
         education_mapping: Optional[Dict[str, int]] = None,
+        candidate_mode: str = "subject",
+        retriever: Optional[SemanticRetriever] = None,
+        description_column: str = "omschrijving",
+        constraint_mode: str = "aggregate",
+        encoding: str = "baseline",
+        kernelize: bool = False,
+        solver_options: Sequence[str] = (),
         verbose: bool = True,
     ) -> None:
+        if candidate_mode not in CANDIDATE_MODES:
+            raise ValueError(f"Unknown candidate_mode '{candidate_mode}'; choose from {', '.join(CANDIDATE_MODES)}.")
+        if constraint_mode not in CONSTRAINT_MODES:
+            raise ValueError(
+                f"Unknown constraint_mode '{constraint_mode}'; choose from {', '.join(CONSTRAINT_MODES)}."
+            )
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding '{encoding}'; choose from {', '.join(ENCODINGS)}.")
+        if kernelize and (candidate_mode, constraint_mode) != ("subject", "aggregate"):
+            raise ValueError("kernelize requires candidate_mode='subject' and constraint_mode='aggregate'.")
+        if (mentors_type1_df is None) == (mentor_pool is None):
+            raise ValueError("Pass either mentors_type1_df or a compiled mentor_pool.")
+        if mentor_pool is not None and education_mapping not in (None, mentor_pool.education_mapping):
+            raise ValueError("The mentor pool was compiled with another education_mapping.")
         self.verbose = verbose
-        self._students_df = students_df.copy()
-        self._mentors_type1_df = mentors_type1_df.copy()
-        self._mentors_type2_df = mentors_type2_df.copy() if mentors_type2_df is not None else None
-        self.education_mapping = education_mapping or {
-            "Associate": 1,
-            "Bachelor": 2,
-            "Master": 3,
-            "PhD": 4,
-        }
+        self.candidate_mode = candidate_mode
+        self.constraint_mode = constraint_mode
+        self.encoding = encoding
+        self.kernelize = kernelize
+        self.solver_options = list(solver_options)
+        self.retriever = retriever
+        self.description_column = description_column
+        # The frames are only read when the caches are built, so they are not copied.
+        self._students_df = students_df
+        self._mentors_type1_df = mentors_type1_df
+        self._mentors_type2_df = mentors_type2_df
+        self._mentor_pool = mentor_pool
+        if mentor_pool is not None:
+            self.education_mapping = mentor_pool.education_mapping
+        else:
+            self.education_mapping = education_mapping or dict(DEFAULT_EDUCATION_MAPPING)
 
         self.n_type1 = n_type1
-        if self._mentors_type2_df is None and n_type2 > 0:
+        has_type2 = mentor_pool.has_type2 if mentor_pool is not None else mentors_type2_df is not None
+        if not has_type2 and n_type2 > 0:
             if self.verbose:
                 print("No Type 2 mentors provided; overriding n_type2 to 0.")
             self.n_type2 = 0
@@ -44,153 +127,355 @@ class MatchingEngine:
         self._student_lookup: Dict[str, Dict] = {}
         self._mentors_cache: List[Dict] = []
         self._mentor_lookup: Dict[str, Dict] = {}
-        self._loaded = False
+        self._mentors_by_subject: Dict[str, List[Dict]] = {}
+        self._student_facts: Optional[str] = None
+        self._mentor_facts: Optional[str] = None
+        self._candidate_index: Optional[Dict[str, Dict[str, Dict[str, List[str]]]]] = None
+        self._semantic_candidates: Dict[str, List[Tuple[str, int]]] = {}
+        self._kernel: Optional[Kernel] = None
+
+    def set_students(self, students_df: pd.DataFrame) -> None:
+        """Provide (or replace) the classified students after construction.
+
+        Mentor caches and facts built by :meth:`load_mentors` are kept, so the
+        mentor side can be prepared while the students are still being
+        classified. The frame is not copied; it is read by the next
+        :meth:`load_students`.
+        """
+
+        self._students_df = students_df
+        self._student_facts = None
+        self._candidate_index = None
+        self._kernel = None
+
+    def set_retriever(self, retriever: SemanticRetriever) -> None:
+        """Provide the retriever of the ``semantic`` candidate mode.
+
+        Like :meth:`set_students`, this may happen after :meth:`load_mentors`,
+        once the embedding model is available.
+        """
+
+        self.retriever = retriever
+        self._student_facts = None
+        self._candidate_index = None
+        self._kernel = None
+
+    def load_mentors(self) -> None:
+        """Build the mentor caches and facts, or take them from the compiled mentor pool."""
+
+        if self._mentor_pool is not None:
+            self._mentors_cache = self._mentor_pool.mentors
+            self._mentor_lookup = {mentor["id"]: mentor for mentor in self._mentors_cache}
+            self._mentors_by_subject = self._mentor_pool.by_subject
+            self._mentor_facts = self._mentor_pool.facts
+        else:
+            self._mentors_cache, self._mentor_lookup = self._build_mentors_cache(
+                self._mentors_type1_df, self._mentors_type2_df
+            )
+            self._mentors_by_subject = self._index_by_subject(self._mentors_cache)
+            self._mentor_facts = self._generate_mentor_facts()
+        if self.candidate_mode == "semantic":
+            # Semantic candidates are part of the student facts and refer to mentor IDs.
+            self._student_facts = None
+        self._candidate_index = None
+        self._kernel = None
+
+    def load_students(self) -> None:
+        if self._students_df is None:
+            raise ValueError("No students provided; pass students_df or call set_students() first.")
+        self._students_cache, self._student_lookup = self._build_students_cache(self._students_df)
+        if self.candidate_mode == "semantic":
+            if self._mentor_facts is None:
+                self.load_mentors()
+            self._semantic_candidates = self._retrieve_semantic_candidates()
+        self._student_facts = self._generate_student_facts()
+        self._candidate_index = None
+        self._kernel = None
 
     def load_data(self) -> None:
-        students_df = self._students_df
-        mentors_type1_df = self._mentors_type1_df
-        mentors_type2_df = self._mentors_type2_df
+        self.load_mentors()
+        self.load_students()
 
-        self._students_cache, self._student_lookup = self._build_students_cache(students_df)
-        self._mentors_cache, self._mentor_lookup = self._build_mentors_cache(
-            mentors_type1_df, mentors_type2_df
+    def solve_matches(
+        self,
+        timeout_seconds: int = 120,
+        *,
+        on_improvement: Optional[ImprovementCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        checkpoint_path: Optional[str] = None,
+        warm_start: Optional[SolveOutcome] = None,
+    ) -> List[StudentMatch]:
+        outcome = self.solve_triples(
+            timeout_seconds,
+            on_improvement=on_improvement,
+            cancel_event=cancel_event,
+            checkpoint_path=checkpoint_path,
+            warm_start=warm_start,
         )
-        self._loaded = True
+        return self.matches_from_triples(outcome.triples)
+
+    def solve_triples(
+        self,
+        timeout_seconds: float = 120,
+        *,
+        on_improvement: Optional[ImprovementCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        checkpoint_path: Optional[str] = None,
+        warm_start: Optional[SolveOutcome] = None,
+    ) -> SolveOutcome:
+        """Solve and return the best model as compact ``match/3`` triples.
+
+        With ``checkpoint_path`` every improving model is written there (see
+        :mod:`matching.checkpoint`). A ``warm_start`` from an earlier run is
+        the initial incumbent: the solver prefers its atoms, must match at
+        least as many students, and only strictly better models replace it.
+        """
 
-    def solve_matches(self, timeout_seconds: int = 120) -> List[StudentMatch]:
         self._ensure_loaded()
 
-        ctl = Control()
-        ctl.add("base", [], self._build_asp_program())
+        if warm_start is not None:
+            # LNS, greedy and older checkpoints may carry a shorter cost than the
+            # objective; a (-matched,) cost would reject every model that ties
+            # on the matched count before the similarity level is compared.
+            warm_start = replace(warm_start, cost=self.objective_cost(warm_start.triples))
+        if warm_start is not None and warm_start.optimal:
+            if self.verbose:
+                print(f"Warm start is optimal - returning {warm_start.matched} students")
+            return warm_start
+
+        arguments = self.solver_arguments()
+        signature = self.instance_signature() if checkpoint_path else None
+        kernel = self.kernel() if self.kernelize else None
+        program = kernel.program(self._objective()) if kernel is not None else self._build_asp_program()
+        if warm_start is not None:
+            if kernel is None:
+                arguments = [*arguments, "--heuristic=Domain"]
+            program += self._warm_start_rules(warm_start, kernel)
+
+        ctl = Control(arguments)
+        for propagator in self.propagators():
+            ctl.register_propagator(propagator)
+        ctl.add("base", [], program)
         ctl.ground([("base", [])])
 
-        matches: List[StudentMatch] = []
-        best_cost: Optional[Tuple[int, ...]] = None
+        best_triples: List[MatchTriple] = list(warm_start.triples) if warm_start is not None else []
+        best_cost: Optional[Tuple[int, ...]] = tuple(warm_start.cost) if warm_start is not None else None
 
         def collect_matches(model) -> None:
-            nonlocal best_cost
-
-            grouped: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
-            for symbol in model.symbols(shown=True):
-                if symbol.name != "match":
-                    continue
-
-                student_id = symbol.arguments[0].name
-                mentor_id = symbol.arguments[1].name
-                day = symbol.arguments[2].name
-
-                key = (student_id, day)
-                grouped.setdefault(key, {"type1": [], "type2": []})
-                mentor_type = self._mentor_lookup[mentor_id]["mentor_type"]
-                grouped[key][mentor_type].append(mentor_id)
-
-            temp_matches: List[StudentMatch] = []
-            for (student_id, day), mentor_groups in grouped.items():
-                student_entry = self._student_lookup[student_id]
-                student_data = student_entry["data"].copy()
-
-                mentors_type1 = [
-                    self._mentor_lookup[m]["data"].copy() for m in sorted(mentor_groups["type1"])
-                ]
-                mentors_type2 = [
-                    self._mentor_lookup[m]["data"].copy() for m in sorted(mentor_groups["type2"])
-                ]
-
-                temp_matches.append((student_data, mentors_type1, mentors_type2, day))
+            nonlocal best_cost, best_triples
 
             current_cost = tuple(model.cost or [])
-            if best_cost is None or current_cost < best_cost:
-                best_cost = current_cost
-                matches.clear()
-                matches.extend(temp_matches)
-                if self.verbose:
-                    print(f"Found solution with {len(matches)} matched students (cost: {current_cost})")
+            if kernel is not None and current_cost:
+                # Students fixed by the kernel are not part of the reduced objective.
+                current_cost = (current_cost[0] - kernel.fixed_students, *current_cost[1:])
+            if best_cost is not None and current_cost >= best_cost:
+                return
+
+            best_cost = current_cost
+            if kernel is not None:
+                best_triples = kernel.expand(
+                    [
+                        (*(argument.name for argument in symbol.arguments[:3]), symbol.arguments[3].number)
+                        for symbol in model.symbols(shown=True)
+                        if symbol.name == "take"
+                    ]
+                )
+            else:
+                best_triples = [
+                    (symbol.arguments[0].name, symbol.arguments[1].name, symbol.arguments[2].name)
+                    for symbol in model.symbols(shown=True)
+                    if symbol.name == "match"
+                ]
+            matched = len({student_id for student_id, _, _ in best_triples})
+            if self.verbose:
+                print(f"Found solution with {matched} matched students (cost: {current_cost})")
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, signature=signature, triples=best_triples, cost=current_cost)
+            if on_improvement is not None:
+                on_improvement(matched, current_cost)
 
         if self.verbose:
             print(f"Solving with {timeout_seconds}s timeout (best model only)...")
 
         with ctl.solve(on_model=collect_matches, async_=True) as handle:
-            handle.wait(timeout_seconds)
+            if cancel_event is None:
+                handle.wait(timeout_seconds)
+            else:
+                deadline = time.monotonic() + timeout_seconds
+                while not cancel_event.is_set():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or handle.wait(min(CANCEL_POLL_SECONDS, remaining)):
+                        break
             handle.cancel()
             result = handle.get()
 
+        outcome = SolveOutcome(
+            triples=best_triples,
+            cost=best_cost,
+            # Without a grounded objective (nothing left to match) clingo stops at the first model.
+            optimal=bool(result.satisfiable and (result.exhausted or best_cost == ())),
+            interrupted=bool(result.interrupted),
+            unsatisfiable=bool(result.unsatisfiable),
+        )
+        if checkpoint_path and best_cost is not None and outcome.optimal:
+            save_checkpoint(checkpoint_path, signature=signature, triples=best_triples, cost=best_cost, optimal=True)
+
         if self.verbose:
             print(f"Result: {result}")
-            if result.interrupted:
-                print(f"Timeout - returning {len(matches)} students")
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"Cancelled - returning {outcome.matched} students")
+            elif result.interrupted:
+                print(f"Timeout - returning {outcome.matched} students")
             elif result.unsatisfiable:
                 print("UNSAT - no valid solution")
-            elif result.exhausted:
-                print(f"Optimal solution with {len(matches)} students")
+            elif outcome.optimal:
+                print(f"Optimal solution with {outcome.matched} students")
             else:
-                print(f"Solution with {len(matches)} students")
+                print(f"Solution with {outcome.matched} students")
 
+        return outcome
+
+    def matches_from_triples(self, triples: Iterable[MatchTriple]) -> List[StudentMatch]:
+        """Materialize ``(student_id, mentor_id, day)`` triples as ``StudentMatch`` tuples.
+
+        The student and mentor dicts are the engine's cached entries, shared
+        between matches and results; treat them as read-only.
+        """
+
+        self._ensure_loaded()
+
+        grouped: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
+        for student_id, mentor_id, day in triples:
+            key = (student_id, day)
+            grouped.setdefault(key, {"type1": [], "type2": []})
+            mentor_type = self._mentor_lookup[mentor_id]["mentor_type"]
+            grouped[key][mentor_type].append(mentor_id)
+
+        matches: List[StudentMatch] = []
+        for (student_id, day), mentor_groups in grouped.items():
+            student_data = self._student_lookup[student_id]["data"]
+            mentors_type1 = [self._mentor_lookup[m]["data"] for m in sorted(mentor_groups["type1"])]
+            mentors_type2 = [self._mentor_lookup[m]["data"] for m in sorted(mentor_groups["type2"])]
+            matches.append((student_data, mentors_type1, mentors_type2, day))
         return matches
 
-    def export_matches(self, matches: List[StudentMatch], filename: str) -> Optional[pd.DataFrame]:
-        if not matches:
-            if self.verbose:
-                print("No matches to export")
-            return None
+    def objective_cost(self, triples: Iterable[MatchTriple]) -> Tuple[int, ...]:
+        """Cost of *triples* under :meth:`_objective`, in the form clingo reports for a model.
 
-        rows = []
-        for student, mentors_type1, mentors_type2, day in matches:
-            rows.append(
-                {
-                    "Student": f"{student['voornaam']} {student['achternaam']}",
-                    "Day": day.capitalize(),
-                    "Mentors_Type1": "; ".join(
-                        f"{m['voornaam']} {m['achternaam']}" for m in mentors_type1
-                    ),
-                    "Mentors_Type2": "; ".join(
-                        f"{m['voornaam']} {m['achternaam']}" for m in mentors_type2
-                    ),
-                }
-            )
+        Use it for matchings found outside clingo (greedy, LNS, checkpoints)
+        so their costs compare level by level with the solver's.
+        """
 
-        df = pd.DataFrame(rows)
-        df.to_csv(filename, index=False)
-        if self.verbose:
-            print(f"Exported {len(matches)} matches to {filename}")
-        return df
+        self._ensure_loaded()
+        pairs = {(student_id, mentor_id) for student_id, mentor_id, _ in triples}
+        matched = len({student_id for student_id, _ in pairs})
+        if self.candidate_mode != "semantic":
+            return (-matched,)
+        weights = {
+            (student_id, mentor_id): weight
+            for student_id, candidates in self._semantic_candidates.items()
+            for mentor_id, weight in candidates
+        }
+        return (-matched, -sum(weights.get(pair, 0) for pair in pairs))
+
+    def candidate_index(self) -> Dict[str, Dict[str, Dict[str, List[str]]]]:
+        """Return ``{student_id: {day: {"type1": [...], "type2": [...]}}}``.
+
+        Mirrors the ``candidate/3`` rule of the ASP program (shared subject, or
+        a retrieved mentor in ``semantic`` mode; strictly higher mentor
+        education level; shared day) and is cached until the students or
+        mentors are reloaded.
+        """
+
+        self._ensure_loaded()
+        if self._candidate_index is not None:
+            return self._candidate_index
+
+        self._candidate_index = {student["id"]: self._student_candidates(student) for student in self._students_cache}
+        return self._candidate_index
+
+    def _student_candidates(self, student: Dict) -> Dict[str, Dict[str, List[str]]]:
+        """One student's entry of :meth:`candidate_index`."""
+
+        days = {day: {"type1": [], "type2": []} for day in student["availability"]}
+        if self.candidate_mode == "semantic":
+            mentors = [
+                self._mentor_lookup[mentor_id] for mentor_id, _ in self._semantic_candidates.get(student["id"], [])
+            ]
+        else:
+            mentors = self._mentors_by_subject.get(student["subject_atom"], [])
+        for mentor in mentors:
+            if mentor["education_level"] <= student["education_level"]:
+                continue
+            for day in mentor["availability"]:
+                if day in days:
+                    days[day][mentor["mentor_type"]].append(mentor["id"])
+        return days
+
+    def add_student(self, student: Dict) -> Dict:
+        """Add one (classified) student to the loaded instance and return its cache entry.
+
+        *student* has the columns of the students table. The student facts
+        and the candidate index are extended in place, so a late enrollee is
+        part of every later solve without reloading the cohort.
+        """
+
+        self._ensure_loaded()
+        indices = [entry["data"]["index"] for entry in self._students_cache]
+        next_index = max((idx for idx in indices if isinstance(idx, int)), default=-1) + 1
+        row = pd.DataFrame([dict(student)], index=[next_index])
+        (entry,), _ = self._build_students_cache(row)
+
+        self._students_df = row if self._students_df is None else pd.concat([self._students_df, row])
+        self._students_cache.append(entry)
+        self._student_lookup[entry["id"]] = entry
+        if self.candidate_mode == "semantic":
+            self._semantic_candidates.update(self._retrieve_semantic_candidates([entry]))
+        new_facts = self._generate_student_facts([entry])
+        self._student_facts = f"{self._student_facts}\n{new_facts}" if self._student_facts else new_facts
+        if self._candidate_index is not None:
+            self._candidate_index[entry["id"]] = self._student_candidates(entry)
+        self._kernel = None
+        return entry
+
+    def export_matches(self, matches: List[StudentMatch], filename: str) -> Optional[pd.DataFrame]:
+        return export_matches(matches, filename, verbose=self.verbose)
 
     def matches_to_dataframe(self, matches: List[StudentMatch]) -> pd.DataFrame:
-        rows = []
-        for student, mentors_type1, mentors_type2, day in matches:
-            rows.append(
-                {
-                    "student_first_name": student["voornaam"],
-                    "student_last_name": student["achternaam"],
-                    "day": day,
-                    "type1_mentors": [f"{m['voornaam']} {m['achternaam']}" for m in mentors_type1],
-                    "type2_mentors": [f"{m['voornaam']} {m['achternaam']}" for m in mentors_type2],
-                }
-            )
-        return pd.DataFrame(rows)
+        return matches_to_dataframe(matches)
 
     def _ensure_loaded(self) -> None:
-        if not self._loaded:
-            self.load_data()
+        if self._mentor_facts is None:
+            self.load_mentors()
+        if self._student_facts is None:
+            self.load_students()
+
+    @staticmethod
+    def _rows(df: pd.DataFrame, columns: Iterable[str]):
+        """Yield ``(index, *values)`` per row, reading each column once instead of using iterrows."""
+
+        return zip(df.index, *(df[column].tolist() for column in columns))
 
     def _build_students_cache(self, df: pd.DataFrame):
         cache: List[Dict] = []
         lookup: Dict[str, Dict] = {}
 
-        for idx, row in df.iterrows():
+        description_column = self.description_column if self.description_column in df.columns else "Onderwerp"
+        columns = ("Voornaam", "Achternaam", "Opleidingsniveau", "Onderwerp", "Beschikbaarheid", description_column)
+        for idx, first_name, last_name, level, subject, available, description in self._rows(df, columns):
             student_id = f"s{idx}"
-            subject_atom = self._normalize_token(row["Onderwerp"])
-            availability = [day.lower() for day in self._parse_literal_list(row["Beschikbaarheid"])]
-
             entry = {
                 "id": student_id,
-                "education_level": self.education_mapping[row["Opleidingsniveau"]],
-                "subject_atom": subject_atom,
-                "availability": availability,
+                "education_level": self.education_mapping[level],
+                "subject_atom": self._normalize_token(subject),
+                "availability": [day.lower() for day in self._parse_literal_list(available)],
+                "description": str(description),
                 "data": {
-                    "voornaam": row["Voornaam"],
-                    "achternaam": row["Achternaam"],
-                    "opleidingsniveau": row["Opleidingsniveau"],
-                    "onderwerp": row["Onderwerp"],
+                    "index": idx,
+                    "voornaam": first_name,
+                    "achternaam": last_name,
+                    "opleidingsniveau": level,
+                    "onderwerp": subject,
                 },
             }
 
@@ -199,64 +484,259 @@ class MatchingEngine:
 
         return cache, lookup
 
+    @staticmethod
+    def _index_by_subject(mentors: List[Dict]) -> Dict[str, List[Dict]]:
+        by_subject: Dict[str, List[Dict]] = {}
+        for mentor in mentors:
+            for subject in set(mentor["subjects"]):
+                by_subject.setdefault(subject, []).append(mentor)
+        return by_subject
+
     def _build_mentors_cache(
         self, mentors_df: pd.DataFrame, mentors2_df: Optional[pd.DataFrame]
     ):
         cache: List[Dict] = []
         lookup: Dict[str, Dict] = {}
 
-        for idx, row in mentors_df.iterrows():
-            mentor_id = f"m{idx}"
-            cache_entry = self._mentor_entry(row, mentor_id, "type1", "Type 1")
-            cache.append(cache_entry)
-            lookup[mentor_id] = cache_entry
-
+        sources = [(mentors_df, "m", "type1", "Type 1")]
         if mentors2_df is not None:
-            for idx, row in mentors2_df.iterrows():
-                mentor_id = f"m2_{idx}"
-                cache_entry = self._mentor_entry(row, mentor_id, "type2", "Type 2")
+            sources.append((mentors2_df, "m2_", "type2", "Type 2"))
+        columns = ("Voornaam", "Achternaam", "Opleidingsniveau", "Onderwerpen", "Beschikbaarheid", "Max_Studenten")
+        for df, prefix, mentor_type, label in sources:
+            for idx, *values in self._rows(df, columns):
+                cache_entry = self._mentor_entry(
+                    idx, *values, mentor_id=f"{prefix}{idx}", mentor_type=mentor_type, label=label
+                )
                 cache.append(cache_entry)
-                lookup[mentor_id] = cache_entry
+                lookup[cache_entry["id"]] = cache_entry
 
         return cache, lookup
 
-    def _mentor_entry(self, row, mentor_id: str, mentor_type: str, label: str) -> Dict:
-        subjects = [self._normalize_token(subject) for subject in self._parse_literal_list(row["Onderwerpen"])]
-        availability = [day.lower() for day in self._parse_literal_list(row["Beschikbaarheid"])]
-        max_students = int(row["Max_Studenten"])
+    def _mentor_entry(
+        self,
+        idx,
+        first_name,
+        last_name,
+        level,
+        subjects_raw,
+        available,
+        max_students,
+        *,
+        mentor_id: str,
+        mentor_type: str,
+        label: str,
+    ) -> Dict:
+        subject_names = self._parse_literal_list(subjects_raw)
 
         return {
             "id": mentor_id,
             "mentor_type": mentor_type,
-            "education_level": self.education_mapping[row["Opleidingsniveau"]],
-            "subjects": subjects,
-            "availability": availability,
-            "max_students": max_students,
+            "education_level": self.education_mapping[level],
+            "subjects": [self._normalize_token(subject) for subject in subject_names],
+            "profile": ", ".join(str(subject) for subject in subject_names),
+            "availability": [day.lower() for day in self._parse_literal_list(available)],
+            "max_students": int(max_students),
             "data": {
-                "voornaam": row["Voornaam"],
-                "achternaam": row["Achternaam"],
-                "opleidingsniveau": row["Opleidingsniveau"],
+                "index": idx,
+                "voornaam": first_name,
+                "achternaam": last_name,
+                "opleidingsniveau": level,
                 "type": label,
             },
         }
 
-    def _build_asp_program(self) -> str:
-        facts = self._generate_asp_facts()
-        return f"""
-% Facts from Python
-{facts}
+    def instance_signature(self) -> str:
+        """Signature that checkpoints of this instance are validated against."""
+
+        self._ensure_loaded()
+        return instance_signature(self._build_asp_program(), self.solver_arguments())
 
-% Candidate mentor-student-day triples
+    def load_checkpoint(self, path: str) -> Optional[SolveOutcome]:
+        """Read a checkpoint of this instance as a warm start; ``None`` if there is none."""
+
+        checkpoint = load_checkpoint(path, self.instance_signature())
+        if checkpoint is None:
+            return None
+        if self.verbose:
+            print(f"Resuming from checkpoint with {checkpoint.matched} matched students (cost: {checkpoint.cost})")
+        return SolveOutcome(triples=checkpoint.triples, cost=checkpoint.cost, optimal=checkpoint.optimal)
+
+    def kernel(self) -> Kernel:
+        """Return the reduced instance of :mod:`matching.kernel`, cached until a reload."""
+
+        self._ensure_loaded()
+        if self._kernel is None:
+            self._kernel = kernelize(self)
+            if self.verbose:
+                stats = self._kernel.stats()
+                print(
+                    f"Kernel: {stats['fixed_students']} students fixed ({stats['forced_students']} forced), "
+                    f"{stats['unmatchable_students']} unmatchable, {stats['remaining_students']} left; "
+                    f"{stats['removed_mentors']} mentors removed, {stats['merged_mentors']} merged into "
+                    f"{stats['mentor_classes']} classes"
+                )
+        return self._kernel
+
+    def _warm_start_rules(self, warm_start: SolveOutcome, kernel: Optional[Kernel] = None) -> str:
+        matched = self._matched_condition()
+        if kernel is not None:
+            # Mentor IDs of the warm start do not exist in the reduced program; only keep the bound.
+            rules = [f":- #count {{ S : {matched} }} < {warm_start.matched - kernel.fixed_students}."]
+        else:
+            rules = [f"#heuristic match({s}, {m}, {day}). [1, true]" for s, m, day in warm_start.triples]
+            rules.append(f":- #count {{ S : {matched} }} < {warm_start.matched}.")
+        return "\n% Warm start\n" + "\n".join(rules) + "\n"
+
+    def propagators(self) -> List[CountPropagator]:
+        """Propagators to register on every ``Control`` solving :meth:`_build_asp_program`."""
+
+        if self.constraint_mode == "propagator":
+            return [build_propagator(n_type1=self.n_type1, n_type2=self.n_type2, mentors=self._mentors_cache)]
+        return []
+
+    def solver_arguments(self) -> List[str]:
+        """clingo options matching the program of :meth:`_build_asp_program`, then ``solver_options``."""
+
+        if self.candidate_mode == "semantic":
+            # Optimize the matched count before the similarity tie-breaker;
+            # plain branch-and-bound stalls on the weighted second level.
+            return ["--opt-strategy=bb,hier", *self.solver_options]
+        return list(self.solver_options)
+
+    def _retrieve_semantic_candidates(
+        self, students: Optional[List[Dict]] = None
+    ) -> Dict[str, List[Tuple[str, int]]]:
+        """Top-k mentors of each type per student as ``(mentor_id, weight)`` pairs."""
+
+        if self.retriever is None:
+            raise ValueError("candidate_mode='semantic' needs a SemanticRetriever; call set_retriever() first.")
+
+        students = self._students_cache if students is None else students
+        student_texts = [student["description"] for student in students]
+        candidates: Dict[str, List[Tuple[str, int]]] = {student["id"]: [] for student in students}
+        for mentor_type in ("type1", "type2"):
+            mentors = [mentor for mentor in self._mentors_cache if mentor["mentor_type"] == mentor_type]
+            if not mentors:
+                continue
+            indices, scores = self.retriever.retrieve(student_texts, [mentor["profile"] for mentor in mentors])
+            for student, row_indices, row_scores in zip(students, indices, scores):
+                candidates[student["id"]].extend(
+                    (mentors[mentor_idx]["id"], int(round(float(score) * SCORE_SCALE)))
+                    for mentor_idx, score in zip(row_indices, row_scores)
+                    if mentor_idx >= 0
+                )
+        return candidates
+
+    def _candidate_rule(self) -> str:
+        if self.candidate_mode == "semantic":
+            candidate_source = "sem_candidate(S, M, _)"
+        else:
+            candidate_source = "student(S),\n    mentor(M),\n    expertise(S, Subj),\n    expertise(M, Subj)"
+        return f"""% Candidate mentor-student-day triples
 candidate(S, M, Day) :-
-    student(S),
-    mentor(M),
-    expertise(S, Subj),
-    expertise(M, Subj),
+    {candidate_source},
     education(S, ES),
     education(M, EM),
     EM > ES,
     availability(S, Day),
-    availability(M, Day).
+    availability(M, Day)."""
+
+    def _matched_condition(self) -> str:
+        """Body that holds for every matched student ``S`` in the chosen encoding."""
+
+        return "match_day(S, _)" if self.encoding == "compact" else "selected(S)"
+
+    def _objective(self) -> str:
+        matched = self._matched_condition()
+        if self.candidate_mode == "semantic":
+            return (
+                "% Maximize selected students, then the similarity of the chosen mentors\n"
+                f"#maximize {{ 1@2,S : {matched} }}.\n"
+                "#maximize { W@1,S,M : match(S, M, _), sem_candidate(S, M, W) }."
+            )
+        return f"% Maximize selected students\n#maximize {{ 1,S : {matched} }}."
+
+    def _build_compact_program(self, facts: str) -> str:
+        """The ``compact`` encoding; see :data:`ENCODINGS`."""
+
+        type2 = self.n_type2 > 0
+        feasible_type2 = (
+            f",\n    #count {{ M : candidate(S,M,Day), mentor_type(M,type2) }} >= {self.n_type2}" if type2 else ""
+        )
+        if self.constraint_mode == "propagator":
+            mentors = """% Choose mentors; per-type counts and capacities are enforced by CountPropagator
+{ match(S, M, Day) : candidate(S,M,Day) } :- match_day(S, Day)."""
+        else:
+            choices = [
+                f"{self.n_type1} {{ match(S, M, Day) : candidate(S,M,Day), mentor_type(M,type1) }} {self.n_type1}"
+                " :- match_day(S, Day)."
+            ]
+            if type2:
+                choices.append(
+                    f"{self.n_type2} {{ match(S, M, Day) : candidate(S,M,Day), mentor_type(M,type2) }} {self.n_type2}"
+                    " :- match_day(S, Day)."
+                )
+            mentors = "\n".join(
+                [
+                    "% Choose exact mentors per type",
+                    *choices,
+                    "",
+                    "% Only mentors that more students can reach than they have room for need a capacity check",
+                    "contended(M) :- max_students(M, Max), #count { S : candidate(S, M, _) } > Max.",
+                    ":- contended(M), max_students(M, Max), #count { S, Day : match(S, M, Day) } > Max.",
+                ]
+            )
+        return f"""
+% Facts from Python
+{facts}
+
+{self._candidate_rule()}
+
+% Days with enough candidates of each type, decided while grounding
+feasible(S, Day) :-
+    student(S),
+    availability(S, Day),
+    #count {{ M : candidate(S,M,Day), mentor_type(M,type1) }} >= {self.n_type1}{feasible_type2}.
+
+% Match a student on at most one feasible day
+{{ match_day(S, Day) : feasible(S, Day) }} 1 :- student(S).
+
+{mentors}
+
+{self._objective()}
+
+#show match/3.
+"""
+
+    def _build_asp_program(self) -> str:
+        facts = self._generate_asp_facts()
+        if self.encoding == "compact":
+            return self._build_compact_program(facts)
+        if self.constraint_mode == "propagator":
+            return f"""
+% Facts from Python
+{facts}
+
+{self._candidate_rule()}
+
+% Choose which students to match (0 or 1 day per student)
+{{ selected(S) }} :- student(S).
+
+% If selected, choose exactly one day
+1 {{ match_day(S, Day) : day(Day), availability(S, Day) }} 1 :- selected(S).
+
+% Choose mentors; per-type counts and capacities are enforced by CountPropagator
+{{ match(S, M, Day) : candidate(S,M,Day) }} :- match_day(S, Day).
+
+{self._objective()}
+
+#show match/3.
+"""
+        return f"""
+% Facts from Python
+{facts}
+
+{self._candidate_rule()}
 
 % Choose which students to match (0 or 1 day per student)
 {{ selected(S) }} :- student(S).
@@ -275,24 +755,32 @@ candidate(S, M, Day) :-
 % Respect mentor capacities
 :- mentor(M), max_students(M, Max), #count {{ S, Day : match(S, M, Day) }} > Max.
 
-% Maximize selected students
-#maximize {{ 1,S : selected(S) }}.
+{self._objective()}
 
 #show match/3.
 """
 
     def _generate_asp_facts(self) -> str:
-        facts: List[str] = []
-        days = set()
+        days = {day for entry in self._students_cache + self._mentors_cache for day in entry["availability"]}
+        day_facts = "\n".join(f"day({day})." for day in sorted(days))
+        return "\n".join(
+            block for block in (self._student_facts, self._mentor_facts, day_facts) if block
+        )
 
-        for student in self._students_cache:
+    def _generate_student_facts(self, students: Optional[List[Dict]] = None) -> str:
+        facts: List[str] = []
+        for student in self._students_cache if students is None else students:
             facts.append(f"student({student['id']}).")
             facts.append(f"education({student['id']}, {student['education_level']}).")
             facts.append(f"expertise({student['id']}, {student['subject_atom']}).")
             for day in student["availability"]:
                 facts.append(f"availability({student['id']}, {day}).")
-                days.add(day)
+            for mentor_id, weight in self._semantic_candidates.get(student["id"], []):
+                facts.append(f"sem_candidate({student['id']}, {mentor_id}, {weight}).")
+        return "\n".join(facts)
 
+    def _generate_mentor_facts(self) -> str:
+        facts: List[str] = []
         for mentor in self._mentors_cache:
             facts.append(f"mentor({mentor['id']}).")
             facts.append(f"mentor_type({mentor['id']}, {mentor['mentor_type']}).")
@@ -302,11 +790,6 @@ candidate(S, M, Day) :-
             facts.append(f"max_students({mentor['id']}, {mentor['max_students']}).")
             for day in mentor["availability"]:
                 facts.append(f"availability({mentor['id']}, {day}).")
-                days.add(day)
-
-        for day in sorted(days):
-            facts.append(f"day({day}).")
-
         return "\n".join(facts)
 
     @staticmethod
@@ -318,8 +801,61 @@ candidate(S, M, Day) :-
                 return []
         else:
             parsed = raw
+        if hasattr(parsed, "tolist"):
+            parsed = parsed.tolist()
         return list(parsed) if isinstance(parsed, (list, tuple)) else []
 
     @staticmethod
     def _normalize_token(text) -> str:
-        return text.lower().replace(" ", "_") if isinstance(text, str) else ""
\ No newline at end of file
+        return text.lower().replace(" ", "_") if isinstance(text, str) else ""
+
+
+def export_matches(
+    matches: List[StudentMatch], filename: str, *, verbose: bool = True
+) -> Optional[pd.DataFrame]:
+    if not matches:
+        if verbose:
+            print("No matches to export")
+        return None
+
+    if table_format(filename) != "csv":
+        df = matches_to_dataframe(matches)
+        write_table(df, filename, list_types=MATCH_LIST_TYPES)
+        if verbose:
+            print(f"Exported {len(matches)} matches to {filename}")
+        return df
+
+    df = pd.DataFrame(
+        {
+            "Student": [f"{student['voornaam']} {student['achternaam']}" for student, _, _, _ in matches],
+            "Day": [day.capitalize() for _, _, _, day in matches],
+            "Mentors_Type1": [_mentor_names(mentors, "; ") for _, mentors, _, _ in matches],
+            "Mentors_Type2": [_mentor_names(mentors, "; ") for _, _, mentors, _ in matches],
+        }
+    )
+    df.to_csv(filename, index=False)
+    if verbose:
+        print(f"Exported {len(matches)} matches to {filename}")
+    return df
+
+
+def _mentor_names(mentors: List[Dict[str, str]], separator: Optional[str] = None):
+    names = [f"{mentor['voornaam']} {mentor['achternaam']}" for mentor in mentors]
+    return separator.join(names) if separator is not None else names
+
+
+def matches_to_dataframe(matches: List[StudentMatch]) -> pd.DataFrame:
+    """One row per match; names are only formatted here, column by column."""
+
+    return pd.DataFrame(
+        {
+            "student_id": [student["index"] for student, _, _, _ in matches],
+            "student_first_name": [student["voornaam"] for student, _, _, _ in matches],
+            "student_last_name": [student["achternaam"] for student, _, _, _ in matches],
+            "day": [day for _, _, _, day in matches],
+            "type1_mentor_ids": [[m["index"] for m in mentors] for _, mentors, _, _ in matches],
+            "type1_mentors": [_mentor_names(mentors) for _, mentors, _, _ in matches],
+            "type2_mentor_ids": [[m["index"] for m in mentors] for _, _, mentors, _ in matches],
+            "type2_mentors": [_mentor_names(mentors) for _, _, mentors, _ in matches],
+        }
+    )
@@ -0,0 +1,88 @@
+"""Synthetic student and mentor tables for benchmarking the matching engine.
+
+The generated frames have the same columns and value formats as the CSV
+files in ``DATASETS/`` (list columns as Python-literal strings), so they can
+be passed to :class:`MatchingEngine` directly or written with
+:func:`matching.io.write_table`.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+SUBJECTS = (
+    "Artificial Intelligence",
+    "Business Change and Innovation",
+    "Business Process Analytics",
+    "Creative Digital Innovation",
+    "Cyber Security",
+    "Data Science",
+    "Data Visualisation",
+    "Design Science Research",
+    "Ethical Hacking",
+    "Software Architecture",
+)
+DAYS = ("Maandag", "Dinsdag", "Woensdag", "Donderdag", "Vrijdag", "Zaterdag", "Zondag")
+STUDENT_LEVELS = ("Associate", "Bachelor")
+MENTOR_LEVELS = ("Bachelor", "Master", "PhD")
+
+
+@dataclass
+class Instance:
+    students: pd.DataFrame
+    mentors_type1: pd.DataFrame
+    mentors_type2: Optional[pd.DataFrame] = None
+
+
+def _days(rng: np.random.Generator, low: int, high: int) -> str:
+    count = int(rng.integers(low, high + 1))
+    picked = sorted(rng.choice(len(DAYS), count, replace=False))
+    return repr([DAYS[day] for day in picked])
+
+
+def _mentors(rng: np.random.Generator, count: int, n_subjects: int, suffix: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Voornaam": [f"Mentor{suffix}{idx}" for idx in range(count)],
+            "Achternaam": [f"Achternaam{suffix}{idx}" for idx in range(count)],
+            "Opleidingsniveau": rng.choice(MENTOR_LEVELS, count, p=[0.3, 0.4, 0.3]),
+            "Onderwerpen": [
+                repr([SUBJECTS[s] for s in sorted(rng.choice(n_subjects, int(rng.integers(1, 5)), replace=False))])
+                for _ in range(count)
+            ],
+            "Max_Studenten": rng.integers(1, 6, count),
+            "Beschikbaarheid": [_days(rng, 1, len(DAYS)) for _ in range(count)],
+        }
+    )
+
+
+def generate_instance(
+    n_students: int,
+    n_mentors_type1: int,
+    n_mentors_type2: int = 0,
+    *,
+    n_subjects: int = 9,
+    seed: int = 0,
+) -> Instance:
+    """Random instance with the subject, level, day and capacity mix of the sample data."""
+
+    if not 1 <= n_subjects <= len(SUBJECTS):
+        raise ValueError(f"n_subjects must be between 1 and {len(SUBJECTS)}.")
+
+    rng = np.random.default_rng(seed)
+    students = pd.DataFrame(
+        {
+            "Voornaam": [f"Student{idx}" for idx in range(n_students)],
+            "Achternaam": [f"Achternaam{idx}" for idx in range(n_students)],
+            "Opleidingsniveau": rng.choice(STUDENT_LEVELS, n_students),
+            "Onderwerp": [SUBJECTS[s] for s in rng.integers(0, n_subjects, n_students)],
+            "Beschikbaarheid": [_days(rng, 1, 6) for _ in range(n_students)],
+        }
+    )
+    mentors_type1 = _mentors(rng, n_mentors_type1, n_subjects, "")
+    mentors_type2 = _mentors(rng, n_mentors_type2, n_subjects, "B") if n_mentors_type2 else None
+    return Instance(students=students, mentors_type1=mentors_type1, mentors_type2=mentors_type2)
@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+from peer2pro_io import ARROW_SUFFIXES, PARQUET_SUFFIXES, read_table, table_format, write_table
+
+__all__ = ["ARROW_SUFFIXES", "PARQUET_SUFFIXES", "read_table", "table_format", "write_table"]
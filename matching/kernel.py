@@ -0,0 +1,232 @@
+"""Optimality-preserving reduction of a matching instance before solving.
+
+:func:`kernelize` works on the engine's candidate index and applies, in
+order:
+
+1. Students without a day that has ``n_type1``/``n_type2`` candidates are
+   dropped, and every other student keeps only such feasible days.
+2. Students whose candidate mentors are all uncontended (no more students can
+   reach the mentor than it has capacity) are matched right away; this
+   includes the students that are forced to one day and exactly
+   ``n_type1``/``n_type2`` mentors. Matching them can never block anyone.
+3. Mentors that no remaining student can reach are dropped, and every
+   capacity is capped at the number of remaining students that reach it.
+4. Mentors of one type with the same capacity and exactly the same
+   (student, day) candidates are merged into a class. The solver chooses how
+   many members of a class a student gets with indexed ``take(S, C, Day, I)``
+   atoms, and :meth:`Kernel.expand` hands out concrete members round-robin,
+   which never exceeds a member's capacity.
+
+The reduced program is solved instead of the full one and
+:meth:`Kernel.expand` turns its model back into full-instance triples.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .engine import MatchingEngine, MatchTriple
+
+CandidateDays = Dict[str, Dict[str, List[str]]]
+
+
+@dataclass
+class MentorClass:
+    id: str
+    mentor_type: str
+    members: List[str]
+    capacity: int
+
+
+@dataclass
+class Kernel:
+    n_type1: int
+    n_type2: int
+    candidates: Dict[str, CandidateDays]
+    mentor_types: Dict[str, str]
+    capacities: Dict[str, int]
+    classes: Dict[str, MentorClass] = field(default_factory=dict)
+    fixed: List["MatchTriple"] = field(default_factory=list)
+    forced_students: int = 0
+    unmatchable_students: List[str] = field(default_factory=list)
+    removed_mentors: List[str] = field(default_factory=list)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "fixed_students": self.fixed_students,
+            "forced_students": self.forced_students,
+            "unmatchable_students": len(self.unmatchable_students),
+            "remaining_students": len(self.candidates),
+            "removed_mentors": len(self.removed_mentors),
+            "mentor_classes": len(self.classes),
+            "merged_mentors": sum(len(mentor_class.members) for mentor_class in self.classes.values()),
+            "remaining_mentors": len(self.capacities),
+        }
+
+    @property
+    def fixed_students(self) -> int:
+        return len({student_id for student_id, _, _ in self.fixed})
+
+    def program(self, objective: str) -> str:
+        facts: List[str] = []
+        for student_id, days in self.candidates.items():
+            facts.append(f"student({student_id}).")
+            for day, groups in days.items():
+                facts.append(f"feasible({student_id}, {day}).")
+                for mentor_id in groups["type1"] + groups["type2"]:
+                    facts.append(f"candidate({student_id}, {mentor_id}, {day}).")
+        for mentor_id, capacity in self.capacities.items():
+            facts.append(f"mentor_type({mentor_id}, {self.mentor_types[mentor_id]}).")
+            facts.append(f"max_students({mentor_id}, {capacity}).")
+        for mentor_class in self.classes.values():
+            facts.append(f"class_size({mentor_class.id}, {len(mentor_class.members)}).")
+        fact_block = "\n".join(facts)
+
+        return f"""
+% Reduced instance from matching.kernel
+{fact_block}
+
+% Single mentors have one slot, merged classes one per member
+#defined class_size/2.
+slot(M, 1) :- mentor_type(M, _), not class_size(M, _).
+slot(C, 1..K) :- class_size(C, K).
+
+% Choose which students to match (0 or 1 feasible day per student)
+{{ selected(S) }} :- student(S).
+1 {{ match_day(S, Day) : feasible(S, Day) }} 1 :- selected(S).
+
+% Choose exact mentor slots per type; class slots are taken in order
+{self.n_type1} {{ take(S, M, Day, I) : candidate(S,M,Day), mentor_type(M,type1), slot(M,I) }} {self.n_type1} :- match_day(S, Day).
+{self.n_type2} {{ take(S, M, Day, I) : candidate(S,M,Day), mentor_type(M,type2), slot(M,I) }} {self.n_type2} :- match_day(S, Day).
+:- take(S, M, Day, I), I > 1, not take(S, M, Day, I - 1).
+
+% Respect (class) capacities
+:- max_students(M, Max), #count {{ S, Day, I : take(S, M, Day, I) }} > Max.
+
+{objective}
+
+#show take/4.
+"""
+
+    def expand(self, takes: Sequence[Tuple[str, str, str, int]]) -> List["MatchTriple"]:
+        """Turn ``take(S, M, Day, I)`` tuples into full-instance triples, plus the fixed ones."""
+
+        triples: List["MatchTriple"] = list(self.fixed)
+        per_class: Dict[str, Dict[Tuple[str, str], int]] = {}
+        for student_id, mentor_id, day, _ in takes:
+            if mentor_id in self.classes:
+                counts = per_class.setdefault(mentor_id, {})
+                counts[(student_id, day)] = counts.get((student_id, day), 0) + 1
+            else:
+                triples.append((student_id, mentor_id, day))
+
+        for class_id, counts in per_class.items():
+            members = self.classes[class_id].members
+            position = 0
+            for (student_id, day), count in sorted(counts.items()):
+                for offset in range(count):
+                    triples.append((student_id, members[(position + offset) % len(members)], day))
+                position = (position + count) % len(members)
+        return triples
+
+
+def _feasible(days: CandidateDays, n_type1: int, n_type2: int) -> CandidateDays:
+    return {
+        day: {"type1": list(groups["type1"]), "type2": list(groups["type2"])}
+        for day, groups in days.items()
+        if len(groups["type1"]) >= n_type1 and len(groups["type2"]) >= n_type2
+    }
+
+
+def _demand(candidates: Dict[str, CandidateDays]) -> Dict[str, int]:
+    demand: Dict[str, int] = {}
+    for days in candidates.values():
+        for mentor_id in {m for groups in days.values() for ids in groups.values() for m in ids}:
+            demand[mentor_id] = demand.get(mentor_id, 0) + 1
+    return demand
+
+
+def kernelize(engine: "MatchingEngine") -> Kernel:
+    """Reduce the engine's instance; see the module docstring for the rules."""
+
+    n_type1, n_type2 = engine.n_type1, engine.n_type2
+    mentor_types = {mentor["id"]: mentor["mentor_type"] for mentor in engine._mentors_cache}
+    capacities = {mentor["id"]: mentor["max_students"] for mentor in engine._mentors_cache}
+
+    candidates: Dict[str, CandidateDays] = {}
+    unmatchable: List[str] = []
+    for student_id, days in engine.candidate_index().items():
+        feasible = _feasible(days, n_type1, n_type2)
+        if feasible:
+            candidates[student_id] = feasible
+        else:
+            unmatchable.append(student_id)
+
+    # Uncontended students: any feasible choice fits, so take the first one.
+    demand = _demand(candidates)
+    fixed: List["MatchTriple"] = []
+    forced = 0
+    for student_id, days in list(candidates.items()):
+        mentor_ids = {m for groups in days.values() for ids in groups.values() for m in ids}
+        if any(demand[m] > capacities[m] for m in mentor_ids):
+            continue
+        day, groups = next(iter(days.items()))
+        if len(days) == 1 and len(groups["type1"]) == n_type1 and len(groups["type2"]) == n_type2:
+            forced += 1
+        chosen = groups["type1"][:n_type1] + groups["type2"][:n_type2]
+        fixed.extend((student_id, mentor_id, day) for mentor_id in chosen)
+        for mentor_id in mentor_ids:
+            demand[mentor_id] -= 1
+        for mentor_id in chosen:
+            capacities[mentor_id] -= 1
+        del candidates[student_id]
+
+    demand = _demand(candidates)
+    removed = [mentor_id for mentor_id in capacities if demand.get(mentor_id, 0) == 0]
+    for mentor_id in removed:
+        del capacities[mentor_id]
+    for mentor_id in capacities:
+        capacities[mentor_id] = min(capacities[mentor_id], demand[mentor_id])
+
+    # Interchangeable mentors: same type, capacity and (student, day) candidates.
+    signatures: Dict[str, set] = {mentor_id: set() for mentor_id in capacities}
+    for student_id, days in candidates.items():
+        for day, groups in days.items():
+            for mentor_id in groups["type1"] + groups["type2"]:
+                signatures[mentor_id].add((student_id, day))
+    groups_by_key: Dict[Tuple[str, int, FrozenSet[Tuple[str, str]]], List[str]] = {}
+    for mentor_id, pairs in signatures.items():
+        key = (mentor_types[mentor_id], capacities[mentor_id], frozenset(pairs))
+        groups_by_key.setdefault(key, []).append(mentor_id)
+
+    kernel = Kernel(
+        n_type1=n_type1,
+        n_type2=n_type2,
+        candidates=candidates,
+        mentor_types=mentor_types,
+        capacities=capacities,
+        fixed=fixed,
+        forced_students=forced,
+        unmatchable_students=unmatchable,
+        removed_mentors=removed,
+    )
+    class_of: Dict[str, str] = {}
+    for (mentor_type, capacity, _), members in groups_by_key.items():
+        if len(members) < 2:
+            continue
+        class_id = f"k{len(kernel.classes)}"
+        kernel.classes[class_id] = MentorClass(class_id, mentor_type, sorted(members), capacity)
+        kernel.mentor_types[class_id] = mentor_type
+        kernel.capacities[class_id] = capacity * len(members)
+        for member in members:
+            class_of[member] = class_id
+            del kernel.capacities[member]
+
+    if class_of:
+        for days in candidates.values():
+            for groups in days.values():
+                for mentor_type in ("type1", "type2"):
+                    groups[mentor_type] = list(dict.fromkeys(class_of.get(m, m) for m in groups[mentor_type]))
+    return kernel
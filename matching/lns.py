@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from clingo import Control, Function
+
+from .checkpoint import save_checkpoint
+from .engine import ImprovementCallback, MatchingEngine, MatchTriple, StudentMatch
+
+NEIGHBORHOODS = ("subject", "day", "mentors")
+
+# Ground program of the worker process, built once by _init_worker.
+_WORKER_CTL: Optional[Control] = None
+
+
+@dataclass
+class LNSResult:
+    matches: List[StudentMatch]
+    triples: List[MatchTriple]
+    matched: int
+    iterations: int
+    improvements: int
+    cost: Tuple[int, ...] = ()
+    history: List[Tuple[float, int]] = field(default_factory=list)
+
+
+def _init_worker(program: str, arguments: List[str], propagators: List[object]) -> None:
+    global _WORKER_CTL
+    _WORKER_CTL = Control(arguments)
+    for propagator in propagators:
+        _WORKER_CTL.register_propagator(propagator)
+    _WORKER_CTL.add("base", [], program)
+    _WORKER_CTL.ground([("base", [])])
+
+
+def _match_symbol(student_id: str, mentor_id: str, day: str):
+    return Function("match", [Function(student_id), Function(mentor_id), Function(day)])
+
+
+def _reoptimize(
+    fixed_triples: Sequence[MatchTriple],
+    excluded_days: Sequence[Tuple[str, str]],
+    timeout_seconds: float,
+) -> Optional[List[MatchTriple]]:
+    """Re-optimize the free part of the instance in the worker's ground program.
+
+    Students in ``fixed_triples`` keep their mentors and day, the
+    ``(student, day)`` pairs in ``excluded_days`` cover every day of the
+    students that stay unmatched, and every other student is free.
+    """
+
+    assumptions = [(_match_symbol(*triple), True) for triple in fixed_triples]
+    assumptions += [
+        (Function("match_day", [Function(student_id), Function(day)]), False) for student_id, day in excluded_days
+    ]
+
+    best: Optional[List[MatchTriple]] = None
+
+    def on_model(model) -> None:
+        nonlocal best
+        best = [
+            (symbol.arguments[0].name, symbol.arguments[1].name, symbol.arguments[2].name)
+            for symbol in model.symbols(shown=True)
+            if symbol.name == "match"
+        ]
+
+    with _WORKER_CTL.solve(assumptions=assumptions, on_model=on_model, async_=True) as handle:
+        handle.wait(timeout_seconds)
+        handle.cancel()
+        handle.get()
+    return best
+
+
+class LNSDriver:
+    """Anytime large neighborhood search around a :class:`MatchingEngine`.
+
+    Starting from a feasible matching, every round frees one neighborhood
+    per worker (all students of one subject, of one day, or of a random set
+    of mentors). The rest of the matching is fixed through solver
+    assumptions, and each neighborhood is re-optimized in a worker process
+    that grounded the full program once. The best result of the round
+    replaces the incumbent if its full objective cost (see
+    :meth:`MatchingEngine.objective_cost`) is no worse.
+    """
+
+    def __init__(
+        self,
+        engine: MatchingEngine,
+        *,
+        workers: int = 2,
+        iteration_timeout: float = 5.0,
+        max_free_students: int = 200,
+        mentors_per_neighborhood: int = 5,
+        seed: Optional[int] = None,
+        verbose: bool = True,
+    ) -> None:
+        self.engine = engine
+        self.workers = max(1, workers)
+        self.iteration_timeout = iteration_timeout
+        self.max_free_students = max_free_students
+        self.mentors_per_neighborhood = mentors_per_neighborhood
+        self.verbose = verbose
+        self._rng = random.Random(seed)
+
+    def run(
+        self,
+        time_budget: float,
+        *,
+        initial_triples: Optional[Sequence[MatchTriple]] = None,
+        initial_timeout: Optional[float] = None,
+        on_improvement: Optional[ImprovementCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        checkpoint_path: Optional[str] = None,
+    ) -> LNSResult:
+        started = time.monotonic()
+        deadline = started + time_budget
+        engine = self.engine
+        engine._ensure_loaded()
+
+        if initial_triples is None:
+            timeout = initial_timeout if initial_timeout is not None else max(1.0, 0.1 * time_budget)
+            initial_triples = engine.solve_triples(timeout, cancel_event=cancel_event).triples
+        incumbent = list(initial_triples)
+        matched = _count_students(incumbent)
+        cost = engine.objective_cost(incumbent)
+        history = [(time.monotonic() - started, matched)]
+        if self.verbose:
+            print(f"LNS start: {matched} matched students")
+
+        signature = engine.instance_signature() if checkpoint_path else None
+        candidates = engine.candidate_index()
+        iterations = improvements = 0
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(engine._build_asp_program(), engine.solver_arguments(), engine.propagators()),
+        ) as pool:
+            while time.monotonic() < deadline and not (cancel_event and cancel_event.is_set()):
+                timeout = min(self.iteration_timeout, max(0.1, deadline - time.monotonic()))
+                neighborhoods = [self._neighborhood(incumbent, candidates) for _ in range(self.workers)]
+                futures = [
+                    pool.submit(_reoptimize, *self._split(incumbent, free), timeout)
+                    for free in neighborhoods
+                ]
+
+                best_round: Optional[List[MatchTriple]] = None
+                best_round_cost: Optional[Tuple[int, ...]] = None
+                for future in futures:
+                    triples = future.result()
+                    iterations += 1
+                    if triples is None:
+                        continue
+                    round_cost = engine.objective_cost(triples)
+                    if best_round_cost is None or round_cost < best_round_cost:
+                        best_round, best_round_cost = triples, round_cost
+
+                if best_round is None or best_round_cost > cost:
+                    continue
+                best_round_matched = _count_students(best_round)
+                if best_round_cost < cost:
+                    improvements += 1
+                    if self.verbose:
+                        print(f"LNS improvement: {best_round_matched} matched students (cost: {best_round_cost})")
+                    if on_improvement is not None:
+                        on_improvement(best_round_matched, best_round_cost)
+                    history.append((time.monotonic() - started, best_round_matched))
+                    if checkpoint_path:
+                        save_checkpoint(checkpoint_path, signature=signature, triples=best_round, cost=best_round_cost)
+                incumbent, matched, cost = best_round, best_round_matched, best_round_cost
+
+        return LNSResult(
+            matches=engine.matches_from_triples(incumbent),
+            triples=incumbent,
+            matched=matched,
+            iterations=iterations,
+            improvements=improvements,
+            cost=cost,
+            history=history,
+        )
+
+    def _neighborhood(
+        self,
+        incumbent: Sequence[MatchTriple],
+        candidates: Dict[str, Dict[str, Dict[str, List[str]]]],
+    ) -> Set[str]:
+        engine = self.engine
+        kind = self._rng.choice(NEIGHBORHOODS)
+        assigned_day = {student_id: day for student_id, _, day in incumbent}
+
+        if kind == "subject":
+            subjects = sorted({student["subject_atom"] for student in engine._students_cache})
+            subject = self._rng.choice(subjects)
+            free = {s["id"] for s in engine._students_cache if s["subject_atom"] == subject}
+        elif kind == "day":
+            days = sorted({day for days in candidates.values() for day in days})
+            day = self._rng.choice(days)
+            free = {
+                student_id
+                for student_id, student_days in candidates.items()
+                if assigned_day.get(student_id) == day
+                or (student_id not in assigned_day and day in student_days)
+            }
+        else:
+            mentor_ids = [mentor["id"] for mentor in engine._mentors_cache]
+            chosen = set(self._rng.sample(mentor_ids, min(self.mentors_per_neighborhood, len(mentor_ids))))
+            free = {student_id for student_id, mentor_id, _ in incumbent if mentor_id in chosen}
+            free |= {
+                student_id
+                for student_id, student_days in candidates.items()
+                if student_id not in assigned_day
+                and any(chosen.intersection(ids) for groups in student_days.values() for ids in groups.values())
+            }
+
+        if len(free) > self.max_free_students:
+            free = set(self._rng.sample(sorted(free), self.max_free_students))
+        return free
+
+    def _split(
+        self, incumbent: Sequence[MatchTriple], free: Set[str]
+    ) -> Tuple[List[MatchTriple], List[Tuple[str, str]]]:
+        fixed = [triple for triple in incumbent if triple[0] not in free]
+        matched = {student_id for student_id, _, _ in incumbent}
+        # match_day/2 exists in every encoding, selected/1 only in the baseline one.
+        excluded = [
+            (student["id"], day)
+            for student in self.engine._students_cache
+            if student["id"] not in free and student["id"] not in matched
+            for day in student["availability"]
+        ]
+        return fixed, excluded
+
+
+def _count_students(triples: Sequence[MatchTriple]) -> int:
+    return len({student_id for student_id, _, _ in triples})
@@ -0,0 +1,95 @@
+"""Compiled mentor pools, reused across runs.
+
+The mentor files change far less often than the student intakes. A
+:class:`MentorPool` holds everything :meth:`MatchingEngine.load_mentors`
+derives from them:
+* the parsed mentor entries,
+* the subject index used for candidate generation,
+* the rendered mentor fact block.
+
+:func:`load_mentor_pool` stores the pool in the
+:class:`~matching.cache.ResultCache` under a hash of the file contents and
+the education mapping. A later run with the same mentor files then skips
+parsing the tables and generating the facts, and only processes the new
+students.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+from .cache import DEFAULT_CACHE_DIR, ResultCache, content_key, file_digest
+from .engine import DEFAULT_EDUCATION_MAPPING, MatchingEngine
+from .io import read_table
+
+# Bump when the layout of the mentor entries or facts changes.
+MENTOR_POOL_VERSION = 1
+
+
+@dataclass
+class MentorPool:
+    key: str
+    mentors: List[Dict]
+    by_subject: Dict[str, List[Dict]]
+    facts: str
+    education_mapping: Dict[str, int]
+    has_type2: bool
+
+
+def mentor_pool_key(
+    mentors_type1_path: Path | str,
+    mentors_type2_path: Optional[Path | str] = None,
+    education_mapping: Optional[Mapping[str, int]] = None,
+) -> str:
+    return content_key(
+        "mentor_pool",
+        MENTOR_POOL_VERSION,
+        file_digest(mentors_type1_path),
+        file_digest(mentors_type2_path) if mentors_type2_path else None,
+        sorted((education_mapping or DEFAULT_EDUCATION_MAPPING).items()),
+    )
+
+
+def compile_mentor_pool(
+    mentors_type1_path: Path | str,
+    mentors_type2_path: Optional[Path | str] = None,
+    *,
+    education_mapping: Optional[Mapping[str, int]] = None,
+) -> MentorPool:
+    """Parse the mentor files and render their facts."""
+
+    engine = MatchingEngine(
+        mentors_type1_df=read_table(mentors_type1_path),
+        mentors_type2_df=read_table(mentors_type2_path) if mentors_type2_path else None,
+        education_mapping=dict(education_mapping) if education_mapping else None,
+        verbose=False,
+    )
+    engine.load_mentors()
+    return MentorPool(
+        key=mentor_pool_key(mentors_type1_path, mentors_type2_path, education_mapping),
+        mentors=engine._mentors_cache,
+        by_subject=engine._mentors_by_subject,
+        facts=engine._mentor_facts,
+        education_mapping=dict(engine.education_mapping),
+        has_type2=bool(mentors_type2_path),
+    )
+
+
+def load_mentor_pool(
+    mentors_type1_path: Path | str,
+    mentors_type2_path: Optional[Path | str] = None,
+    *,
+    cache_dir: Path | str = DEFAULT_CACHE_DIR,
+    education_mapping: Optional[Mapping[str, int]] = None,
+) -> MentorPool:
+    """Return the compiled pool of these mentor files, compiling and storing it on a miss."""
+
+    cache = ResultCache(cache_dir)
+    key = mentor_pool_key(mentors_type1_path, mentors_type2_path, education_mapping)
+    pool = cache.get("mentor_pools", key)
+    if pool is None:
+        pool = compile_mentor_pool(mentors_type1_path, mentors_type2_path, education_mapping=education_mapping)
+        cache.put("mentor_pools", key, pool)
+    return pool
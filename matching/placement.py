@@ -0,0 +1,243 @@
+"""Place late enrollees into a published matching without re-solving the cohort.
+
+:class:`OnlinePlacer` starts from the triples of the last solution and keeps
+the residual capacity of every mentor. Each mentor's capacity counts across
+all days, and the candidate index restricts it per day. :meth:`OnlinePlacer.place_student`
+first tries a direct insertion: a day on which the new student has
+``n_type1``/``n_type2`` compatible mentors with room left. That takes a few
+milliseconds and changes nobody else's assignment.
+
+When no such day exists, a small repair solve frees the new student and up
+to ``neighborhood_size`` already placed students that hold one of the new
+student's candidate mentors. The solve places all of them again within the
+capacity that the remaining students leave over, and changes as few
+existing assignments as possible. Everyone outside the neighborhood keeps
+their mentors and day.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from clingo import Control
+
+from .engine import MatchingEngine, MatchTriple, StudentMatch
+
+DEFAULT_NEIGHBORHOOD_SIZE = 30
+DEFAULT_REPAIR_TIMEOUT_SECONDS = 2.0
+
+# Per placed student: (day, mentor IDs).
+Assignment = Tuple[str, List[str]]
+
+
+@dataclass
+class PlacementResult:
+    student_id: str
+    method: str  # "direct", "repair" or "unplaced"
+    triples: List[MatchTriple] = field(default_factory=list)
+    moved: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def placed(self) -> bool:
+        return bool(self.triples)
+
+    @property
+    def day(self) -> Optional[str]:
+        return self.triples[0][2] if self.triples else None
+
+
+class OnlinePlacer:
+    """Insert students one at a time into an existing matching of ``engine``'s cohort."""
+
+    def __init__(
+        self,
+        engine: MatchingEngine,
+        triples: Iterable[MatchTriple],
+        *,
+        neighborhood_size: int = DEFAULT_NEIGHBORHOOD_SIZE,
+        repair_timeout_seconds: float = DEFAULT_REPAIR_TIMEOUT_SECONDS,
+    ) -> None:
+        self.engine = engine
+        self.neighborhood_size = neighborhood_size
+        self.repair_timeout_seconds = repair_timeout_seconds
+
+        engine.candidate_index()
+        self._assignment: Dict[str, Assignment] = {}
+        for student_id, mentor_id, day in triples:
+            self._assignment.setdefault(student_id, (day, []))[1].append(mentor_id)
+        self._remaining = {mentor["id"]: mentor["max_students"] for mentor in engine._mentors_cache}
+        for _, mentor_ids in self._assignment.values():
+            for mentor_id in mentor_ids:
+                self._remaining[mentor_id] -= 1
+
+    @classmethod
+    def from_checkpoint(cls, engine: MatchingEngine, path: str, **options) -> "OnlinePlacer":
+        """Start from the matching in a checkpoint of this instance (see ``--checkpoint-path``)."""
+
+        outcome = engine.load_checkpoint(path)
+        if outcome is None:
+            raise ValueError(f"No checkpoint found at {path}.")
+        return cls(engine, outcome.triples, **options)
+
+    @property
+    def triples(self) -> List[MatchTriple]:
+        return [
+            (student_id, mentor_id, day)
+            for student_id, (day, mentor_ids) in self._assignment.items()
+            for mentor_id in mentor_ids
+        ]
+
+    def matches(self) -> List[StudentMatch]:
+        return self.engine.matches_from_triples(self.triples)
+
+    def remaining_capacity(self, mentor_id: str) -> int:
+        return self._remaining[mentor_id]
+
+    def place_student(self, student: Mapping) -> PlacementResult:
+        """Add *student* (a classified row of the students table) and try to place it."""
+
+        started = time.perf_counter()
+        student_id = self.engine.add_student(dict(student))["id"]
+
+        result = self._insert(student_id)
+        if result is None:
+            result = self._repair(student_id)
+        result.seconds = time.perf_counter() - started
+        if self.engine.verbose:
+            print(f"Placed {student_id} ({result.method}, {len(result.moved)} moved) in {result.seconds * 1000:.1f} ms")
+        return result
+
+    def _pick(self, mentor_ids: List[str], count: int) -> Optional[List[str]]:
+        free = sorted((m for m in mentor_ids if self._remaining[m] > 0), key=lambda m: (-self._remaining[m], m))
+        return free[:count] if len(free) >= count else None
+
+    def _insert(self, student_id: str) -> Optional[PlacementResult]:
+        n_type1, n_type2 = self.engine.n_type1, self.engine.n_type2
+        best = None
+        for day, groups in self.engine.candidate_index()[student_id].items():
+            type1 = self._pick(groups["type1"], n_type1)
+            type2 = self._pick(groups["type2"], n_type2)
+            if type1 is None or type2 is None:
+                continue
+            # Prefer the day whose tightest chosen mentor keeps the most room.
+            slack = min((self._remaining[m] for m in type1 + type2), default=0)
+            if best is None or slack > best[0]:
+                best = (slack, day, type1 + type2)
+        if best is None:
+            return None
+
+        _, day, mentor_ids = best
+        self._assign(student_id, day, mentor_ids)
+        return PlacementResult(student_id, "direct", [(student_id, m, day) for m in mentor_ids])
+
+    def _assign(self, student_id: str, day: str, mentor_ids: List[str]) -> None:
+        previous = self._assignment.pop(student_id, None)
+        if previous is not None:
+            for mentor_id in previous[1]:
+                self._remaining[mentor_id] += 1
+        self._assignment[student_id] = (day, list(mentor_ids))
+        for mentor_id in mentor_ids:
+            self._remaining[mentor_id] -= 1
+
+    def _neighborhood(self, student_id: str) -> List[str]:
+        """Placed students holding the most candidate mentors of *student_id*."""
+
+        wanted: Set[str] = {
+            m for groups in self.engine.candidate_index()[student_id].values() for ids in groups.values() for m in ids
+        }
+        overlap = {
+            other: len(wanted.intersection(mentor_ids))
+            for other, (_, mentor_ids) in self._assignment.items()
+            if not wanted.isdisjoint(mentor_ids)
+        }
+        return sorted(overlap, key=lambda other: (-overlap[other], other))[: self.neighborhood_size]
+
+    def _repair_program(self, student_id: str, neighbors: List[str]) -> str:
+        index = self.engine.candidate_index()
+        mentor_types = {mentor["id"]: mentor["mentor_type"] for mentor in self.engine._mentors_cache}
+        facts: List[str] = []
+        mentors: Set[str] = set()
+        for free in [student_id, *neighbors]:
+            facts.append(f"student({free}).")
+            for day, groups in index[free].items():
+                for mentor_id in groups["type1"] + groups["type2"]:
+                    facts.append(f"cand({free}, {mentor_id}, {day}, {mentor_types[mentor_id]}).")
+                    mentors.add(mentor_id)
+        for other in neighbors:
+            day, mentor_ids = self._assignment[other]
+            facts.append(f"was_day({other}, {day}).")
+            facts.extend(f"was({other}, {mentor_id}, {day})." for mentor_id in mentor_ids)
+        # Room left by everyone outside the neighborhood.
+        released: Dict[str, int] = {}
+        for other in neighbors:
+            for mentor_id in self._assignment[other][1]:
+                released[mentor_id] = released.get(mentor_id, 0) + 1
+        facts.extend(
+            f"cap({mentor_id}, {self._remaining[mentor_id] + released.get(mentor_id, 0)})." for mentor_id in sorted(mentors)
+        )
+
+        n_type1, n_type2 = self.engine.n_type1, self.engine.n_type2
+        type2 = (
+            f"{n_type2} {{ match(S, M, D) : cand(S, M, D, type2) }} {n_type2} :- day_of(S, D)." if n_type2 > 0 else ""
+        )
+        return f"""
+% Neighborhood of the new student, see matching.placement
+{chr(10).join(facts)}
+
+% Every free student gets one day and exactly n_type1/n_type2 mentors on it
+1 {{ day_of(S, D) : cand(S, _, D, _) }} 1 :- student(S).
+{n_type1} {{ match(S, M, D) : cand(S, M, D, type1) }} {n_type1} :- day_of(S, D).
+{type2}
+
+% Within the room the rest of the cohort leaves
+:- cap(M, C), #count {{ S : match(S, M, _) }} > C.
+
+% Change as few existing assignments as possible
+kept(S) :- was_day(S, D), day_of(S, D), match(S, M, D) : was(S, M, D).
+#minimize {{ 1,S : was_day(S, _), not kept(S) }}.
+
+#show match/3.
+"""
+
+    def _repair(self, student_id: str) -> PlacementResult:
+        if not self.engine.candidate_index()[student_id]:
+            return PlacementResult(student_id, "unplaced")
+        neighbors = self._neighborhood(student_id)
+
+        ctl = Control(["--warn=none"])
+        ctl.add("base", [], self._repair_program(student_id, neighbors))
+        ctl.ground([("base", [])])
+
+        best: Optional[List[MatchTriple]] = None
+
+        def on_model(model) -> None:
+            nonlocal best
+            best = [
+                (symbol.arguments[0].name, symbol.arguments[1].name, symbol.arguments[2].name)
+                for symbol in model.symbols(shown=True)
+                if symbol.name == "match"
+            ]
+
+        with ctl.solve(on_model=on_model, async_=True) as handle:
+            handle.wait(self.repair_timeout_seconds)
+            handle.cancel()
+            handle.get()
+        if best is None:
+            return PlacementResult(student_id, "unplaced")
+
+        placed: Dict[str, Assignment] = {}
+        for free, mentor_id, day in best:
+            placed.setdefault(free, (day, []))[1].append(mentor_id)
+        moved = [
+            other
+            for other in neighbors
+            if placed[other][0] != self._assignment[other][0]
+            or sorted(placed[other][1]) != sorted(self._assignment[other][1])
+        ]
+        for free, (day, mentor_ids) in placed.items():
+            self._assign(free, day, mentor_ids)
+        day, mentor_ids = placed[student_id]
+        return PlacementResult(student_id, "repair", [(student_id, m, day) for m in mentor_ids], moved)
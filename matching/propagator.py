@@ -0,0 +1,150 @@
+"""clingo propagator for mentor capacities and per-type mentor counts.
+
+In the ``propagator`` constraint mode the ASP program leaves ``match/3`` as a
+free choice under ``match_day/2`` and grounds none of the ``#count``
+aggregates. This propagator enforces them on watched solver literals:
+
+* capacity: at most ``Max_Studenten`` true ``match(S, M, Day)`` per mentor,
+* per type: exactly ``n_type1``/``n_type2`` true ``match(S, M, Day)`` of that
+  mentor type for the chosen ``match_day(S, Day)`` (and none otherwise).
+
+The constraints are stateless: every check reads the current assignment, so
+the propagator needs no undo bookkeeping and works with parallel solving.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Tuple
+
+
+@dataclass
+class _AtMost:
+    literals: List[int]
+    bound: int
+
+
+@dataclass
+class _AtLeastIf:
+    guard: int
+    literals: List[int]
+    bound: int
+
+
+class CountPropagator:
+    """Propagate capacity and exact per-type cardinalities of ``match/3``."""
+
+    def __init__(self, *, n_type1: int, n_type2: int, capacities: Mapping[str, int], mentor_types: Mapping[str, str]):
+        self.n_type1 = n_type1
+        self.n_type2 = n_type2
+        self.capacities = dict(capacities)
+        self.mentor_types = dict(mentor_types)
+        self._constraints: List[object] = []
+        self._watches: Dict[int, List[int]] = {}
+
+    def _watch(self, init, literal: int, constraint_id: int) -> None:
+        if literal not in self._watches:
+            self._watches[literal] = []
+            init.add_watch(literal)
+        self._watches[literal].append(constraint_id)
+
+    def init(self, init) -> None:
+        self._constraints = []
+        self._watches = {}
+        required = {"type1": self.n_type1, "type2": self.n_type2}
+        by_mentor: Dict[str, List[int]] = {}
+        by_group: Dict[Tuple[str, str, str], List[int]] = {}
+        for atom in init.symbolic_atoms.by_signature("match", 3):
+            student, mentor, day = (argument.name for argument in atom.symbol.arguments)
+            literal = init.solver_literal(atom.literal)
+            by_mentor.setdefault(mentor, []).append(literal)
+            by_group.setdefault((student, day, self.mentor_types[mentor]), []).append(literal)
+
+        for mentor, literals in by_mentor.items():
+            self._add(init, _AtMost(literals, self.capacities[mentor]))
+
+        for atom in init.symbolic_atoms.by_signature("match_day", 2):
+            student, day = (argument.name for argument in atom.symbol.arguments)
+            guard = init.solver_literal(atom.literal)
+            for mentor_type, bound in required.items():
+                literals = by_group.get((student, day, mentor_type), [])
+                if len(literals) < bound:
+                    init.add_clause([-guard])
+                    continue
+                self._add(init, _AtMost(literals, bound))
+                if bound:
+                    self._add(init, _AtLeastIf(guard, literals, bound))
+
+    def _add(self, init, constraint) -> None:
+        constraint_id = len(self._constraints)
+        self._constraints.append(constraint)
+        if isinstance(constraint, _AtMost):
+            for literal in constraint.literals:
+                self._watch(init, literal, constraint_id)
+        else:
+            self._watch(init, constraint.guard, constraint_id)
+            for literal in constraint.literals:
+                self._watch(init, -literal, constraint_id)
+
+    def propagate(self, control, changes) -> None:
+        pending = []
+        seen = set()
+        for literal in changes:
+            for constraint_id in self._watches.get(literal, ()):
+                if constraint_id not in seen:
+                    seen.add(constraint_id)
+                    pending.append(constraint_id)
+        for constraint_id in pending:
+            if not self._enforce(control, self._constraints[constraint_id]):
+                return
+
+    def check(self, control) -> None:
+        for constraint in self._constraints:
+            if not self._enforce(control, constraint):
+                return
+
+    def _enforce(self, control, constraint) -> bool:
+        """Add the clauses that *constraint* implies; ``False`` stops propagation."""
+
+        assignment = control.assignment
+        if isinstance(constraint, _AtMost):
+            true_literals = [literal for literal in constraint.literals if assignment.is_true(literal)]
+            if len(true_literals) > constraint.bound:
+                conflict = [-literal for literal in true_literals[: constraint.bound + 1]]
+                return control.add_clause(conflict) and control.propagate()
+            if len(true_literals) == constraint.bound:
+                reason = [-literal for literal in true_literals]
+                for literal in constraint.literals:
+                    if assignment.value(literal) is None:
+                        if not (control.add_clause([*reason, -literal]) and control.propagate()):
+                            return False
+            return True
+
+        if assignment.is_false(constraint.guard):
+            return True
+        false_literals = [literal for literal in constraint.literals if assignment.is_false(literal)]
+        open_count = len(constraint.literals) - len(false_literals)
+        if open_count < constraint.bound:
+            return control.add_clause([-constraint.guard, *false_literals]) and control.propagate()
+        if open_count == constraint.bound and assignment.is_true(constraint.guard):
+            for literal in constraint.literals:
+                if assignment.value(literal) is None:
+                    if not (control.add_clause([-constraint.guard, *false_literals, literal]) and control.propagate()):
+                        return False
+        return True
+
+
+def build_propagator(
+    *,
+    n_type1: int,
+    n_type2: int,
+    mentors: List[Dict],
+) -> CountPropagator:
+    """Create the propagator from the engine's mentor cache entries."""
+
+    return CountPropagator(
+        n_type1=n_type1,
+        n_type2=n_type2,
+        capacities={mentor["id"]: mentor["max_students"] for mentor in mentors},
+        mentor_types={mentor["id"]: mentor["mentor_type"] for mentor in mentors},
+    )
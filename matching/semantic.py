@@ -0,0 +1,277 @@
+"""Embedding-based mentor retrieval for the ``semantic`` candidate mode.
+
+Instead of requiring an exact subject match, every student description is
+compared with the mentors' subject profiles by cosine similarity and only
+the top-k mentors per type become candidates. Similarities are computed in
+blocks of students and mentors, so the full student x mentor matrix is never
+held in memory; the normalized mentor matrix is stored as a memory-mapped
+``.npy`` keyed by the profile texts and the embedding model, and the
+optional approximate index over it is stored next to it under the same key.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache import content_key
+
+DEFAULT_VECTOR_DIR = Path(".peer2pro_cache") / "vectors"
+DEFAULT_TOP_K = 10
+DEFAULT_BLOCK_SIZE = 2048
+DEFAULT_MENTOR_BLOCK_SIZE = 8192
+# Mentor pools above this size use the approximate index when enabled.
+APPROXIMATE_MIN_MENTORS = 20000
+# Cosine similarities become integer weights in the ASP objective.
+SCORE_SCALE = 100
+
+Encoder = Callable[[Sequence[str]], np.ndarray]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Return *matrix* as float32 with unit-length rows (zero rows stay zero)."""
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _merge_top_k(
+    best_scores: np.ndarray,
+    best_indices: np.ndarray,
+    scores: np.ndarray,
+    indices: np.ndarray,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the *k* highest of the running and new (score, index) columns per row."""
+
+    scores = np.concatenate([best_scores, scores], axis=1)
+    indices = np.concatenate([best_indices, indices], axis=1)
+    if scores.shape[1] > k:
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, keep, axis=1)
+        indices = np.take_along_axis(indices, keep, axis=1)
+    return scores, indices
+
+
+def _sorted(scores: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def top_k_similar(
+    queries: np.ndarray,
+    corpus: np.ndarray,
+    k: int,
+    *,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    corpus_block_size: int = DEFAULT_MENTOR_BLOCK_SIZE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k inner products of normalized *queries* against *corpus*.
+
+    Returns ``(indices, scores)`` of shape ``(len(queries), min(k, len(corpus)))``
+    sorted by descending score. At most ``block_size x corpus_block_size``
+    similarities exist at any time.
+    """
+
+    k = min(k, len(corpus))
+    indices = np.empty((len(queries), k), dtype=np.int64)
+    scores = np.empty((len(queries), k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+
+    for start in range(0, len(queries), block_size):
+        block = np.asarray(queries[start : start + block_size], dtype=np.float32)
+        best_scores = np.empty((len(block), 0), dtype=np.float32)
+        best_indices = np.empty((len(block), 0), dtype=np.int64)
+        for corpus_start in range(0, len(corpus), corpus_block_size):
+            corpus_block = np.asarray(corpus[corpus_start : corpus_start + corpus_block_size], dtype=np.float32)
+            sims = block @ corpus_block.T
+            block_k = min(k, sims.shape[1])
+            top = np.argpartition(-sims, block_k - 1, axis=1)[:, :block_k]
+            best_scores, best_indices = _merge_top_k(
+                best_scores,
+                best_indices,
+                np.take_along_axis(sims, top, axis=1),
+                top + corpus_start,
+                k,
+            )
+        indices[start : start + len(block)], scores[start : start + len(block)] = _sorted(best_scores, best_indices)
+    return indices, scores
+
+
+class ApproximateIndex:
+    """Inverted-file index over normalized vectors (spherical k-means lists).
+
+    A query only scores the mentors of its ``n_probe`` closest lists, which
+    trades a little recall for a large speed-up on big mentor pools.
+    """
+
+    def __init__(self, corpus: np.ndarray, *, n_lists: Optional[int] = None, n_iter: int = 10, seed: int = 0) -> None:
+        n_lists = n_lists or max(1, int(np.sqrt(len(corpus))))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(len(corpus), 64 * n_lists)
+        sample = np.asarray(corpus[np.sort(rng.choice(len(corpus), sample_size, replace=False))], dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+        for _ in range(n_iter):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(n_lists):
+                members = sample[assignment == list_id]
+                if len(members):
+                    centroids[list_id] = members.sum(axis=0)
+            centroids = normalize_rows(centroids)
+
+        assignment = np.concatenate(
+            [
+                np.argmax(np.asarray(corpus[start : start + DEFAULT_MENTOR_BLOCK_SIZE]) @ centroids.T, axis=1)
+                for start in range(0, len(corpus), DEFAULT_MENTOR_BLOCK_SIZE)
+            ]
+        )
+        self._set_lists(corpus, centroids, assignment)
+
+    def _set_lists(self, corpus: np.ndarray, centroids: np.ndarray, assignment: np.ndarray) -> None:
+        self.corpus = corpus
+        self.centroids = centroids
+        self.assignment = assignment
+        self.lists = [np.flatnonzero(assignment == list_id) for list_id in range(len(centroids))]
+
+    def save(self, path: Path | str) -> None:
+        """Store the centroids and list assignment; the corpus itself is not written."""
+
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp_path, centroids=self.centroids, assignment=self.assignment)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path | str, corpus: np.ndarray) -> "ApproximateIndex":
+        """Rebuild an index written by :meth:`save` over the same *corpus*."""
+
+        index = cls.__new__(cls)
+        with np.load(path) as stored:
+            index._set_lists(corpus, stored["centroids"], stored["assignment"])
+        return index
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        *,
+        n_probe: int = 8,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate :func:`top_k_similar`; rows with fewer hits are padded with index -1."""
+
+        k = min(k, len(self.corpus))
+        n_probe = min(n_probe, len(self.lists))
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        for start in range(0, len(queries), block_size):
+            block = np.asarray(queries[start : start + block_size], dtype=np.float32)
+            probes = np.argpartition(-(block @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+            best_scores = scores[start : start + len(block)]
+            best_indices = indices[start : start + len(block)]
+            for list_id in np.unique(probes):
+                rows = np.flatnonzero((probes == list_id).any(axis=1))
+                members = self.lists[list_id]
+                if not len(members):
+                    continue
+                sims = block[rows] @ np.asarray(self.corpus[members], dtype=np.float32).T
+                merged_scores, merged_indices = _merge_top_k(
+                    best_scores[rows], best_indices[rows], sims, np.broadcast_to(members, sims.shape), k
+                )
+                best_scores[rows], best_indices[rows] = merged_scores, merged_indices
+            indices[start : start + len(block)], scores[start : start + len(block)] = _sorted(best_scores, best_indices)
+        return indices, scores
+
+
+class SemanticRetriever:
+    """Embed students and mentor profiles and retrieve the top-k mentors per student."""
+
+    def __init__(
+        self,
+        encode: Encoder,
+        *,
+        model_name: str,
+        top_k: int = DEFAULT_TOP_K,
+        min_score: float = 0.0,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        approximate: bool = False,
+        n_probe: int = 8,
+        vector_dir: Optional[Path | str] = DEFAULT_VECTOR_DIR,
+    ) -> None:
+        self.encode = encode
+        self.model_name = model_name
+        self.top_k = top_k
+        self.min_score = min_score
+        self.block_size = block_size
+        self.approximate = approximate
+        self.n_probe = n_probe
+        self.vector_dir = Path(vector_dir) if vector_dir is not None else None
+        self._indexes: Dict[str, ApproximateIndex] = {}
+
+    def _mentor_key(self, texts: Sequence[str]) -> str:
+        return content_key("mentor-profiles", self.model_name, tuple(texts))[:24]
+
+    def mentor_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """Return the normalized mentor matrix, memory-mapped when a vector dir is set."""
+
+        if self.vector_dir is None:
+            return normalize_rows(self.encode(list(texts)))
+
+        path = self.vector_dir / f"{self._mentor_key(texts)}.npy"
+        if not path.exists():
+            matrix = normalize_rows(self.encode(list(texts)))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+            np.save(tmp_path, np.ascontiguousarray(matrix))
+            os.replace(tmp_path, path)
+        return np.load(path, mmap_mode="r")
+
+    def approximate_index(self, texts: Sequence[str], mentors: np.ndarray) -> ApproximateIndex:
+        """Return the index over *mentors*, built once per mentor matrix.
+
+        The index is kept in memory for later calls and, with a vector dir,
+        stored next to the mentor matrix under the same key.
+        """
+
+        key = self._mentor_key(texts)
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        path = self.vector_dir / f"{key}.ivf.npz" if self.vector_dir is not None else None
+        if path is not None and path.exists():
+            index = ApproximateIndex.load(path, mentors)
+        else:
+            index = ApproximateIndex(mentors)
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                index.save(path)
+        self._indexes[key] = index
+        return index
+
+    def retrieve(self, student_texts: Sequence[str], mentor_texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(indices, scores)`` of the best mentors for every student.
+
+        Pairs below ``min_score`` (and padding of the approximate index) get
+        index ``-1``.
+        """
+
+        mentors = self.mentor_matrix(mentor_texts)
+        students = normalize_rows(self.encode(list(student_texts))) if len(student_texts) else np.empty((0, 0))
+
+        if self.approximate and len(mentors) >= APPROXIMATE_MIN_MENTORS:
+            indices, scores = self.approximate_index(mentor_texts, mentors).search(
+                students, self.top_k, n_probe=self.n_probe, block_size=self.block_size
+            )
+        else:
+            indices, scores = top_k_similar(students, mentors, self.top_k, block_size=self.block_size)
+        indices[scores < self.min_score] = -1
+        return indices, scores
@@ -0,0 +1,271 @@
+"""Choose how to solve an instance from its size, before anything is grounded.
+
+:func:`estimate_size` reads the engine's candidate index and predicts the
+ground program size, the memory grounding needs and the contention between
+the mentor slots students ask for and the capacity their candidates offer.
+:func:`plan_strategy` turns that into one of:
+
+* ``exact``: one clingo solve of the full program (small or easy instances),
+* ``lns``: large neighborhood search in worker processes, started from a
+  greedy matching (large, contended instances),
+* ``greedy``: a capacity-aware greedy assignment that never grounds, used
+  when the ground program would not fit in the memory limit.
+
+An explicitly requested ``exact`` or ``lns`` solve that would exceed the
+memory limit is refused with a ``ValueError`` instead of being OOM-killed
+halfway through grounding.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .checkpoint import save_checkpoint
+from .diagnostics import mentor_demand
+from .engine import ImprovementCallback, MatchingEngine, MatchTriple, SolveOutcome, StudentMatch
+from .lns import LNSDriver
+
+STRATEGIES = ("auto", "exact", "lns", "greedy")
+DEFAULT_MEMORY_LIMIT_MB = 4096
+DEFAULT_LNS_WORKERS = 2
+
+# Fitted on matching.benchmark runs (one process per variant, n_type1=3,
+# n_type2=1) of generate_instance(n, 2n/5, n/5, seed=0) and
+# generate_instance(n, n/3, n/6, seed=1) for n = 250-2000 students. Ground
+# atoms are two per candidate(S, M, Day) triple plus (per student, per mentor,
+# fixed) atoms that depend on the constraint mode; the #count aggregates
+# account for the difference. On those runs the estimate is within 3% of the
+# ground atoms.
+ATOMS_PER_TRIPLE = 2.0
+CONSTRAINT_MODE_ATOMS = {"aggregate": (41, 14, 14_400), "propagator": (13, 12, 0)}
+# The compact encoding grounds at most 2.5% more atoms than the baseline.
+ENCODING_ATOM_FACTORS = {"baseline": 1.0, "compact": 1.0}
+# Peak RSS of the grounding process is a fixed overhead plus about 0.6 KB per
+# ground atom (within 11% on the runs above).
+BASE_MEMORY_MB = 85
+MB_PER_ATOM = 0.61 / 1024
+# Grounding time per triple; it grows slowly with the instance size and only
+# gives the order of magnitude.
+CONSTRAINT_MODE_SECONDS_PER_TRIPLE = {"aggregate": 1.1e-5, "propagator": 4.3e-6}
+
+# Up to this many candidate triples an exact solve grounds in a few seconds.
+EXACT_MAX_TRIPLES = 250_000
+
+
+@dataclass
+class SizeEstimate:
+    students: int
+    feasible_students: int
+    mentors: int
+    candidate_triples: int
+    ground_atoms: int
+    memory_mb: float
+    ground_seconds: float
+    contention: float
+
+    def summary(self) -> str:
+        return (
+            f"{self.feasible_students}/{self.students} feasible students, {self.mentors} mentors, "
+            f"{self.candidate_triples} candidate triples (~{self.ground_atoms} atoms, "
+            f"~{self.memory_mb:.0f} MB, ~{self.ground_seconds:.1f}s grounding), contention {self.contention:.2f}"
+        )
+
+
+@dataclass
+class StrategyPlan:
+    strategy: str
+    workers: int
+    estimate: SizeEstimate
+    reason: str
+
+
+def _feasible(days: Dict[str, Dict[str, List[str]]], n_type1: int, n_type2: int) -> bool:
+    return any(len(groups["type1"]) >= n_type1 and len(groups["type2"]) >= n_type2 for groups in days.values())
+
+
+def estimate_size(engine: MatchingEngine) -> SizeEstimate:
+    """Predict ground size, memory and contention from the candidate index.
+
+    ``contention`` is the number of mentor slots the feasible students need
+    (``n_type1 + n_type2`` each) divided by the capacity of the mentors they
+    can reach; above 1 not every student can be matched and the optimisation
+    gets hard.
+
+    The ground size follows the engine's settings: with ``kernelize`` only
+    the candidate triples of the reduced instance are counted (the kernel is
+    cached on the engine, so the solve reuses it), and ``encoding`` and
+    ``constraint_mode`` select the calibrated atoms per triple, student and
+    mentor; memory follows from the ground atoms.
+    """
+
+    index = engine.candidate_index()
+    grounded = engine.kernel().candidates if engine.kernelize else index
+    triples = sum(len(ids) for days in grounded.values() for groups in days.values() for ids in groups.values())
+    per_student, per_mentor, fixed = CONSTRAINT_MODE_ATOMS[engine.constraint_mode]
+    atoms = ENCODING_ATOM_FACTORS[engine.encoding] * (
+        triples * ATOMS_PER_TRIPLE + len(grounded) * per_student + len(engine._mentors_cache) * per_mentor + fixed
+    )
+    feasible = sum(1 for days in index.values() if _feasible(days, engine.n_type1, engine.n_type2))
+    demand = mentor_demand(engine)
+    capacity = sum(min(mentor["max_students"], demand[mentor["id"]]) for mentor in engine._mentors_cache)
+    slots = feasible * (engine.n_type1 + engine.n_type2)
+
+    return SizeEstimate(
+        students=len(index),
+        feasible_students=feasible,
+        mentors=len(engine._mentors_cache),
+        candidate_triples=triples,
+        ground_atoms=int(atoms),
+        memory_mb=BASE_MEMORY_MB + atoms * MB_PER_ATOM,
+        ground_seconds=triples * CONSTRAINT_MODE_SECONDS_PER_TRIPLE[engine.constraint_mode],
+        contention=slots / capacity if capacity else (float("inf") if slots else 0.0),
+    )
+
+
+def plan_strategy(
+    estimate: SizeEstimate,
+    strategy: str = "auto",
+    *,
+    memory_limit_mb: Optional[float] = DEFAULT_MEMORY_LIMIT_MB,
+    workers: int = DEFAULT_LNS_WORKERS,
+) -> StrategyPlan:
+    """Resolve ``auto`` and check the memory limit (``None`` or 0 disables it).
+
+    Every LNS worker grounds the full program, so the number of workers is
+    lowered until they fit in the limit together.
+    """
+
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'; choose from {', '.join(STRATEGIES)}.")
+
+    limit = memory_limit_mb or float("inf")
+    fitting_workers = max(0, min(workers, int(limit // estimate.memory_mb)))
+    too_large = (
+        f"the ground program needs ~{estimate.memory_mb:.0f} MB, more than the {limit:.0f} MB memory limit"
+    )
+
+    if strategy == "greedy":
+        return StrategyPlan("greedy", 0, estimate, "requested")
+    if strategy in ("exact", "lns") and fitting_workers == 0:
+        raise ValueError(f"Refusing the {strategy} solve: {too_large}. Raise the limit or use the greedy strategy.")
+    if strategy == "exact":
+        return StrategyPlan("exact", 0, estimate, "requested")
+    if strategy == "lns":
+        return StrategyPlan("lns", fitting_workers, estimate, "requested")
+
+    if fitting_workers == 0:
+        return StrategyPlan("greedy", 0, estimate, too_large)
+    if estimate.candidate_triples <= EXACT_MAX_TRIPLES:
+        return StrategyPlan("exact", 0, estimate, "small instance")
+    if estimate.contention <= 1:
+        return StrategyPlan("exact", 0, estimate, "every feasible student fits the mentor capacity")
+    return StrategyPlan("lns", fitting_workers, estimate, "large, contended instance")
+
+
+def greedy_triples(engine: MatchingEngine) -> List[MatchTriple]:
+    """Match students one by one without grounding.
+
+    Students with the fewest candidates go first. Each takes the day and the
+    mentors with the lowest remaining pressure (students still to come that
+    can reach the mentor, per free slot), so scarce mentors are left for the
+    students that depend on them.
+    """
+
+    index = engine.candidate_index()
+    n_type1, n_type2 = engine.n_type1, engine.n_type2
+    remaining = {mentor["id"]: mentor["max_students"] for mentor in engine._mentors_cache}
+    demand = mentor_demand(engine)
+
+    def pressure(mentor_id: str) -> float:
+        return demand[mentor_id] / remaining[mentor_id]
+
+    def size(student_id: str) -> int:
+        return sum(len(ids) for groups in index[student_id].values() for ids in groups.values())
+
+    triples: List[MatchTriple] = []
+    for student_id in sorted(index, key=lambda student_id: (size(student_id), student_id)):
+        days = index[student_id]
+        best = None
+        for day, groups in days.items():
+            type1 = sorted((m for m in groups["type1"] if remaining[m] > 0), key=pressure)[:n_type1]
+            type2 = sorted((m for m in groups["type2"] if remaining[m] > 0), key=pressure)[:n_type2]
+            if len(type1) < n_type1 or len(type2) < n_type2:
+                continue
+            score = sum(pressure(m) for m in type1 + type2)
+            if best is None or score < best[0]:
+                best = (score, day, type1 + type2)
+
+        for mentor_id in {m for groups in days.values() for ids in groups.values() for m in ids}:
+            demand[mentor_id] -= 1
+        if best is not None:
+            _, day, mentor_ids = best
+            for mentor_id in mentor_ids:
+                remaining[mentor_id] -= 1
+                triples.append((student_id, mentor_id, day))
+    return triples
+
+
+def solve_outcome_with_plan(
+    engine: MatchingEngine,
+    plan: StrategyPlan,
+    timeout_seconds: float,
+    *,
+    on_improvement: Optional[ImprovementCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+    checkpoint_path: Optional[str] = None,
+    warm_start: Optional[SolveOutcome] = None,
+) -> SolveOutcome:
+    """Run the planned strategy; only an exact solve can prove its result optimal."""
+
+    if plan.strategy == "exact":
+        return engine.solve_triples(
+            timeout_seconds,
+            on_improvement=on_improvement,
+            cancel_event=cancel_event,
+            checkpoint_path=checkpoint_path,
+            warm_start=warm_start,
+        )
+
+    triples = warm_start.triples if warm_start is not None else greedy_triples(engine)
+    if plan.strategy == "lns":
+        result = LNSDriver(engine, workers=plan.workers, verbose=engine.verbose).run(
+            timeout_seconds,
+            initial_triples=triples,
+            on_improvement=on_improvement,
+            cancel_event=cancel_event,
+            checkpoint_path=checkpoint_path,
+        )
+        return SolveOutcome(triples=result.triples, cost=result.cost)
+
+    cost = engine.objective_cost(triples)
+    if on_improvement is not None:
+        on_improvement(len({student_id for student_id, _, _ in triples}), cost)
+    if checkpoint_path:
+        save_checkpoint(checkpoint_path, signature=engine.instance_signature(), triples=triples, cost=cost)
+    return SolveOutcome(triples=triples, cost=cost)
+
+
+def solve_with_plan(
+    engine: MatchingEngine,
+    plan: StrategyPlan,
+    timeout_seconds: float,
+    *,
+    on_improvement: Optional[ImprovementCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+    checkpoint_path: Optional[str] = None,
+    warm_start: Optional[SolveOutcome] = None,
+) -> List[StudentMatch]:
+    """Run the planned strategy and return the matches."""
+
+    outcome = solve_outcome_with_plan(
+        engine,
+        plan,
+        timeout_seconds,
+        on_improvement=on_improvement,
+        cancel_event=cancel_event,
+        checkpoint_path=checkpoint_path,
+        warm_start=warm_start,
+    )
+    return engine.matches_from_triples(outcome.triples)
@@ -0,0 +1,227 @@
+"""What-if sweeps over ``n_type1``, ``n_type2`` and mentor capacity scenarios.
+
+The engine bakes ``n_type1``/``n_type2`` and the capacities into the program
+text, so comparing settings used to mean one full run per setting. Here the
+parameters are ``#external`` atoms: the program is grounded once for every
+value in the grid and each scenario is solved on the same ``Control`` by
+switching the externals.
+
+The sweep program is the baseline encoding with ``#count`` aggregates, so it
+only accepts engines built with ``encoding="baseline"``,
+``constraint_mode="aggregate"`` and without ``kernelize``; any other engine
+would be compared on a program it was not configured for.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import pandas as pd
+from clingo import Control, Function, Number, String
+
+from .engine import MatchingEngine, SolveOutcome
+
+# A capacity scenario scales every mentor's Max_Studenten, or overrides it per mentor ID.
+CapacityScenario = Union[float, Mapping[str, int]]
+DEFAULT_SCENARIOS: Dict[str, CapacityScenario] = {"baseline": 1.0}
+
+
+class ParameterSweep:
+    """Ground the engine's instance once and solve it for many parameter settings."""
+
+    def __init__(
+        self,
+        engine: MatchingEngine,
+        *,
+        n_type1_values: Iterable[int] = (2, 3, 4),
+        n_type2_values: Iterable[int] = (0, 1, 2),
+        capacity_scenarios: Optional[Mapping[str, CapacityScenario]] = None,
+        verbose: bool = True,
+    ) -> None:
+        if engine.encoding != "baseline" or engine.constraint_mode != "aggregate" or engine.kernelize:
+            raise ValueError(
+                "ParameterSweep needs encoding='baseline', constraint_mode='aggregate' and no kernelize."
+            )
+        self.engine = engine
+        self.n_type1_values = sorted(set(n_type1_values))
+        self.n_type2_values = sorted(set(n_type2_values))
+        self.capacity_scenarios = dict(capacity_scenarios or DEFAULT_SCENARIOS)
+        self.verbose = verbose
+        self.ground_seconds: Optional[float] = None
+        self._ctl: Optional[Control] = None
+
+    def _capacity(self, mentor: Dict, scenario: CapacityScenario) -> int:
+        if isinstance(scenario, Mapping):
+            return int(scenario.get(mentor["id"], mentor["max_students"]))
+        return max(0, int(mentor["max_students"] * scenario))
+
+    def _build_program(self) -> str:
+        engine = self.engine
+        capacity_facts = "\n".join(
+            f'capacity({mentor["id"]}, "{name}", {self._capacity(mentor, scenario)}).'
+            for name, scenario in self.capacity_scenarios.items()
+            for mentor in engine._mentors_cache
+        )
+        externals = "\n".join(
+            [f"#external n_type1({n})." for n in self.n_type1_values]
+            + [f"#external n_type2({n})." for n in self.n_type2_values]
+            + [f'#external scenario("{name}").' for name in self.capacity_scenarios]
+        )
+        return f"""
+% Facts from Python
+{engine._generate_asp_facts()}
+{capacity_facts}
+
+% Sweep parameters; exactly one of each is set to true per solve
+{externals}
+
+{engine._candidate_rule()}
+
+% Choose which students to match (0 or 1 day per student)
+{{ selected(S) }} :- student(S).
+
+% If selected, choose exactly one day
+1 {{ match_day(S, Day) : day(Day), availability(S, Day) }} 1 :- selected(S).
+
+% Only allow days where student has enough candidates
+:- match_day(S, Day), n_type1(N), #count {{ M : candidate(S,M,Day), mentor_type(M,type1) }} < N.
+:- match_day(S, Day), n_type2(N), #count {{ M : candidate(S,M,Day), mentor_type(M,type2) }} < N.
+
+% Choose exact mentors per type
+N {{ match(S, M, Day) : candidate(S,M,Day), mentor_type(M,type1) }} N :- match_day(S, Day), n_type1(N).
+N {{ match(S, M, Day) : candidate(S,M,Day), mentor_type(M,type2) }} N :- match_day(S, Day), n_type2(N).
+
+% Respect mentor capacities of the active scenario
+:- mentor(M), scenario(X), capacity(M, X, Max), #count {{ S, Day : match(S, M, Day) }} > Max.
+
+{engine._objective()}
+
+#show match/3.
+"""
+
+    def ground(self) -> None:
+        """Ground the parametric program; called by :meth:`solve` on first use."""
+
+        self.engine._ensure_loaded()
+        started = time.perf_counter()
+        ctl = Control(self.engine.solver_arguments())
+        ctl.add("base", [], self._build_program())
+        ctl.ground([("base", [])])
+        self.ground_seconds = time.perf_counter() - started
+        self._ctl = ctl
+        if self.verbose:
+            print(f"Grounded sweep program once in {self.ground_seconds:.2f}s")
+
+    def _select(self, n_type1: int, n_type2: int, scenario: str) -> None:
+        for n in self.n_type1_values:
+            self._ctl.assign_external(Function("n_type1", [Number(n)]), n == n_type1)
+        for n in self.n_type2_values:
+            self._ctl.assign_external(Function("n_type2", [Number(n)]), n == n_type2)
+        for name in self.capacity_scenarios:
+            self._ctl.assign_external(Function("scenario", [String(name)]), name == scenario)
+
+    def solve(
+        self,
+        n_type1: int,
+        n_type2: int,
+        scenario: str = "baseline",
+        *,
+        timeout_seconds: float = 30,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> SolveOutcome:
+        """Solve one setting; every value must be part of the sweep grid."""
+
+        if n_type1 not in self.n_type1_values or n_type2 not in self.n_type2_values:
+            raise ValueError(f"n_type1={n_type1}, n_type2={n_type2} is outside the grounded grid.")
+        if scenario not in self.capacity_scenarios:
+            raise ValueError(f"Unknown capacity scenario '{scenario}'.")
+        if self._ctl is None:
+            self.ground()
+        self._select(n_type1, n_type2, scenario)
+
+        best: List[Tuple[str, str, str]] = []
+        best_cost: Optional[Tuple[int, ...]] = None
+
+        def on_model(model) -> None:
+            nonlocal best, best_cost
+            best_cost = tuple(model.cost)
+            best = [
+                (symbol.arguments[0].name, symbol.arguments[1].name, symbol.arguments[2].name)
+                for symbol in model.symbols(shown=True)
+                if symbol.name == "match"
+            ]
+
+        with self._ctl.solve(on_model=on_model, async_=True) as handle:
+            deadline = time.monotonic() + timeout_seconds
+            while not (cancel_event and cancel_event.is_set()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or handle.wait(min(0.1, remaining)):
+                    break
+            handle.cancel()
+            result = handle.get()
+
+        return SolveOutcome(
+            triples=best,
+            cost=best_cost,
+            optimal=bool(result.satisfiable and (result.exhausted or best_cost == ())),
+            interrupted=bool(result.interrupted),
+            unsatisfiable=bool(result.unsatisfiable),
+        )
+
+    def run(
+        self,
+        *,
+        timeout_seconds: float = 30,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> pd.DataFrame:
+        """Solve every combination and return one comparison row per setting."""
+
+        rows = []
+        for scenario in self.capacity_scenarios:
+            for n_type1 in self.n_type1_values:
+                for n_type2 in self.n_type2_values:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return pd.DataFrame(rows)
+                    started = time.perf_counter()
+                    outcome = self.solve(
+                        n_type1, n_type2, scenario, timeout_seconds=timeout_seconds, cancel_event=cancel_event
+                    )
+                    rows.append(
+                        {
+                            "scenario": scenario,
+                            "n_type1": n_type1,
+                            "n_type2": n_type2,
+                            "matched": outcome.matched,
+                            "students": len(self.engine._students_cache),
+                            "optimal": outcome.optimal,
+                            "solve_seconds": round(time.perf_counter() - started, 3),
+                        }
+                    )
+                    if self.verbose:
+                        print(
+                            f"[{scenario}] n_type1={n_type1}, n_type2={n_type2}: {outcome.matched} matched"
+                            f"{' (optimal)' if outcome.optimal else ''}"
+                        )
+        return pd.DataFrame(rows)
+
+
+def sweep(
+    engine: MatchingEngine,
+    *,
+    n_type1_values: Iterable[int] = (2, 3, 4),
+    n_type2_values: Iterable[int] = (0, 1, 2),
+    capacity_scenarios: Optional[Mapping[str, CapacityScenario]] = None,
+    timeout_seconds: float = 30,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """Compare matched counts over a parameter grid with a single grounding."""
+
+    return ParameterSweep(
+        engine,
+        n_type1_values=n_type1_values,
+        n_type2_values=n_type2_values,
+        capacity_scenarios=capacity_scenarios,
+        verbose=verbose,
+    ).run(timeout_seconds=timeout_seconds)
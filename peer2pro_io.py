@@ -0,0 +1,99 @@
+"""Table I/O and content hashing shared by :mod:`matching` and :mod:`log_reg_library`.
+
+Both packages read and write tables by file suffix (CSV, Parquet or Arrow)
+and key their caches with :func:`content_key`. This module needs only pandas
+(and pyarrow for columnar output), so the classifier library can use it
+without importing the solver.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+import pandas as pd
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+# Bump when the encoding or the cached value layout changes.
+CACHE_VERSION = "1"
+
+
+def table_format(path: Path | str) -> str:
+    """Return ``"csv"``, ``"parquet"`` or ``"arrow"`` based on the file suffix."""
+
+    suffix = Path(path).suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        return "parquet"
+    if suffix in ARROW_SUFFIXES:
+        return "arrow"
+    return "csv"
+
+
+def read_table(path: Path | str) -> pd.DataFrame:
+    """Read a CSV, Parquet or Arrow (Feather v2) file into a DataFrame."""
+
+    fmt = table_format(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt == "arrow":
+        return pd.read_feather(path)
+    return pd.read_csv(path)
+
+
+def write_table(
+    df: pd.DataFrame,
+    path: Path | str,
+    *,
+    list_types: Optional[Mapping[str, str]] = None,
+) -> None:
+    """Write *df* in the format implied by the suffix of *path*.
+
+    ``list_types`` maps list columns to their Arrow value type (for example
+    ``{"type2_mentor_ids": "int64"}``) so empty lists keep a stable schema in
+    columnar output. It is ignored for CSV.
+    """
+
+    fmt = table_format(path)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return
+
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for column, value_type in (list_types or {}).items():
+        if column not in table.column_names:
+            continue
+        position = table.schema.get_field_index(column)
+        target = pa.list_(pa.type_for_alias(value_type))
+        table = table.set_column(position, column, table.column(column).cast(target))
+
+    if fmt == "parquet":
+        pq.write_table(table, path)
+    else:
+        feather.write_feather(table, path)
+
+
+def file_digest(path: Path | str, *, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_key(*parts: Any) -> str:
+    """Combine strings, numbers and ``None`` into one stable hex key."""
+
+    digest = hashlib.sha256(CACHE_VERSION.encode())
+    for part in parts:
+        digest.update(b"\x1f")
+        digest.update(repr(part).encode())
+    return digest.hexdigest()
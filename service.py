@@ -0,0 +1,532 @@
+"""Local matching service for other tools, instead of one Python process per run.
+
+The service keeps the classifier warm between jobs and solves in a bounded
+process pool. Jobs wait in a priority queue (higher ``priority`` first, then
+submission order). Each job is classified in the service process, one job at
+a time, and then solved by :func:`batch.solve_job` in a worker process.
+Every improving matching is streamed to the clients that watch the job and
+written to a checkpoint, which ``best`` reads. Cancelling a running job stops
+its solver; the best matching found so far is still exported.
+
+Clients talk JSON lines over TCP. Each request is one JSON object with an
+``op`` and gets exactly one response line with ``"ok": true`` or
+``"ok": false`` and an ``error``:
+
+* ``{"op": "submit", "job": {...}, "priority": 0}`` returns the ``job_id``.
+  The job has the columns of a ``batch.py`` manifest row, optionally
+  ``timeout_seconds``, ``strategy``, ``classifier`` and ``fast_path_threshold``.
+* ``{"op": "status", "job_id": ...}`` and ``{"op": "list"}`` return job states.
+* ``{"op": "watch", "job_id": ...}`` first streams the job's events, one
+  line each with an ``event`` key, until the job ends.
+* ``{"op": "best", "job_id": ...}`` returns the best matching so far, with
+  students and mentors as row indices of the input files.
+* ``{"op": "cancel", "job_id": ...}`` cancels a queued or running job.
+
+Run ``python service.py --help`` for the options.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from batch import solve_job
+from main import classification_cache_key, load_pipeline_classifier
+from matching import read_table
+from matching.cache import DEFAULT_CACHE_DIR, ResultCache
+from matching.checkpoint import load_checkpoint
+from matching.strategy import DEFAULT_MEMORY_LIMIT_MB, STRATEGIES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORK_DIR = Path(".peer2pro_cache") / "service"
+
+CLASSIFIERS = ("embedding", "tiered", "distilled")
+TERMINAL_STATES = ("done", "failed", "cancelled")
+# Seconds to wait for a finished worker's last progress events.
+DRAIN_TIMEOUT_SECONDS = 5
+
+REQUIRED_JOB_KEYS = ("students_input_path", "mentors_type1_path", "export_path")
+JOB_DEFAULTS = {
+    "name": None,
+    "mentors_type2_path": None,
+    "n_type1": 4,
+    "n_type2": None,
+    "timeout_seconds": 120,
+    "strategy": "exact",
+    "classifier": "embedding",
+    "fast_path_threshold": 0.6,
+}
+
+
+@dataclass
+class Job:
+    job_id: str
+    spec: dict
+    priority: int = 0
+    state: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    matched: Optional[int] = None
+    cost: Optional[List[int]] = None
+    summary: Optional[dict] = None
+    error: str = ""
+    cancel_requested: bool = False
+    events: List[dict] = field(default_factory=list)
+    # Set and replaced on every event, so watchers wake up once per event.
+    updated: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def status(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "name": self.spec["name"],
+            "priority": self.priority,
+            "state": self.state,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "matched": self.matched,
+            "cost": self.cost,
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+
+def normalize_job(spec: dict) -> dict:
+    """Validate a submitted job and fill in the defaults; raises ``ValueError``."""
+
+    unknown = set(spec) - set(REQUIRED_JOB_KEYS) - set(JOB_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+    missing = [key for key in REQUIRED_JOB_KEYS if not spec.get(key)]
+    if missing:
+        raise ValueError(f"Job is missing required fields: {', '.join(missing)}")
+
+    job = {**JOB_DEFAULTS, **spec}
+    for key in ("students_input_path", "mentors_type1_path", "mentors_type2_path"):
+        if job[key] and not Path(job[key]).exists():
+            raise ValueError(f"Missing {key.removesuffix('_path').replace('_', ' ')} file: {job[key]}")
+    if job["strategy"] not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{job['strategy']}'; choose from {', '.join(STRATEGIES)}.")
+    if job["classifier"] not in CLASSIFIERS:
+        raise ValueError(f"Unknown classifier '{job['classifier']}'; choose from {', '.join(CLASSIFIERS)}.")
+    return job
+
+
+def _row_index(entity_id: str) -> int | str:
+    index = entity_id.removeprefix("m2_") if entity_id.startswith("m2_") else entity_id[1:]
+    return int(index) if index.isdigit() else index
+
+
+def triples_to_rows(triples) -> List[dict]:
+    """Group ``match/3`` triples per student, with input row indices instead of names."""
+
+    rows: Dict[tuple, dict] = {}
+    for student_id, mentor_id, day in triples:
+        row = rows.setdefault(
+            (student_id, day), {"student": _row_index(student_id), "day": day, "type1": [], "type2": []}
+        )
+        row["type2" if mentor_id.startswith("m2_") else "type1"].append(_row_index(mentor_id))
+    return list(rows.values())
+
+
+def _solve_in_worker(
+    job_id, job, students_df, memory_limit_mb, checkpoint_path, cache_dir, events, cancel_event
+) -> dict:
+    """Process-pool entry point: solve one job and forward its progress to ``events``."""
+
+    def on_improvement(matched: int, cost) -> None:
+        events.put((job_id, {"event": "improvement", "matched": matched, "cost": list(cost)}))
+
+    try:
+        return solve_job(
+            job,
+            students_df,
+            float(job["timeout_seconds"]),
+            memory_limit_mb,
+            strategy=job["strategy"],
+            on_improvement=on_improvement,
+            cancel_event=cancel_event,
+            checkpoint_path=checkpoint_path,
+            cache_dir=cache_dir,
+        )
+    finally:
+        events.put((job_id, None))
+
+
+class MatchingService:
+    """Queue, classify and solve matching jobs; see the module docstring."""
+
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        memory_limit_mb: float | None = DEFAULT_MEMORY_LIMIT_MB,
+        work_dir: Path | str = DEFAULT_WORK_DIR,
+        cache_dir: Path | str | None = DEFAULT_CACHE_DIR,
+        verbose: bool = True,
+    ) -> None:
+        self.workers = workers
+        self.memory_limit_mb = memory_limit_mb
+        self.work_dir = Path(work_dir)
+        self.cache = ResultCache(cache_dir) if cache_dir else None
+        self.verbose = verbose
+
+        self._jobs: Dict[str, Job] = {}
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._sequence = 0
+        self._classifiers: Dict[tuple, object] = {}
+        self._classify_lock = asyncio.Lock()
+        self._cancel_events: Dict[str, object] = {}
+        self._drained: Dict[str, asyncio.Event] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._events = None
+
+    async def start(self, preload: tuple = ()) -> None:
+        """Start the worker pool and runners, loading the ``preload`` classifiers first."""
+
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        for classifier_mode in preload:
+            await asyncio.to_thread(self._classifier, classifier_mode, JOB_DEFAULTS["fast_path_threshold"])
+        self._manager = multiprocessing.Manager()
+        self._events = self._manager.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._tasks = [asyncio.create_task(self._relay_events())]
+        self._tasks += [asyncio.create_task(self._runner()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        """Cancel unfinished jobs and stop the workers."""
+
+        for job in self._jobs.values():
+            if job.state not in TERMINAL_STATES:
+                self.cancel(job.job_id)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.shutdown, wait=True, cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
+
+    def submit(self, spec: dict, priority: int = 0) -> Job:
+        job = Job(job_id=uuid.uuid4().hex[:12], spec=normalize_job(spec), priority=int(priority))
+        job.spec["name"] = job.spec["name"] or job.job_id
+        self._jobs[job.job_id] = job
+        self._sequence += 1
+        self._queue.put_nowait((-job.priority, self._sequence, job.job_id))
+        self._publish(job, {"event": "state", "state": job.state})
+        return job
+
+    def get(self, job_id: str) -> Job:
+        if job_id not in self._jobs:
+            raise ValueError(f"Unknown job '{job_id}'.")
+        return self._jobs[job_id]
+
+    def jobs(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Job:
+        """Drop a queued job, or stop a running one after its current stage."""
+
+        job = self.get(job_id)
+        if job.state in TERMINAL_STATES:
+            return job
+        job.cancel_requested = True
+        if job.state == "queued":
+            self._finish(job, "cancelled")
+        elif job_id in self._cancel_events:
+            self._cancel_events[job_id].set()
+        return job
+
+    def best(self, job_id: str) -> dict:
+        job = self.get(job_id)
+        checkpoint = load_checkpoint(self._checkpoint_path(job))
+        if checkpoint is None:
+            return {"job_id": job_id, "matched": 0, "cost": None, "optimal": False, "matches": []}
+        return {
+            "job_id": job_id,
+            "matched": checkpoint.matched,
+            "cost": list(checkpoint.cost),
+            "optimal": checkpoint.optimal,
+            "matches": triples_to_rows(checkpoint.triples),
+        }
+
+    async def watch(self, job_id: str) -> AsyncIterator[dict]:
+        """Yield the job's past and future events until it reaches a terminal state."""
+
+        job = self.get(job_id)
+        position = 0
+        while True:
+            updated = job.updated
+            while position < len(job.events):
+                yield job.events[position]
+                position += 1
+            if job.state in TERMINAL_STATES:
+                return
+            await updated.wait()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the JSON-lines protocol on one connection."""
+
+        async def send(message: dict) -> None:
+            writer.write((json.dumps(message) + "\n").encode())
+            await writer.drain()
+
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    response = await self._dispatch(json.loads(line), send)
+                except (ValueError, KeyError, TypeError) as exc:
+                    response = {"ok": False, "error": str(exc)}
+                await send(response)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: dict, send: Callable) -> dict:
+        op = request.get("op")
+        if op == "submit":
+            return {"ok": True, "job_id": self.submit(request["job"], request.get("priority", 0)).job_id}
+        if op == "list":
+            return {"ok": True, "jobs": [job.status() for job in self.jobs()]}
+        if op == "status":
+            return {"ok": True, "job": self.get(request["job_id"]).status()}
+        if op == "cancel":
+            return {"ok": True, "job": self.cancel(request["job_id"]).status()}
+        if op == "best":
+            return {"ok": True, **self.best(request["job_id"])}
+        if op == "watch":
+            async for event in self.watch(request["job_id"]):
+                await send(event)
+            return {"ok": True, "job": self.get(request["job_id"]).status()}
+        raise ValueError(f"Unknown op '{op}'; use submit, list, status, watch, best or cancel.")
+
+    def _publish(self, job: Job, event: dict) -> None:
+        job.events.append({"job_id": job.job_id, "time": time.time(), **event})
+        if event["event"] == "improvement":
+            job.matched, job.cost = event["matched"], event["cost"]
+        job.updated.set()
+        job.updated = asyncio.Event()
+
+    def _set_state(self, job: Job, state: str) -> None:
+        job.state = state
+        self._publish(job, {"event": "state", "state": state})
+        if self.verbose:
+            print(f"[{state}] {job.spec['name']} ({job.job_id})")
+
+    def _finish(self, job: Job, state: str, *, summary: Optional[dict] = None, error: str = "") -> None:
+        job.finished_at = time.time()
+        job.summary = summary
+        job.error = error
+        if summary is not None:
+            job.matched = summary["matched"]
+        self._set_state(job, state)
+
+    def _checkpoint_path(self, job: Job) -> Path:
+        return self.work_dir / f"{job.job_id}.json"
+
+    def _classifier(self, classifier_mode: str, fast_path_threshold: float):
+        key = (classifier_mode, fast_path_threshold if classifier_mode == "tiered" else None)
+        if key not in self._classifiers:
+            self._classifiers[key] = load_pipeline_classifier(classifier_mode, fast_path_threshold)
+        return self._classifiers[key]
+
+    def _classify(self, job: Job) -> pd.DataFrame:
+        spec = job.spec
+        key = None
+        if self.cache is not None:
+            key = classification_cache_key(spec["students_input_path"], spec["classifier"], spec["fast_path_threshold"])
+            cached = self.cache.get("classifications", key)
+            if cached is not None:
+                return cached
+
+        classifier = self._classifier(spec["classifier"], spec["fast_path_threshold"])
+        classified = classifier.annotate_dataframe(
+            read_table(spec["students_input_path"]),
+            description_column="omschrijving",
+            fill_column="Onderwerp",
+            copy=False,
+            categorical=True,
+        )
+        if self.cache is not None:
+            self.cache.put("classifications", key, classified)
+        return classified
+
+    async def _runner(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self._jobs[job_id]
+            if job.state == "queued":
+                await self._run(job)
+
+    async def _run(self, job: Job) -> None:
+        job.started_at = time.time()
+        self._cancel_events[job.job_id] = self._manager.Event()
+        try:
+            self._set_state(job, "classifying")
+            async with self._classify_lock:
+                students_df = await asyncio.to_thread(self._classify, job)
+            if job.cancel_requested:
+                self._finish(job, "cancelled")
+                return
+
+            self._set_state(job, "solving")
+            drained = self._drained[job.job_id] = asyncio.Event()
+            summary = await asyncio.get_running_loop().run_in_executor(
+                self._pool,
+                _solve_in_worker,
+                job.job_id,
+                job.spec,
+                students_df,
+                self.memory_limit_mb,
+                str(self._checkpoint_path(job)),
+                str(self.cache.cache_dir) if self.cache is not None else None,
+                self._events,
+                self._cancel_events[job.job_id],
+            )
+            try:
+                await asyncio.wait_for(drained.wait(), DRAIN_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+            if summary["status"] == "error":
+                self._finish(job, "failed", summary=summary, error=summary["error"])
+            elif summary["status"] == "cancelled":
+                self._finish(job, "cancelled", summary=summary)
+            else:
+                self._finish(job, "done", summary=summary)
+        except asyncio.CancelledError:
+            # The service is closing; close() has already stopped the solver.
+            self._finish(job, "cancelled")
+            raise
+        except Exception as exc:  # noqa: BLE001
+            self._finish(job, "failed", error=str(exc))
+        finally:
+            self._cancel_events.pop(job.job_id, None)
+            self._drained.pop(job.job_id, None)
+
+    async def _relay_events(self) -> None:
+        """Move worker progress from the manager queue onto the jobs."""
+
+        while True:
+            job_id, event = await asyncio.to_thread(self._events.get)
+            if event is None:
+                if job_id in self._drained:
+                    self._drained[job_id].set()
+            elif job_id in self._jobs:
+                self._publish(self._jobs[job_id], event)
+
+
+def call(request: dict, *, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, on_event=None) -> dict:
+    """Send one request to a running service and return its response.
+
+    Streamed ``watch`` events are passed to ``on_event`` as they arrive.
+    """
+
+    with socket.create_connection((host, port)) as connection, connection.makefile("rw") as stream:
+        stream.write(json.dumps(request) + "\n")
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            if "ok" in message:
+                return message
+            if on_event is not None:
+                on_event(message)
+    raise ConnectionError("The service closed the connection without a response.")
+
+
+async def serve(host: str, port: int, *, preload: tuple = ("embedding",), **service_options) -> None:
+    service = MatchingService(**service_options)
+    await service.start(preload)
+    server = await asyncio.start_server(service.handle_client, host, port)
+    if service.verbose:
+        print(f"Matching service listening on {host}:{port} with {service.workers} solver processes")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve matching jobs over a local JSON-lines TCP socket.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Interface to listen on (default: {DEFAULT_HOST}).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT}).")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Number of solver processes, and of jobs that run at the same time (default: 2).",
+    )
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=float,
+        default=DEFAULT_MEMORY_LIMIT_MB,
+        help=(
+            "Per-job limit for the estimated ground program; larger jobs use the greedy assignment "
+            f"instead of grounding (0 disables the check, default: {DEFAULT_MEMORY_LIMIT_MB})."
+        ),
+    )
+    parser.add_argument(
+        "--preload",
+        nargs="*",
+        choices=CLASSIFIERS,
+        default=["embedding"],
+        help="Classifiers to load at startup; others are loaded by their first job (default: embedding).",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default=str(DEFAULT_WORK_DIR),
+        help=f"Directory for the per-job checkpoints (default: {DEFAULT_WORK_DIR}).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CACHE_DIR),
+        help=(
+            "Directory of the classification cache and compiled mentor pools shared with main.py "
+            f"(default: {DEFAULT_CACHE_DIR})."
+        ),
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Always classify students and parse mentors again.")
+    parser.add_argument("--quiet", action="store_true", help="Do not print job state changes.")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    try:
+        asyncio.run(
+            serve(
+                args.host,
+                args.port,
+                preload=tuple(args.preload),
+                workers=args.workers,
+                memory_limit_mb=args.memory_limit_mb,
+                work_dir=args.work_dir,
+                cache_dir=None if args.no_cache else args.cache_dir,
+                verbose=not args.quiet,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
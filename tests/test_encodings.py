@@ -0,0 +1,87 @@
+"""Every encoding and constraint mode must reach the same optimum on small instances.
+
+Run with ``python -m pytest -q`` from the repository root.
+"""
+
+import pytest
+
+from matching import MatchingEngine
+from matching.benchmark import VARIANTS, check_equivalence, measure_variant
+from matching.instances import generate_instance
+from matching.strategy import estimate_size
+
+# (students, seed): small enough to be proven optimal in well under a second
+# per variant; (12, 1) is solved completely by the kernel and nobody in
+# (12, 2) can be matched.
+EQUIVALENCE_INSTANCES = [(12, 1), (12, 2), (16, 0), (16, 1), (20, 0), (20, 1), (20, 2)]
+
+# Ground atoms and rules of generate_instance(40, 13, 6, n_subjects=4, seed=3)
+# with two type1 and one type2 mentor, about 10% above the measured size.
+SIZE_INSTANCE = (40, 13, 6, 3)
+GROUND_LIMITS = {
+    "aggregate": (6600, 3300),
+    "propagator": (2600, 2550),
+    "kernel": (6000, 2750),
+    "compact": (6500, 3300),
+    "compact-propagator": (2550, 2600),
+}
+
+
+def _instance(n_students, seed):
+    return generate_instance(n_students, n_students // 3, n_students // 6, n_subjects=4, seed=seed)
+
+
+@pytest.mark.parametrize("n_students, seed", EQUIVALENCE_INSTANCES)
+def test_variants_reach_the_same_optimum(n_students, seed):
+    result = check_equivalence([_instance(n_students, seed)], timeout_seconds=30)
+
+    assert set(result["variant"]) == set(VARIANTS)
+    assert result["valid"].all(), result.loc[~result["valid"], ["variant", "problems"]].to_string()
+    assert result["optimal"].all(), result.loc[~result["optimal"], "variant"].tolist()
+    assert result["matched"].nunique() == 1, result[["variant", "matched"]].to_string()
+
+
+def test_every_variant_has_a_ground_limit():
+    assert set(GROUND_LIMITS) == set(VARIANTS)
+
+
+@pytest.mark.parametrize("variant", sorted(GROUND_LIMITS))
+def test_ground_program_stays_within_limits(variant):
+    n_students, n_type1, n_type2, seed = SIZE_INSTANCE
+    instance = generate_instance(n_students, n_type1, n_type2, n_subjects=4, seed=seed)
+    row = measure_variant(instance, variant, n_type1=2, n_type2=1, timeout_seconds=0)
+
+    max_atoms, max_rules = GROUND_LIMITS[variant]
+    assert row["atoms"] <= max_atoms
+    assert row["rules"] <= max_rules
+
+
+def test_propagator_grounds_fewer_atoms_than_aggregates():
+    n_students, n_type1, n_type2, seed = SIZE_INSTANCE
+    instance = generate_instance(n_students, n_type1, n_type2, n_subjects=4, seed=seed)
+    atoms = {
+        variant: measure_variant(instance, variant, n_type1=2, n_type2=1, timeout_seconds=0)["atoms"]
+        for variant in ("aggregate", "propagator", "compact", "compact-propagator")
+    }
+
+    assert atoms["propagator"] < atoms["aggregate"]
+    assert atoms["compact-propagator"] < atoms["compact"]
+
+
+@pytest.mark.parametrize("variant", ["aggregate", "propagator"])
+def test_size_estimate_tracks_ground_atoms(variant):
+    instance = generate_instance(500, 200, 100, seed=0)
+    engine = MatchingEngine(
+        students_df=instance.students,
+        mentors_type1_df=instance.mentors_type1,
+        mentors_type2_df=instance.mentors_type2,
+        n_type1=3,
+        n_type2=1,
+        verbose=False,
+        **VARIANTS[variant],
+    )
+    engine.load_data()
+    estimate = estimate_size(engine)
+    row = measure_variant(instance, variant, n_type1=3, n_type2=1, timeout_seconds=0)
+
+    assert estimate.ground_atoms == pytest.approx(row["atoms"], rel=0.05)